@@ -0,0 +1,397 @@
+"""Benchmarks of keepvariable serialization and server operations.
+
+Results are written as JSON, so that runs of different versions can be compared (run from the repository root):
+
+    python -m benchmarks.run --output bench_new.json
+    python -m benchmarks.run --output bench_new.json --compare bench_old.json
+
+KeepVariableRedisServer is benchmarked against --redis-url when given, otherwise against fakeredis
+(if installed). Use --scale full for the large cases (1M-row DataFrames, 10M-element ndarrays).
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Iterator, Optional
+from urllib.parse import urlparse
+
+import numpy as np
+import pandas as pd
+import redis
+
+from keepvariable.connection_pool import KeepVariableConnectionPool
+from keepvariable.keepvariable_core import (
+    AbstractKeepVariableServer,
+    KeepVariableDummyRedisServer,
+    KeepVariableRedisServer,
+    KeepVariableSerializer,
+)
+from keepvariable.keepvariable_sqlite import KeepVariableSQLiteServer
+from keepvariable.serialization import DATAFRAME_CODECS, is_codec_available
+
+BENCHMARK_FORMAT_VERSION = 1
+
+SCALES = {
+    # Sizes are numbers of elements/rows of generated values and numbers of keys for server operations
+    "quick": {"sizes": (10, 1000, 10_000), "keys": 200},
+    "full": {"sizes": (10, 1000, 100_000, 1_000_000), "keys": 2000},
+}
+BACKENDS = ("dummy", "dummy_write_log", "sqlite", "redis")
+ENTITY_KEY = "bench_jobs"
+
+
+@dataclass
+class BenchmarkResult:
+    group: str
+    case: str
+    operation: str
+    size: int
+    ops: int  # Operations done by one repeat, per-operation times are seconds / ops
+    repeats: int
+    min_s: float
+    median_s: float
+    mean_s: float
+    payload_bytes: Optional[int] = None
+    params: dict = field(default_factory=dict)
+    skipped: Optional[str] = None
+
+    @property
+    def id(self) -> str:
+        return f"{self.group}/{self.case}/{self.operation}/{self.size}"
+
+
+def measure(function: Callable[[], Any], repeats: int, max_seconds: float) -> list[float]:
+    """Run 'function' up to 'repeats' times (at least once), stop early once 'max_seconds' were spent."""
+    timings = []
+    started = time.perf_counter()
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+        if time.perf_counter() - started > max_seconds:
+            break
+    return timings
+
+
+def make_result(
+    group: str, case: str, operation: str, size: int, timings: list[float], *, ops: int = 1,
+    payload_bytes: Optional[int] = None, params: Optional[dict] = None
+) -> BenchmarkResult:
+    return BenchmarkResult(
+        group=group, case=case, operation=operation, size=size, ops=ops, repeats=len(timings),
+        min_s=min(timings), median_s=statistics.median(timings), mean_s=statistics.fmean(timings),
+        payload_bytes=payload_bytes, params=params or {}
+    )
+
+
+def skipped_result(group: str, case: str, operation: str, size: int, reason: str) -> BenchmarkResult:
+    return BenchmarkResult(
+        group=group, case=case, operation=operation, size=size, ops=0, repeats=0, min_s=0.0, median_s=0.0,
+        mean_s=0.0, skipped=reason
+    )
+
+
+class _BenchmarkSerializer(KeepVariableSerializer):
+    def __init__(self, dataframe_codec: str, compression: Optional[str], binary_values_supported: bool):
+        self.dataframe_codec = dataframe_codec
+        self.binary_values_supported = binary_values_supported
+        self._init_compression(compression, 64 * 1024)
+
+
+def _dataframe(rows: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "id": np.arange(rows, dtype=np.int64),
+        "value": np.linspace(0.0, 1.0, rows),
+        "status": np.array(["QUEUED", "RUNNING", "COMPLETED"])[np.arange(rows) % 3],
+        "created_at": pd.date_range("2024-01-01", periods=rows, freq="s"),
+    })
+
+
+def _job(i: int) -> dict:
+    return {"uid": str(i), "status": ("QUEUED", "RUNNING", "COMPLETED")[i % 3], "n": i, "tags": ["a", "b"]}
+
+
+def serialization_cases(sizes: tuple[int, ...]) -> Iterator[tuple[str, int, Callable[[], Any], tuple[str, ...]]]:
+    """Yield (case, size, value factory, dataframe codecs) for every supported value type."""
+    plain = ("json",)
+    yield "NoneType", 1, lambda: None, plain
+    yield "bool", 1, lambda: True, plain
+    yield "int", 1, lambda: 123456789, plain
+    yield "float", 1, lambda: 3.14159, plain
+    yield "datetime", 1, lambda: datetime.datetime(2024, 1, 1, 12, 30), plain
+    for size in sizes:
+        yield "str", size, lambda size=size: "x" * size, plain
+        yield "list", size, lambda size=size: list(range(size)), plain
+        yield "dict", size, lambda size=size: {f"key_{i}": i for i in range(size)}, plain
+        yield "dict[records]", size, lambda size=size: {"jobs": [_job(i) for i in range(size)]}, plain
+        yield "ndarray[float64]", size, lambda size=size: np.random.default_rng(0).random((size, 10)), plain
+        yield "ndarray[int64]", size, lambda size=size: np.arange(size * 10, dtype=np.int64).reshape(size, 10), plain
+        yield "ndarray[object]", size, lambda size=size: np.array([str(i) for i in range(size)], dtype=object), plain
+        codecs = tuple(codec for codec in DATAFRAME_CODECS if is_codec_available(codec))
+        yield "DataFrame", size, lambda size=size: _dataframe(size), codecs
+
+
+def payload_size(payload: Any) -> int:
+    return len(payload.encode("utf-8")) if isinstance(payload, str) else len(payload)
+
+
+def run_serialization_benchmarks(
+    sizes: tuple[int, ...], compressions: tuple[Optional[str], ...], repeats: int, max_seconds: float,
+    case_filter: Optional[str] = None
+) -> Iterator[BenchmarkResult]:
+    """Benchmark parse_saved_value/decode_loaded_value for every value type, size, DataFrame codec and compression.
+
+    Values are serialized as for a backend storing raw bytes (Redis, SQLite), binary payloads of
+    KeepVariableDummyRedisServer are additionally base64 encoded.
+    """
+    for case, size, factory, codecs in serialization_cases(sizes):
+        if case_filter and case_filter not in case:
+            continue
+        value = factory()
+        for codec in codecs:
+            for compression in compressions:
+                serializer = _BenchmarkSerializer(codec, compression, binary_values_supported=True)
+                name = case if len(codecs) == 1 else f"{case}[{codec}]"
+                if compression is not None:
+                    name += f"+{compression}"
+                params = {"dataframe_codec": codec, "compression": compression}
+
+                payload = serializer.parse_saved_value(value)
+                timings = measure(lambda: serializer.parse_saved_value(value), repeats, max_seconds)
+                yield make_result(
+                    "serialization", name, "parse_saved_value", size, timings, payload_bytes=payload_size(payload),
+                    params=params
+                )
+                timings = measure(lambda: serializer.decode_loaded_value(payload), repeats, max_seconds)
+                yield make_result(
+                    "serialization", name, "decode_loaded_value", size, timings,
+                    payload_bytes=payload_size(payload), params=params
+                )
+
+
+def redis_server_from_url(redis_url: Optional[str]) -> KeepVariableRedisServer:
+    """Connect to 'redis_url' (e.g. redis://:password@localhost:6379/0), fall back to fakeredis when not given."""
+    if redis_url is not None:
+        url = urlparse(redis_url)
+        server = KeepVariableRedisServer(
+            host=url.hostname or "localhost", port=url.port or 6379, db=int(url.path.strip("/") or 0),
+            username=url.username or "default", password=url.password
+        )
+        server.redis.ping()
+        return server
+
+    import fakeredis  # Only needed without a real Redis server
+
+    pool = KeepVariableConnectionPool(connection_class=fakeredis.FakeConnection, server=fakeredis.FakeServer())
+    return KeepVariableRedisServer(connection_pool=pool)
+
+
+def _create_redis_index(server: KeepVariableRedisServer):
+    from redis.commands.search.field import TagField, TextField
+    try:
+        from redis.commands.search.indexDefinition import IndexDefinition, IndexType
+    except ImportError:  # redis >= 6
+        from redis.commands.search.index_definition import IndexDefinition, IndexType
+
+    index = server.redis.ft(f"{ENTITY_KEY}:index")
+    try:
+        index.dropindex()
+    except redis.exceptions.ResponseError:
+        pass
+    index.create_index(
+        (TagField("$.status", as_name="status"), TextField("$.uid", as_name="uid")),
+        definition=IndexDefinition(prefix=[f"{ENTITY_KEY}:"], index_type=IndexType.JSON)
+    )
+
+
+def create_backend(backend: str, directory: str, redis_url: Optional[str]) -> AbstractKeepVariableServer:
+    if backend == "dummy":
+        return KeepVariableDummyRedisServer(storage_path=os.path.join(directory, "dummy.json"), check_disk=False)
+    elif backend == "dummy_write_log":
+        return KeepVariableDummyRedisServer(
+            storage_path=os.path.join(directory, "dummy_log.json"), write_log=True, check_disk=False
+        )
+    elif backend == "sqlite":
+        return KeepVariableSQLiteServer(os.path.join(directory, "bench.sqlite"))
+    elif backend == "redis":
+        server = redis_server_from_url(redis_url)
+        for key in server.redis.scan_iter(f"{ENTITY_KEY}:*"):
+            server.redis.delete(key)
+        return server
+    raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+
+
+def run_backend_benchmarks(
+    backend: str, keys: int, repeats: int, max_seconds: float, redis_url: Optional[str] = None,
+    case_filter: Optional[str] = None
+) -> Iterator[BenchmarkResult]:
+    """Benchmark set/get/json_mset/query/scan/arrappend on 'keys' job-like JSON documents of one backend."""
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            server = create_backend(backend, directory, redis_url)
+        except (ImportError, redis.exceptions.RedisError) as e:
+            yield skipped_result("backend", backend, "*", keys, f"{type(e).__name__}: {e}")
+            return
+
+        names = [f"{ENTITY_KEY}:{i}" for i in range(keys)]
+        jobs = [_job(i) for i in range(keys)]
+
+        def write_all():
+            for name, job in zip(names, jobs):
+                server.set(name, job)
+
+        def read_all():
+            for name in names:
+                server.get(name)
+
+        def json_mset_all():
+            for i, name in enumerate(names):
+                server.json_mset(name, {"$.status": "COMPLETED", "$.n": i})
+
+        def write_all_json():  # Documents stored by RedisJSON, so that they can be indexed and updated by path
+            for name, job in zip(names, jobs):
+                server.json_mset(name, {"$": job})
+
+        def query():
+            return server.query(tag_params={"status": ("QUEUED",)}, entity_key=ENTITY_KEY)
+
+        def scan():
+            return server.scan(f"{ENTITY_KEY}:*")
+
+        def arrappend_all():
+            for i in range(keys):
+                server.arrappend(f"{ENTITY_KEY}:list", "$.items", (i,))
+
+        operations: list[tuple[str, Callable[[], Any], int, Optional[Callable[[], Any]]]] = [
+            ("set", write_all, keys, None),
+            ("get", read_all, keys, None),
+            ("json_mset", json_mset_all, keys, write_all_json if backend == "redis" else None),
+            ("query", query, 1, (lambda: _create_redis_index(server)) if backend == "redis" else None),
+            ("scan", scan, 1, None),
+            ("arrappend", arrappend_all, keys, lambda: server.json_mset(f"{ENTITY_KEY}:list", {"$": {"items": []}})),
+        ]
+        for operation, function, ops, setup in operations:
+            if case_filter and case_filter not in operation:
+                continue
+            try:
+                if setup is not None:
+                    setup()
+                timings = measure(function, repeats, max_seconds)
+            except redis.exceptions.ResponseError as e:  # e.g. RedisSearch module is missing
+                yield skipped_result("backend", backend, operation, keys, f"{type(e).__name__}: {e}")
+                continue
+            yield make_result("backend", backend, operation, keys, timings, ops=ops)
+
+        if isinstance(server, KeepVariableSQLiteServer):
+            server.close()
+
+
+def collect_metadata(args: argparse.Namespace) -> dict:
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+        keepvariable_version = version("keepvariable")
+    except PackageNotFoundError:
+        keepvariable_version = None
+    return {
+        "format_version": BENCHMARK_FORMAT_VERSION,
+        "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        "keepvariable": keepvariable_version,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "redis": redis.__version__,
+        "scale": args.scale,
+        "repeats": args.repeats,
+        "redis_url": "fakeredis" if args.redis_url is None else urlparse(args.redis_url).hostname,
+    }
+
+
+def compare_results(results: list[dict], baseline: list[dict], threshold: float) -> list[str]:
+    """Return lines describing results whose median time changed by more than 'threshold' (0.1 = 10%)."""
+    def result_id(result: dict) -> str:
+        # Only the compared fields are read, results of older or newer versions may have other fields
+        return f"{result['group']}/{result['case']}/{result['operation']}/{result['size']}"
+
+    baseline_by_id = {result_id(result): result for result in baseline}
+    lines = []
+    for result in results:
+        old = baseline_by_id.get(result_id(result))
+        if old is None or result.get("skipped") or old.get("skipped") or not old.get("median_s"):
+            continue
+        ratio = result["median_s"] / old["median_s"]
+        if abs(ratio - 1) > threshold:
+            label = "slower" if ratio > 1 else "faster"
+            lines.append(
+                f"{result_id(result)}: {old['median_s']:.6f}s -> {result['median_s']:.6f}s "
+                f"({ratio:.2f}x, {label})"
+            )
+    return lines
+
+
+def parse_args(argv: Optional[list[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scale", choices=tuple(SCALES), default="quick", help="sizes of benchmarked values")
+    parser.add_argument("--groups", default="serialization,backend", help="comma separated groups to run")
+    parser.add_argument("--backends", default=",".join(BACKENDS), help="comma separated backends to run")
+    parser.add_argument("--filter", default=None, help="run only cases/operations containing this substring")
+    parser.add_argument("--compression", default="", help="comma separated compression codecs to benchmark too")
+    parser.add_argument("--repeats", type=int, default=5, help="maximal number of repeats of every benchmark")
+    parser.add_argument("--max-seconds", type=float, default=2.0, help="stop repeating a benchmark after this time")
+    parser.add_argument("--keys", type=int, default=None, help="number of keys for backend benchmarks")
+    parser.add_argument("--redis-url", default=None, help="redis://host:port/db, defaults to fakeredis")
+    parser.add_argument("--output", default=None, help="JSON file with results, defaults to stdout")
+    parser.add_argument("--compare", default=None, help="JSON file with results of a previous run")
+    parser.add_argument("--threshold", type=float, default=0.1, help="relative change reported by --compare")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[list[str]] = None) -> dict:
+    args = parse_args(argv)
+    scale = SCALES[args.scale]
+    groups = args.groups.split(",")
+    compressions = (None, *(codec for codec in args.compression.split(",") if codec))
+
+    benchmarks: list[Iterator[BenchmarkResult]] = []
+    if "serialization" in groups:
+        benchmarks.append(
+            run_serialization_benchmarks(scale["sizes"], compressions, args.repeats, args.max_seconds, args.filter)
+        )
+    if "backend" in groups:
+        for backend in args.backends.split(","):
+            benchmarks.append(run_backend_benchmarks(
+                backend, args.keys or scale["keys"], args.repeats, args.max_seconds, args.redis_url, args.filter
+            ))
+
+    results = []
+    for benchmark in benchmarks:
+        for result in benchmark:
+            if result.skipped:
+                print(f"{result.id}: skipped ({result.skipped})", file=sys.stderr)
+            else:
+                print(f"{result.id}: {result.median_s / result.ops * 1e6:.1f} us/op", file=sys.stderr)
+            results.append(asdict(result))
+
+    report = {"metadata": collect_metadata(args), "results": results}
+    if args.output is None:
+        json.dump(report, sys.stdout, indent=1)
+    else:
+        with open(args.output, "w") as file:
+            json.dump(report, file, indent=1)
+
+    if args.compare is not None:
+        with open(args.compare, "r") as file:
+            baseline = json.load(file)["results"]
+        for line in compare_results(results, baseline, args.threshold):
+            print(line, file=sys.stderr)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,173 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+import redis
+
+from keepvariable.utils import copy_mutable_value
+
+
+class ClientSideCache:
+    """Bounded LRU cache of decoded values kept by KeepVariableRedisServer.get().
+
+    The cache is kept coherent by Redis server-assisted invalidation (CLIENT TRACKING), see
+    RedisInvalidationListener. When tracking is not available, entries expire after 'ttl' seconds.
+    Mutable values (dicts, lists, DataFrames, ...) are returned as copies, callers can change them freely.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 64 * 1024 * 1024, ttl: float = 1.0):
+        """
+        :param max_entries: maximum number of cached keys, defaults to 10000
+        :type max_entries: int
+        :param max_bytes: maximum total size of cached values (measured as size of the stored payload), defaults to 64 MB
+        :type max_bytes: int
+        :param ttl: lifetime of entries in seconds, used only when CLIENT TRACKING is not available, defaults to 1.0
+        :type ttl: float
+        """
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.tracking = False  # Set by the server once invalidation messages are being received
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+        self._entries: OrderedDict[str, tuple[Any, int, float]] = OrderedDict()  # key -> (value, size, expires_at)
+        self._size = 0
+        self._pending: dict[str, object] = {}  # key -> token of a read in progress
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> tuple[bool, Any]:
+        """Return tuple[found, value]."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (self.tracking or entry[2] > time.monotonic()):
+                self._entries.move_to_end(key)
+                self.hits += 1
+                value = entry[0]
+            else:
+                if entry is not None:  # Expired
+                    self._remove(key)
+                self.misses += 1
+                return False, None
+        return True, copy_mutable_value(value)
+
+    def begin_read(self, key: str) -> object:
+        """Register a read from Redis. Value can be cached by put() only if the key was not invalidated in the meantime."""
+        token = object()
+        with self._lock:
+            self._pending[key] = token
+        return token
+
+    def put(self, key: str, value: Any, size: int, token: object):
+        """Cache a value read from Redis, the caller must not keep a reference to it (see copy_mutable_value())."""
+        with self._lock:
+            if self._pending.get(key) is not token:
+                return  # Invalidated (or read again) while the value was being fetched
+            del self._pending[key]
+            if size > self.max_bytes:
+                return
+
+            self._remove(key)
+            self._entries[key] = (value, size, time.monotonic() + self.ttl)
+            self._size += size
+            while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+                oldest_key = next(iter(self._entries))
+                self._remove(oldest_key)
+                self.evictions += 1
+
+    def invalidate(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._pending.pop(key, None)
+                if self._remove(key):
+                    self.invalidations += 1
+
+    def invalidate_all(self):
+        with self._lock:
+            self.invalidations += len(self._entries)
+            self._entries.clear()
+            self._pending.clear()
+            self._size = 0
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "tracking": self.tracking,
+            }
+
+    def _remove(self, key: str) -> bool:
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return False
+        self._size -= entry[1]
+        return True
+
+
+class RedisInvalidationListener:
+    """Dedicated connection subscribed to '__redis__:invalidate', feeding invalidations into a ClientSideCache.
+
+    Data connections enable 'CLIENT TRACKING ON REDIRECT <id>' with the id of this connection (see enable_tracking()),
+    which works with RESP2 connections as well. If the listener connection is lost, the cache is flushed
+    and switched to TTL mode, as invalidation messages could have been missed.
+    """
+
+    INVALIDATE_CHANNEL = b"__redis__:invalidate"
+
+    def __init__(self, cache: ClientSideCache, connection_class: type = redis.Connection, **connection_kwargs):
+        self.cache = cache
+        # RESP2 - invalidations arrive as ordinary pub/sub messages, not as RESP3 push messages
+        self.connection = connection_class(protocol=2, **connection_kwargs)
+        self.client_id: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> int:
+        """Connect, subscribe to invalidation channel and start listening in a daemon thread. Return client id."""
+        self.connection.connect()
+        self.connection.send_command("CLIENT", "ID")
+        self.client_id = int(self.connection.read_response())
+        self.connection.send_command("SUBSCRIBE", self.INVALIDATE_CHANNEL)
+        self.connection.read_response()  # Subscribe confirmation
+
+        self.cache.tracking = True
+        self._thread = threading.Thread(target=self._listen, name="keepvariable-invalidation", daemon=True)
+        self._thread.start()
+        return self.client_id
+
+    def enable_tracking(self, connection: redis.Connection):
+        """Used as redis_connect_func - initialize a new data connection and turn tracking on for it."""
+        connection.on_connect()
+        connection.send_command("CLIENT", "TRACKING", "ON", "REDIRECT", self.client_id)
+        connection.read_response()
+
+    def stop(self, timeout: float = 1.0):
+        """Disconnect, which ends the listening thread - waits up to 'timeout' seconds for it to finish."""
+        self.connection.disconnect()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout)
+
+    def _listen(self):
+        try:
+            while True:
+                message = self.connection.read_response()
+                if not isinstance(message, list) or len(message) < 3 or message[0] != b"message":
+                    continue
+                keys = message[2]
+                if keys is None:  # FLUSHALL/FLUSHDB - everything is invalid
+                    self.cache.invalidate_all()
+                else:
+                    self.cache.invalidate(*(key.decode("utf-8") for key in keys))
+        except (redis.exceptions.ConnectionError, OSError, ValueError):
+            pass
+        finally:
+            self.cache.tracking = False
+            self.cache.invalidate_all()
@@ -0,0 +1,137 @@
+from typing import Any, Callable, Optional
+
+import redis
+from redis.backoff import EqualJitterBackoff
+from redis.retry import Retry
+
+
+class KeepVariableConnectionPool:
+    """Connection pools of KeepVariableRedisServer - one for decoded (text) and one for binary responses.
+
+    Pass the same instance as 'connection_pool' to several servers to share connections within a process.
+    Pools are thread-safe; after fork(), redis-py replaces the connections in the child process.
+    """
+
+    def __init__(
+        self, host: str = "localhost", port: int = 6379, db: int = 0, username: str = 'default',
+        password: Optional[str] = None, *, unix_socket_path: Optional[str] = None,
+        max_connections: Optional[int] = None, blocking: bool = False, blocking_timeout: Optional[float] = 20.0,
+        socket_timeout: Optional[float] = None, socket_connect_timeout: Optional[float] = None,
+        socket_keepalive: bool = False, health_check_interval: int = 0, retries: Optional[int] = None,
+        retry_backoff_base: float = 0.008, retry_backoff_cap: float = 0.512,
+        redis_connect_func: Optional[Callable] = None, **connection_kwargs
+    ):
+        """Create both pools with the same settings.
+
+        :param unix_socket_path: connect through a unix domain socket instead of host and port, defaults to None
+        :type unix_socket_path: Optional[str]
+        :param max_connections: maximal number of connections of each pool, defaults to None (unlimited)
+        :type max_connections: Optional[int]
+        :param blocking: wait for a free connection when max_connections is reached instead of raising
+        ConnectionError, defaults to False
+        :type blocking: bool
+        :param blocking_timeout: seconds to wait for a free connection in a blocking pool, None waits forever,
+        defaults to 20
+        :type blocking_timeout: Optional[float]
+        :param socket_timeout: seconds to wait for a reply, defaults to None (no timeout)
+        :type socket_timeout: Optional[float]
+        :param socket_connect_timeout: seconds to wait for a connection, defaults to None (no timeout)
+        :type socket_connect_timeout: Optional[float]
+        :param socket_keepalive: enable TCP keepalive (ignored for unix sockets), defaults to False
+        :type socket_keepalive: bool
+        :param health_check_interval: PING a connection idle for this many seconds before it is used,
+        defaults to 0 (off)
+        :type health_check_interval: int
+        :param retries: how many times a command is retried on ConnectionError and TimeoutError,
+        defaults to None (redis-py default)
+        :type retries: Optional[int]
+        :param retry_backoff_base: first retry delay in seconds, it doubles with every retry (with jitter),
+        defaults to 0.008
+        :type retry_backoff_base: float
+        :param retry_backoff_cap: maximal retry delay in seconds, defaults to 0.512
+        :type retry_backoff_cap: float
+        :param redis_connect_func: called with every new connection instead of Connection.on_connect()
+        :type redis_connect_func: Optional[Callable]
+        """
+        self.max_connections = max_connections
+        self.blocking = blocking
+
+        connection_kwargs.update(
+            db=db, username=username, password=password, socket_timeout=socket_timeout,
+            socket_connect_timeout=socket_connect_timeout, health_check_interval=health_check_interval
+        )
+        if unix_socket_path is not None:
+            connection_kwargs.update(connection_class=redis.UnixDomainSocketConnection, path=unix_socket_path)
+        else:
+            connection_kwargs.update(host=host, port=port, socket_keepalive=socket_keepalive)
+        if retries is not None:
+            connection_kwargs["retry"] = Retry(EqualJitterBackoff(retry_backoff_cap, retry_backoff_base), retries)
+            connection_kwargs["retry_on_error"] = [redis.ConnectionError, redis.TimeoutError]
+        if redis_connect_func is not None:
+            connection_kwargs["redis_connect_func"] = redis_connect_func
+        # Arguments of every new connection of both pools
+        self.connection_kwargs = connection_kwargs
+
+        pool_kwargs: dict[str, Any] = {"max_connections": max_connections}
+        if blocking:
+            pool_class = redis.BlockingConnectionPool
+            pool_kwargs["timeout"] = blocking_timeout
+            if max_connections is None:
+                pool_kwargs["max_connections"] = 50  # redis-py default of BlockingConnectionPool
+        else:
+            pool_class = redis.ConnectionPool
+        self.text_pool = pool_class(decode_responses=True, encoding="utf-8", **pool_kwargs, **connection_kwargs)
+        # Values are read as raw bytes, binary payloads cannot be decoded as utf-8
+        self.binary_pool = pool_class(decode_responses=False, **pool_kwargs, **connection_kwargs)
+
+    def stats(self) -> dict[str, dict[str, Optional[int]]]:
+        """Return usage of both pools to size max_connections.
+
+        :return: {'text': {'created': 3, 'in_use': 1, 'available': 2, 'max_connections': 50}, 'binary': {...}}
+        :rtype: dict[str, dict[str, Optional[int]]]
+        """
+        return {"text": _pool_stats(self.text_pool), "binary": _pool_stats(self.binary_pool)}
+
+    def disconnect(self):
+        """Close all connections, they are reopened on the next command."""
+        self.text_pool.disconnect()
+        self.binary_pool.disconnect()
+
+
+def _pool_stats(pool: redis.ConnectionPool) -> dict[str, Optional[int]]:
+    """Connection counts of a redis-py pool, None for counts which the installed redis-py does not expose.
+
+    Public get_connection_count() of redis-py 7+ is used when available. Older versions are read from
+    attributes of the pool, which are not public API, so any of them may be missing.
+    """
+    counts = _public_connection_counts(pool)
+    if counts is not None:
+        available, in_use = counts
+    elif isinstance(pool, redis.BlockingConnectionPool):
+        # The queue holds idle connections and None placeholders for connections not created yet
+        queue = getattr(getattr(pool, "pool", None), "queue", None)
+        connections = getattr(pool, "_connections", None)
+        available = None if queue is None else sum(1 for connection in list(queue) if connection is not None)
+        in_use = None if connections is None or available is None else len(connections) - available
+    else:
+        created = getattr(pool, "_created_connections", None)
+        idle_connections = getattr(pool, "_available_connections", None)
+        available = None if idle_connections is None else len(idle_connections)
+        in_use = None if created is None or available is None else created - available
+
+    created = None if available is None or in_use is None else available + in_use
+    max_connections = getattr(pool, "max_connections", None)
+    if max_connections is not None and max_connections >= 2 ** 31:  # redis-py stores "unlimited" as 2 ** 31
+        max_connections = None
+    return {"created": created, "in_use": in_use, "available": available, "max_connections": max_connections}
+
+
+def _public_connection_counts(pool: redis.ConnectionPool) -> Optional[tuple[int, int]]:
+    """Return (idle, in use) connections by get_connection_count(), None if the pool does not provide it."""
+    get_connection_count = getattr(pool, "get_connection_count", None)
+    if get_connection_count is None:
+        return None
+    counts = {attributes.get("db.client.connection.state"): count for count, attributes in get_connection_count()}
+    if "idle" not in counts or "used" not in counts:
+        return None
+    return counts["idle"], counts["used"]
@@ -0,0 +1,394 @@
+import bisect
+import contextvars
+import functools
+import inspect
+import threading
+import time
+from typing import Any, Callable, Optional
+
+try:
+    import prometheus_client
+except ImportError:
+    prometheus_client = None
+
+try:
+    from opentelemetry import metrics as otel_metrics
+    from opentelemetry import trace as otel_trace
+except ImportError:
+    otel_metrics = None
+    otel_trace = None
+
+
+# Public server methods measured when metrics are enabled, methods missing on a server are skipped
+INSTRUMENTED_OPERATIONS = (
+    "set", "get", "mset", "mget", "json_mset", "json_mset_if", "json_cas", "json_incr", "query", "scan", "arrlen",
+    "arrappend", "delete",
+)
+# Streaming methods (generators) - a sample is recorded per page of yielded items, page size is taken from
+# the argument (name, default value), time spent by the caller between the items is not measured
+INSTRUMENTED_GENERATORS = {"scan_iter": ("count", 50), "scan_values": ("count", 1000), "iter_query": ("page_size", 1000)}
+PHASES = ("total", "serialize", "transport", "deserialize")
+# Upper bounds of latency histogram buckets in seconds (the last bucket is unbounded)
+DEFAULT_LATENCY_BUCKETS = (
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+# Sample of the operation in progress - serialization done inside it (and nested operations, e.g. mset of
+# DataFrame chunks inside set) is accounted to it
+_active_sample: contextvars.ContextVar = contextvars.ContextVar("keepvariable_active_sample", default=None)
+
+
+class OperationSample:
+    """Measurements of one server operation call, passed to MetricsCollector.observe()."""
+
+    __slots__ = (
+        "operation", "start_time_ns", "duration", "serialize", "deserialize", "bytes_out", "bytes_in", "error",
+        "_in_codec",
+    )
+
+    def __init__(self, operation: str, start_time_ns: int):
+        self.operation = operation
+        self.start_time_ns = start_time_ns  # Wall clock time, used for tracing spans
+        self.duration = 0.0
+        self.serialize = 0.0
+        self.deserialize = 0.0
+        self.bytes_out = 0  # Size of serialized values (characters for str payloads)
+        self.bytes_in = 0  # Size of values decoded by decode_loaded_value()
+        self.error: Optional[str] = None  # Exception class name if the operation failed
+        self._in_codec = False
+
+    @property
+    def transport(self) -> float:
+        """Time not spent by serialization - network, storage backend and bookkeeping."""
+        return max(self.duration - self.serialize - self.deserialize, 0.0)
+
+    def phase_seconds(self) -> dict[str, float]:
+        return {
+            "total": self.duration, "serialize": self.serialize, "transport": self.transport,
+            "deserialize": self.deserialize,
+        }
+
+
+class MetricsCollector:
+    """Receives a sample of every instrumented operation. Subclass it to export metrics elsewhere.
+
+    observe() is called synchronously in the thread which did the operation, it should be cheap.
+    """
+
+    def observe(self, sample: OperationSample):
+        raise NotImplementedError
+
+
+class LatencyHistogram:
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        self.counts[bisect.bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate quantile as the upper bound of the bucket containing it, None if nothing was observed."""
+        if self.count == 0:
+            return None
+        rank = q * self.count
+        cumulative = 0
+        for i, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= rank and count:
+                return self.buckets[i] if i < len(self.buckets) else float("inf")
+        return float("inf")
+
+    def as_dict(self) -> dict:
+        return {
+            "count": self.count, "sum": self.sum, "buckets": list(self.buckets), "counts": list(self.counts),
+            "p50": self.quantile(0.5), "p99": self.quantile(0.99),
+        }
+
+
+class OperationStats:
+    def __init__(self, buckets: tuple[float, ...]):
+        self.calls = 0
+        self.errors: dict[str, int] = {}  # exception class name -> count
+        self.bytes_out = 0
+        self.bytes_in = 0
+        self.latency = {phase: LatencyHistogram(buckets) for phase in PHASES}
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls, "errors": dict(self.errors), "bytes_out": self.bytes_out, "bytes_in": self.bytes_in,
+            "latency": {phase: histogram.as_dict() for phase, histogram in self.latency.items()},
+        }
+
+
+class InMemoryMetricsCollector(MetricsCollector):
+    """Keeps call counts, errors, payload sizes and latency histograms per operation in memory."""
+
+    def __init__(self, buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.operations: dict[str, OperationStats] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, sample: OperationSample):
+        with self._lock:
+            stats = self.operations.get(sample.operation)
+            if stats is None:
+                stats = self.operations[sample.operation] = OperationStats(self.buckets)
+            stats.calls += 1
+            if sample.error is not None:
+                stats.errors[sample.error] = stats.errors.get(sample.error, 0) + 1
+            stats.bytes_out += sample.bytes_out
+            stats.bytes_in += sample.bytes_in
+            for phase, seconds in sample.phase_seconds().items():
+                stats.latency[phase].observe(seconds)
+
+    def snapshot(self) -> dict[str, dict]:
+        """Return {operation: stats} as plain dicts, e.g. to be dumped as JSON."""
+        with self._lock:
+            return {operation: stats.as_dict() for operation, stats in self.operations.items()}
+
+    def reset(self):
+        with self._lock:
+            self.operations = {}
+
+
+class PrometheusMetricsCollector(MetricsCollector):
+    """Exports operation metrics by prometheus_client (pip install prometheus_client).
+
+    Metrics: <namespace>_operations_total{operation}, <namespace>_operation_errors_total{operation,error},
+    <namespace>_operation_seconds{operation,phase} histogram and <namespace>_payload_bytes_total{operation,direction}.
+    """
+
+    def __init__(
+        self, registry: Optional[Any] = None, namespace: str = "keepvariable",
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS
+    ):
+        """
+        :param registry: prometheus_client CollectorRegistry, defaults to None (the global REGISTRY)
+        :type registry: Optional[prometheus_client.CollectorRegistry]
+        :param namespace: prefix of metric names, defaults to "keepvariable"
+        :type namespace: str
+        """
+        if prometheus_client is None:
+            raise ImportError("Package 'prometheus_client' is required by PrometheusMetricsCollector")
+        registry = prometheus_client.REGISTRY if registry is None else registry
+
+        self.calls = prometheus_client.Counter(
+            "operations", "KeepVariable server operations", ("operation",), namespace=namespace, registry=registry
+        )
+        self.errors = prometheus_client.Counter(
+            "operation_errors", "Failed KeepVariable server operations", ("operation", "error"),
+            namespace=namespace, registry=registry
+        )
+        self.latency = prometheus_client.Histogram(
+            "operation_seconds", "Latency of KeepVariable server operations by phase", ("operation", "phase"),
+            namespace=namespace, registry=registry, buckets=buckets
+        )
+        self.payload = prometheus_client.Counter(
+            "payload_bytes", "Size of serialized (out) and decoded (in) values", ("operation", "direction"),
+            namespace=namespace, registry=registry
+        )
+
+    def observe(self, sample: OperationSample):
+        self.calls.labels(sample.operation).inc()
+        if sample.error is not None:
+            self.errors.labels(sample.operation, sample.error).inc()
+        for phase, seconds in sample.phase_seconds().items():
+            self.latency.labels(sample.operation, phase).observe(seconds)
+        if sample.bytes_out:
+            self.payload.labels(sample.operation, "out").inc(sample.bytes_out)
+        if sample.bytes_in:
+            self.payload.labels(sample.operation, "in").inc(sample.bytes_in)
+
+
+class OpenTelemetryMetricsCollector(MetricsCollector):
+    """Exports operation metrics and spans by OpenTelemetry API (pip install opentelemetry-api).
+
+    Every operation is recorded as a 'keepvariable.<operation>' span with serialize/deserialize times
+    and payload sizes as attributes, unless tracing=False.
+    """
+
+    def __init__(self, meter: Optional[Any] = None, tracer: Optional[Any] = None, tracing: bool = True):
+        """
+        :param meter: OpenTelemetry Meter, defaults to None (meter of the global MeterProvider)
+        :type meter: Optional[opentelemetry.metrics.Meter]
+        :param tracer: OpenTelemetry Tracer, defaults to None (tracer of the global TracerProvider)
+        :type tracer: Optional[opentelemetry.trace.Tracer]
+        :param tracing: record spans of operations, defaults to True
+        :type tracing: bool
+        """
+        if otel_metrics is None:
+            raise ImportError("Package 'opentelemetry-api' is required by OpenTelemetryMetricsCollector")
+        meter = otel_metrics.get_meter("keepvariable") if meter is None else meter
+        self.tracer = None
+        if tracing:
+            self.tracer = otel_trace.get_tracer("keepvariable") if tracer is None else tracer
+
+        self.calls = meter.create_counter("keepvariable.operations", description="KeepVariable server operations")
+        self.errors = meter.create_counter(
+            "keepvariable.operation.errors", description="Failed KeepVariable server operations"
+        )
+        self.latency = meter.create_histogram(
+            "keepvariable.operation.duration", unit="s", description="Latency of KeepVariable server operations by phase"
+        )
+        self.payload = meter.create_counter(
+            "keepvariable.payload", unit="By", description="Size of serialized (out) and decoded (in) values"
+        )
+
+    def observe(self, sample: OperationSample):
+        attributes = {"operation": sample.operation}
+        self.calls.add(1, attributes)
+        if sample.error is not None:
+            self.errors.add(1, {**attributes, "error": sample.error})
+        for phase, seconds in sample.phase_seconds().items():
+            self.latency.record(seconds, {**attributes, "phase": phase})
+        if sample.bytes_out:
+            self.payload.add(sample.bytes_out, {**attributes, "direction": "out"})
+        if sample.bytes_in:
+            self.payload.add(sample.bytes_in, {**attributes, "direction": "in"})
+
+        if self.tracer is not None:
+            span = self.tracer.start_span(f"keepvariable.{sample.operation}", start_time=sample.start_time_ns)
+            span.set_attributes({
+                "keepvariable.serialize_seconds": sample.serialize,
+                "keepvariable.deserialize_seconds": sample.deserialize,
+                "keepvariable.bytes_out": sample.bytes_out,
+                "keepvariable.bytes_in": sample.bytes_in,
+            })
+            if sample.error is not None:
+                span.set_status(otel_trace.Status(otel_trace.StatusCode.ERROR, sample.error))
+            span.end(end_time=sample.start_time_ns + int(sample.duration * 1e9))
+
+
+def _payload_size(value: Any) -> int:
+    return len(value) if isinstance(value, (str, bytes, bytearray, memoryview)) else 0
+
+
+def _wrap_operation(operation: str, function: Callable, collector: MetricsCollector) -> Callable:
+    @functools.wraps(function)
+    def instrumented_operation(*args, **kwargs):
+        if _active_sample.get() is not None:  # Nested operation is a part of the outer one
+            return function(*args, **kwargs)
+
+        sample = OperationSample(operation, time.time_ns())
+        token = _active_sample.set(sample)
+        start = time.perf_counter()
+        try:
+            return function(*args, **kwargs)
+        except Exception as e:
+            sample.error = type(e).__name__
+            raise
+        finally:
+            sample.duration = time.perf_counter() - start
+            _active_sample.reset(token)
+            collector.observe(sample)
+
+    return instrumented_operation
+
+
+def _page_size(function: Callable, args: tuple, kwargs: dict, parameter: str, default: int) -> int:
+    try:
+        page_size = inspect.signature(function).bind_partial(*args, **kwargs).arguments.get(parameter, default)
+    except TypeError:
+        return default
+    return page_size if isinstance(page_size, int) and page_size > 0 else default
+
+
+def _wrap_generator(operation: str, function: Callable, collector: MetricsCollector, parameter: str,
+                    default_page_size: int) -> Callable:
+    @functools.wraps(function)
+    def instrumented_generator(*args, **kwargs):
+        page_size = _page_size(function, args, kwargs, parameter, default_page_size)
+        iterator = iter(function(*args, **kwargs))
+        sample = None
+        items = 0
+        try:
+            while True:
+                if _active_sample.get() is not None:  # Consumed inside another operation, it is a part of it
+                    try:
+                        item = next(iterator)
+                    except StopIteration:
+                        return
+                    yield item
+                    continue
+
+                if sample is None:
+                    sample = OperationSample(operation, time.time_ns())
+                token = _active_sample.set(sample)
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                except Exception as e:
+                    sample.error = type(e).__name__
+                    raise
+                finally:
+                    sample.duration += time.perf_counter() - start
+                    _active_sample.reset(token)
+
+                items += 1
+                if items == page_size:
+                    collector.observe(sample)
+                    sample = None
+                    items = 0
+                yield item
+        finally:
+            if hasattr(iterator, "close"):
+                iterator.close()
+            if sample is not None:  # Last (partial) page, a failed page, or the caller stopped early
+                collector.observe(sample)
+
+    return instrumented_generator
+
+
+def _wrap_codec(function: Callable, serialize: bool) -> Callable:
+    @functools.wraps(function)
+    def instrumented_codec(value, *args, **kwargs):
+        sample = _active_sample.get()
+        if sample is None or sample._in_codec:  # Outside of an operation, or e.g. decoding a decompressed value
+            return function(value, *args, **kwargs)
+
+        sample._in_codec = True
+        start = time.perf_counter()
+        try:
+            result = function(value, *args, **kwargs)
+        finally:
+            elapsed = time.perf_counter() - start
+            sample._in_codec = False
+        if serialize:
+            sample.serialize += elapsed
+            sample.bytes_out += _payload_size(result)
+        else:
+            sample.deserialize += elapsed
+            sample.bytes_in += _payload_size(value)
+        return result
+
+    return instrumented_codec
+
+
+def instrument_server(server: Any, collector: MetricsCollector):
+    """Wrap operations and serialization of 'server' (as instance attributes), so they report to 'collector'.
+
+    Servers which are not instrumented call their methods directly - disabled metrics cost nothing.
+    """
+    uninstrument_server(server)
+    for operation in INSTRUMENTED_OPERATIONS:
+        function = getattr(server, operation, None)
+        if function is not None:
+            setattr(server, operation, _wrap_operation(operation, function, collector))
+    for operation, (parameter, default_page_size) in INSTRUMENTED_GENERATORS.items():
+        function = getattr(server, operation, None)
+        if function is not None:
+            setattr(server, operation, _wrap_generator(operation, function, collector, parameter, default_page_size))
+    server.parse_saved_value = _wrap_codec(server.parse_saved_value, serialize=True)
+    server.decode_loaded_value = _wrap_codec(server.decode_loaded_value, serialize=False)
+
+
+def uninstrument_server(server: Any):
+    for name in (*INSTRUMENTED_OPERATIONS, *INSTRUMENTED_GENERATORS, "parse_saved_value", "decode_loaded_value"):
+        server.__dict__.pop(name, None)
@@ -0,0 +1,530 @@
+import asyncio
+import json
+from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator, Callable, Iterable
+from typing import Any, Optional, Union
+
+import redis
+import redis.asyncio as aioredis
+from redis.asyncio.client import Pipeline as AsyncRedisPipeline
+from redis.asyncio.lock import Lock as AsyncRedisLock
+from redis.commands.search.aggregation import AggregateRequest
+from redis.commands.search.query import Query
+
+from keepvariable.keepvariable_core import (
+    GET_VALUES_SCRIPT,
+    JSON_INCR_SCRIPT,
+    JSON_MSET_IF_SCRIPT,
+    KeepVariableDummyRedisServer,
+    KeepVariableRedisServer,
+    KeepVariableSerializer,
+    build_search_query,
+    build_search_query_string,
+    decode_json_incr_reply,
+)
+from keepvariable.serialization import ChunkedDataFrameManifest, resolve_dataframe_codec
+from keepvariable.utils import iterate_in_chunks, normalize_json_conditions, parent_json_path, to_jsonpath
+
+
+class AbstractAsyncKeepVariableServer(KeepVariableSerializer, ABC):
+    """Awaitable counterpart of AbstractKeepVariableServer, values are serialized the same way."""
+
+    @abstractmethod
+    def lock(self, *args, **kwargs) -> AsyncRedisLock:
+        pass
+
+    @abstractmethod
+    def pipeline(self, *, transaction: bool = True) -> AsyncRedisPipeline:
+        pass
+
+    @abstractmethod
+    async def set(
+        self, key: str, value, additional_params: Optional[dict] = None, *,
+        pipeline: Optional[AsyncRedisPipeline] = None
+    ):
+        pass
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    async def mset(
+        self, mapping: dict[str, Any], additional_params: Optional[dict] = None, *,
+        pipeline: Optional[AsyncRedisPipeline] = None
+    ) -> Optional[AsyncRedisPipeline]:
+        pass
+
+    @abstractmethod
+    async def mget(self, keys: list[str]) -> list[Optional[Any]]:
+        pass
+
+    @abstractmethod
+    async def json_mset(self, name: str, params: dict, *,
+                        pipeline: Optional[AsyncRedisPipeline] = None) -> Optional[AsyncRedisPipeline]:
+        pass
+
+    @abstractmethod
+    async def json_mset_if(self, name: str, params: dict[str, Any], conditions: dict[str, Any]) -> bool:
+        pass
+
+    async def json_cas(self, name: str, path: str, expected: Any, new: Any) -> bool:
+        return await self.json_mset_if(name, {path: new}, {path: (expected,)})
+
+    @abstractmethod
+    async def json_incr(self, name: str, path: str, amount: Union[int, float] = 1) -> Optional[Union[int, float]]:
+        pass
+
+    @abstractmethod
+    async def query(
+        self, *, text_params: Optional[dict[str, tuple]] = None,
+        tag_params: Optional[dict[str, tuple]] = None, field_to_sort_by: Optional[str] = None,
+        asc=True, **kwargs
+    ) -> dict[str, dict]:
+        pass
+
+    @abstractmethod
+    def iter_query(
+        self, *, text_params: Optional[dict[str, tuple]] = None,
+        tag_params: Optional[dict[str, tuple]] = None, entity_key: str, index_name: str = "index",
+        field_to_sort_by: Optional[str] = None, asc=True, page_size: int = 1000,
+        return_fields: Optional[list[str]] = None, **kwargs
+    ) -> AsyncIterator[tuple[str, dict]]:
+        """Yield (key, record) pairs of query() results page by page, see AbstractKeepVariableServer.iter_query()."""
+        pass
+
+    @abstractmethod
+    async def arrlen(self, name: str, path: str, *,
+                     pipeline: Optional[AsyncRedisPipeline] = None) -> Union[int, None, AsyncRedisPipeline]:
+        pass
+
+    @abstractmethod
+    async def arrappend(
+        self, name: str, path: str, objects: Iterable, *, pipeline: Optional[AsyncRedisPipeline] = None
+    ) -> Union[int, None, AsyncRedisPipeline]:
+        pass
+
+    @abstractmethod
+    async def scan(self, match_string: str, count: int = 50, type_: Optional[str] = None) -> list[str]:
+        pass
+
+    @abstractmethod
+    def scan_iter(self, match_string: str, count: int = 50, type_: Optional[str] = None) -> AsyncIterator[str]:
+        pass
+
+    @abstractmethod
+    def scan_values(
+        self, match_string: str, count: int = 1000, type_: Optional[str] = None
+    ) -> AsyncIterator[tuple[str, Any]]:
+        pass
+
+    @abstractmethod
+    async def delete(self, *names: str,
+                     pipeline: Optional[AsyncRedisPipeline] = None) -> Union[int, AsyncRedisPipeline]:
+        pass
+
+
+class AsyncKeepVariableDummyRedisServer(AbstractAsyncKeepVariableServer):
+    """Async wrapper of KeepVariableDummyRedisServer for tests - operations run synchronously on the local file."""
+
+    def __init__(self, *args, **kwargs):
+        self.server = KeepVariableDummyRedisServer(*args, **kwargs)
+        self._locks: dict[str, asyncio.Lock] = {}
+
+    def lock(self, name: str, *args, **kwargs) -> asyncio.Lock:
+        """Return in-process asyncio lock for the given name, it supports 'async with' like Redis lock."""
+        return self._locks.setdefault(name, asyncio.Lock())
+
+    def pipeline(self, *args, **kwargs) -> AsyncRedisPipeline:
+        raise NotImplementedError("Pipelining operations is not available for AsyncDummyRedisServer")
+
+    async def set(self, key: str, value: Any, additional_params: Optional[dict] = None, **kwargs) -> dict[str, str]:
+        return self.server.set(key, value, additional_params)
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self.server.get(key)
+
+    async def mset(self, mapping: dict[str, Any], additional_params: Optional[dict] = None,
+                   **kwargs) -> dict[str, str]:
+        return self.server.mset(mapping, additional_params)
+
+    async def mget(self, keys: list[str], **kwargs) -> list[Optional[Any]]:
+        return self.server.mget(keys)
+
+    async def json_mset(self, name: str, params: dict, *args, **kwargs) -> None:
+        return self.server.json_mset(name, params)
+
+    async def json_mset_if(self, name: str, params: dict[str, Any], conditions: dict[str, Any]) -> bool:
+        return self.server.json_mset_if(name, params, conditions)
+
+    async def json_incr(self, name: str, path: str, amount: Union[int, float] = 1) -> Optional[Union[int, float]]:
+        return self.server.json_incr(name, path, amount)
+
+    async def query(self, **kwargs) -> dict[str, dict]:
+        return self.server.query(**kwargs)
+
+    async def iter_query(self, **kwargs) -> AsyncIterator[tuple[str, dict]]:
+        for record_name, record in self.server.iter_query(**kwargs):
+            yield record_name, record
+
+    async def arrlen(self, name: str, path: str, **kwargs) -> Optional[int]:
+        return self.server.arrlen(name, path)
+
+    async def arrappend(self, name: str, path: str, objects: Iterable, **kwargs) -> Optional[int]:
+        return self.server.arrappend(name, path, objects)
+
+    async def scan(self, match_string: str, *args, **kwargs) -> list[str]:
+        return self.server.scan(match_string)
+
+    async def scan_iter(self, match_string: str, *args, **kwargs) -> AsyncIterator[str]:
+        for key in self.server.scan_iter(match_string):
+            yield key
+
+    async def scan_values(self, match_string: str, count: int = 1000, *args, **kwargs) -> AsyncIterator[tuple[str, Any]]:
+        for key, value in self.server.scan_values(match_string, count):
+            yield key, value
+
+    async def delete(self, *names: str, **kwargs) -> int:
+        return self.server.delete(*names)
+
+    async def flush(self):
+        self.server.flush()
+
+
+class AsyncKeepVariableRedisServer(AbstractAsyncKeepVariableServer):
+    """KeepVariableRedisServer built on redis.asyncio - all operations are awaitable and do not block the event loop."""
+
+    binary_values_supported = True
+    chunk_grace_period: int = KeepVariableRedisServer.chunk_grace_period
+
+    def __init__(
+        self, host: str = "localhost", port: int = 6379, db: int = 0, username: str = 'default',
+        password: Optional[str] = None, dataframe_codec: str = "json", compression: Optional[str] = None,
+        compression_threshold: int = 64 * 1024
+    ):
+        self.host: str = host
+        self.port: int = port
+        self.db = db
+        self.username: str = username
+        self.password: Optional[str] = password
+        self.dataframe_codec = resolve_dataframe_codec(dataframe_codec)
+        self._init_compression(compression, compression_threshold)
+
+        # Connections are created lazily in the running event loop
+        self.redis = aioredis.Redis(
+            host=self.host, port=self.port, username=self.username, db=self.db,
+            password=self.password, decode_responses=True
+        )
+        # Values are read as raw bytes, binary payloads cannot be decoded as utf-8
+        self.redis_binary = aioredis.Redis(
+            host=self.host, port=self.port, username=self.username, db=self.db,
+            password=self.password, decode_responses=False
+        )
+        self._get_values_script = self.redis_binary.register_script(GET_VALUES_SCRIPT)
+        self._json_mset_if_script = self.redis.register_script(JSON_MSET_IF_SCRIPT)
+        self._json_incr_script = self.redis.register_script(JSON_INCR_SCRIPT)
+
+    async def close(self):
+        for client in (self.redis, self.redis_binary):
+            # aclose() replaced close() in redis 5.0.1
+            await (client.aclose() if hasattr(client, "aclose") else client.close())
+
+    def lock(self, *args, **kwargs) -> AsyncRedisLock:
+        """Wrap Redis asyncio Lock object, use it as 'async with server.lock(name):'."""
+        return self.redis.lock(*args, **kwargs)
+
+    def pipeline(self, *, transaction: bool = True) -> AsyncRedisPipeline:
+        """Create a Redis asyncio Pipeline object, commands are queued and sent by 'await pipeline.execute()'."""
+        return self.redis.pipeline(transaction=transaction)
+
+    async def set(
+        self, key: str, value: Any, additional_params: Optional[dict] = None, *,
+        pipeline: Optional[AsyncRedisPipeline] = None
+    ):
+        # A plain value may overwrite a DataFrame chunked by KeepVariableRedisServer - costs one extra round trip
+        old_chunk_keys = await self._find_chunk_keys((key,))
+        value = self.parse_saved_value(value, additional_params)
+
+        if pipeline:
+            result = pipeline.set(key, value)
+        else:
+            result = await self.redis.set(key, value)
+
+        if old_chunk_keys:
+            await self._discard_chunks(old_chunk_keys, pipeline=pipeline)
+        return result
+
+    async def _find_chunk_keys(self, names: tuple[str, ...]) -> list[str]:
+        """Chunk keys of those names which hold a chunked DataFrame manifest, see KeepVariableRedisServer._find_chunk_keys()."""
+        prefix_length = len(ChunkedDataFrameManifest.object_type) + 20
+        async with self.redis_binary.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.getrange(name, 0, prefix_length)
+            prefixes = await pipe.execute(raise_on_error=False)  # JSON documents raise WRONGTYPE
+
+        manifest_names = [
+            name for name, prefix in zip(names, prefixes)
+            if isinstance(prefix, bytes) and ChunkedDataFrameManifest.is_manifest_value(prefix.decode("utf-8", "ignore"))
+        ]
+        if not manifest_names:
+            return []
+        return [
+            chunk_key for manifest in await self._fetch_values(manifest_names)
+            if isinstance(manifest, ChunkedDataFrameManifest) for chunk_key in manifest.chunk_keys
+        ]
+
+    async def _discard_chunks(self, chunk_keys: list[str], *, pipeline: Optional[AsyncRedisPipeline] = None):
+        if pipeline:
+            for chunk_key in chunk_keys:
+                pipeline.expire(chunk_key, self.chunk_grace_period)
+            return
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for chunk_key in chunk_keys:
+                pipe.expire(chunk_key, self.chunk_grace_period)
+            await pipe.execute()
+
+    async def get(self, key: str) -> Optional[Any]:
+        (decoded_value,) = await self._fetch_values([key])
+        return await self._assemble_chunks(key, decoded_value)
+
+    async def _assemble_chunks(self, key: str, value: Any, *, retry: bool = True) -> Any:
+        """Reassemble DataFrame stored in chunks by KeepVariableRedisServer(dataframe_chunk_rows=...)."""
+        if not isinstance(value, ChunkedDataFrameManifest):
+            return value
+
+        chunks = []
+        for chunk_keys in iterate_in_chunks(value.chunk_keys, 1000):
+            chunks.extend(await self._fetch_values(chunk_keys))
+        if any(chunk is None for chunk in chunks):
+            if retry:  # The DataFrame was overwritten while reading, read the new version
+                (new_value,) = await self._fetch_values([key])
+                return await self._assemble_chunks(key, new_value, retry=False)
+            raise KeyError(f"Chunks of DataFrame '{key}' are missing")
+        return value.assemble(chunks)
+
+    async def mset(
+        self, mapping: dict[str, Any], additional_params: Optional[dict] = None, *,
+        pipeline: Optional[AsyncRedisPipeline] = None, chunk_size: int = 1000
+    ) -> Optional[AsyncRedisPipeline]:
+        items = [(key, self.parse_saved_value(value, additional_params)) for key, value in mapping.items()]
+
+        if pipeline:
+            for key, value in items:
+                pipeline.set(key, value)
+            return pipeline
+
+        for chunk in iterate_in_chunks(items, chunk_size):
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, value in chunk:
+                    pipe.set(key, value)
+                await pipe.execute()
+
+    async def _fetch_values(self, keys: list[str]) -> list[Optional[Any]]:
+        """Read and decode string keys and JSON documents in one round trip, see KeepVariableRedisServer._fetch_values()."""
+        if self._get_values_script is not None:
+            try:
+                reply = await self._get_values_script(keys=keys)
+            except redis.exceptions.ResponseError as e:  # e.g. scripting disabled by ACL or a managed service
+                print(f"Keepvariable warning, Lua scripting is not available, reading by MGET and JSON.MGET: {e}")
+                self._get_values_script = None
+            else:
+                return [None if value is None else self.decode_loaded_value(value) for value in reply]
+
+        async with self.redis_binary.pipeline(transaction=False) as pipe:
+            pipe.mget(keys)
+            pipe.execute_command("JSON.MGET", *keys, ".")  # Raw JSON text, decoded by decode_loaded_value()
+            string_values, json_values = await pipe.execute(raise_on_error=False)
+        if isinstance(json_values, Exception):  # e.g. RedisJSON module is not loaded
+            json_values = [None] * len(keys)
+        return [
+            self.decode_loaded_value(string_value) if string_value is not None else
+            None if json_value is None else self.decode_loaded_value(json_value)
+            for string_value, json_value in zip(string_values, json_values)
+        ]
+
+    async def mget(self, keys: list[str], *, chunk_size: int = 1000) -> list[Optional[Any]]:
+        """Get values of multiple keys in the order of 'keys', see KeepVariableRedisServer.mget()."""
+        keys = list(keys)
+        values = []
+        for chunk in iterate_in_chunks(keys, chunk_size):
+            values.extend(await self._fetch_values(chunk))
+        return [await self._assemble_chunks(key, value) for key, value in zip(keys, values)]
+
+    async def json_mset(
+        self, name: str, params: dict[str, Any], *, pipeline: Optional[AsyncRedisPipeline] = None
+    ) -> Optional[AsyncRedisPipeline]:
+        """Set multiple keys in Redis JSON document, see KeepVariableRedisServer.json_mset()."""
+        if pipeline:
+            for json_xpath, value in params.items():
+                pipeline.json().set(name, json_xpath, value)
+            return pipeline
+
+        async with self.redis.pipeline() as pipe:
+            for json_xpath, value in params.items():
+                pipe.json().set(name, json_xpath, value)
+            await pipe.execute()
+
+    async def json_mset_if(self, name: str, params: dict[str, Any], conditions: dict[str, Any]) -> bool:
+        """Conditional atomic update by one Lua script, see KeepVariableRedisServer.json_mset_if()."""
+        conditions = normalize_json_conditions(conditions)
+        args = [json.dumps([[to_jsonpath(path), list(values)] for path, values in conditions.items()])]
+        for json_path, value in params.items():
+            args.extend((to_jsonpath(json_path), json.dumps(value)))
+        return bool(await self._json_mset_if_script(keys=[name], args=args))
+
+    async def json_incr(self, name: str, path: str, amount: Union[int, float] = 1) -> Optional[Union[int, float]]:
+        """Atomic counter by one Lua script, see KeepVariableRedisServer.json_incr()."""
+        reply = await self._json_incr_script(
+            keys=[name], args=[to_jsonpath(path), json.dumps(amount), parent_json_path(path) or ""]
+        )
+        return decode_json_incr_reply(reply)
+
+    async def query(
+        self, *, text_params: Optional[dict[str, tuple]] = None,
+        tag_params: Optional[dict[str, tuple]] = None, entity_key: str, index_name: str = "index",
+        field_to_sort_by: Optional[str] = None, asc=True,
+        paginate: Optional[tuple[int, int]] = None, **kwargs
+    ) -> dict:
+        """Simplified wrapper to RedisSearch, see KeepVariableRedisServer.query()."""
+        query_object = build_search_query(text_params, tag_params, field_to_sort_by, asc, paginate)
+
+        assert len(entity_key) > 0  #entity needs to be specified
+        index_key = entity_key + ":" + index_name
+        result = await self.redis.ft(index_key).search(query_object)
+        return {job_doc.id: self.decode_loaded_value(job_doc.json) for job_doc in result.docs}
+
+    async def iter_query(
+        self, *, text_params: Optional[dict[str, tuple]] = None,
+        tag_params: Optional[dict[str, tuple]] = None, entity_key: str, index_name: str = "index",
+        field_to_sort_by: Optional[str] = None, asc=True, page_size: int = 1000,
+        return_fields: Optional[list[str]] = None, **kwargs
+    ) -> AsyncIterator[tuple[str, dict]]:
+        """Stream RedisSearch results, see KeepVariableRedisServer.iter_query().
+
+        Unsorted results are read through an FT.AGGREGATE cursor, sorted ones page by page with FT.SEARCH LIMIT.
+        """
+        assert len(entity_key) > 0  #entity needs to be specified
+        assert page_size > 0
+        index_key = entity_key + ":" + index_name
+        query_string = build_search_query_string(text_params, tag_params)
+        # Results are loaded under positional aliases, JSON paths are not valid RedisSearch property names
+        json_paths = ["$"] if return_fields is None else [to_jsonpath(field) for field in return_fields]
+        aliases = [f"__field_{i}" for i in range(len(json_paths))]
+
+        def to_record(loaded_fields: dict) -> dict:
+            if return_fields is None:
+                return self.decode_loaded_value(loaded_fields[aliases[0]])
+            return {
+                field: None if loaded_fields.get(alias) is None else self.decode_loaded_value(loaded_fields[alias])
+                for field, alias in zip(return_fields, aliases)
+            }
+
+        if field_to_sort_by:
+            records = self._iter_query_pages(
+                index_key, query_string, field_to_sort_by, asc, page_size, json_paths, aliases, to_record
+            )
+        else:
+            records = self._iter_query_cursor(index_key, query_string, page_size, json_paths, aliases, to_record)
+        try:
+            async for record_name, record in records:
+                yield record_name, record
+        finally:
+            await records.aclose()  # Deletes the cursor right away if the iteration is abandoned
+
+    async def _iter_query_cursor(
+        self, index_key: str, query_string: str, page_size: int, json_paths: list[str], aliases: list[str],
+        to_record: Callable[[dict], dict]
+    ) -> AsyncIterator[tuple[str, dict]]:
+        """Read FT.AGGREGATE ... WITHCURSOR results, the cursor is deleted if the iteration is abandoned early."""
+        load_args = ["@__key"]
+        for json_path, alias in zip(json_paths, aliases):
+            load_args += [json_path, "AS", alias]
+        request = AggregateRequest(query_string).load(*load_args).cursor(count=page_size)
+
+        search_index = self.redis.ft(index_key)
+        cursor = None
+        try:
+            result = await search_index.aggregate(request)
+            while True:
+                cursor = result.cursor
+                for row in result.rows:
+                    loaded_fields = dict(zip(row[::2], row[1::2]))
+                    yield loaded_fields["__key"], to_record(loaded_fields)
+                if cursor is None or not cursor.cid:
+                    return
+                result = await search_index.aggregate(cursor)
+        finally:
+            if cursor is not None and cursor.cid:
+                try:
+                    await self.redis.execute_command("FT.CURSOR", "DEL", index_key, cursor.cid)
+                except redis.ResponseError:
+                    pass  # Cursor has already expired
+
+    async def _iter_query_pages(
+        self, index_key: str, query_string: str, field_to_sort_by: str, asc: bool, page_size: int,
+        json_paths: list[str], aliases: list[str], to_record: Callable[[dict], dict]
+    ) -> AsyncIterator[tuple[str, dict]]:
+        """Read sorted FT.SEARCH results with LIMIT offset page_size until a page comes back incomplete."""
+        search_index = self.redis.ft(index_key)
+        offset = 0
+        while True:
+            query_object = Query(query_string).sort_by(field_to_sort_by, asc=asc).paging(offset, page_size)
+            for json_path, alias in zip(json_paths, aliases):
+                query_object.return_field(json_path, as_field=alias)
+            docs = (await search_index.search(query_object)).docs
+            for doc in docs:
+                yield doc.id, to_record({alias: getattr(doc, alias, None) for alias in aliases})
+            if len(docs) < page_size:
+                return
+            offset += page_size
+
+    async def arrlen(self, name: str, path: str, *,
+                     pipeline: Optional[AsyncRedisPipeline] = None) -> Union[int, None, AsyncRedisPipeline]:
+        if pipeline:
+            return pipeline.json().arrlen(name, path)
+        return (await self.redis.json().arrlen(name, path)).pop()
+
+    async def arrappend(
+        self, name: str, path: str, objects: Iterable, *, pipeline: Optional[AsyncRedisPipeline] = None
+    ) -> Union[int, None, AsyncRedisPipeline]:
+        if pipeline:
+            return pipeline.json().arrappend(name, path, *objects)
+        return (await self.redis.json().arrappend(name, path, *objects)).pop()
+
+    async def scan(self, match_string: str, count: int = 50, type_: Optional[str] = None) -> list[str]:
+        """Find saved keys, matching their name with a given glob-style pattern, see KeepVariableRedisServer.scan()."""
+        return [key async for key in self.scan_iter(match_string, count, type_)]
+
+    def scan_iter(self, match_string: str, count: int = 50, type_: Optional[str] = None) -> AsyncIterator[str]:
+        """Yield keys matching a glob-style pattern, see KeepVariableRedisServer.scan_iter()."""
+        return self.redis.scan_iter(match_string, count, type_)
+
+    async def scan_values(
+        self, match_string: str, count: int = 1000, type_: Optional[str] = None
+    ) -> AsyncIterator[tuple[str, Any]]:
+        """Yield (key, value) pairs read in one round trip per SCAN reply, see KeepVariableRedisServer.scan_values()."""
+        cursor = 0
+        while True:
+            cursor, keys = await self.redis.scan(cursor, match_string, count, type_)
+            if keys:
+                for key, value in zip(keys, await self._fetch_values(keys)):
+                    if value is not None:  # Deleted after SCAN returned it
+                        yield key, await self._assemble_chunks(key, value)
+            if cursor == 0:
+                return
+
+    async def delete(self, *names: str,
+                     pipeline: Optional[AsyncRedisPipeline] = None) -> Union[int, AsyncRedisPipeline]:
+        # Chunks of chunked DataFrames are deleted together with their manifest, only names are counted
+        chunk_keys = await self._find_chunk_keys(names)
+        if pipeline:
+            return pipeline.delete(*names, *chunk_keys)
+        if not chunk_keys:
+            return await self.redis.delete(*names)
+
+        async with self.redis.pipeline() as pipe:
+            pipe.delete(*names)
+            pipe.delete(*chunk_keys)
+            deleted_count, _ = await pipe.execute()
+        return deleted_count
@@ -1,35 +1,107 @@
 import ast
+import atexit
+import bisect
 import datetime
-import inspect
 import json
+import linecache
 import os
-import re
+import struct
+import sys
+import threading
+import time
+import uuid
+import weakref
 from abc import ABC, abstractmethod
-from collections.abc import Iterable
+from collections.abc import Callable, Hashable, Iterable, Iterator
+from functools import lru_cache, wraps
+from itertools import islice
 from typing import Any, Optional, Union
 
 import numpy as np
 import pandas as pd
 import redis
 from redis.client import Pipeline as RedisPipeline
+from redis.commands.search.aggregation import AggregateRequest
 from redis.commands.search.query import Query
 from redis.lock import Lock as RedisLock
 
-from keepvariable.utils import access_element_by_path
+from keepvariable.client_cache import ClientSideCache, RedisInvalidationListener
+from keepvariable.connection_pool import KeepVariableConnectionPool
+from keepvariable.instrumentation import (
+    InMemoryMetricsCollector,
+    MetricsCollector,
+    instrument_server,
+    uninstrument_server,
+)
+from keepvariable.serialization import (
+    ChunkedDataFrameManifest,
+    CompressionStats,
+    binary_payload_to_text,
+    binary_to_dataframe,
+    binary_to_ndarray,
+    compress_value,
+    decompress_value,
+    is_binary_payload,
+    is_codec_available,
+    is_default_index,
+    resolve_compression,
+    resolve_dataframe_codec,
+    unpack_binary_payload,
+)
+from keepvariable.utils import (
+    IncorrectPathError,
+    apply_json_params,
+    compile_glob,
+    compile_json_path,
+    copy_mutable_value,
+    increment_json_values,
+    iterate_in_chunks,
+    json_conditions_match,
+    normalize_json_conditions,
+    parent_json_path,
+    project_record,
+    split_glob_prefix,
+    to_jsonpath,
+)
+from keepvariable.value_codecs import JSON_START_CHARACTERS, CodecRegistry, default_codecs
 
 
 def get_definition(jump_frames, *args, **kwargs):
     """Return the definition of a function or a class from inside."""
-    frame = inspect.currentframe()
-    frame = inspect.getouterframes(frame)[jump_frames]
-    try:
-        string = inspect.getframeinfo(frame[0]).code_context[0].strip()
-    except TypeError as e:
-        print("Warning: Keepvariable was not correctly executed", e)
-        string = ""
+    # Only the needed frame is accessed, inspect.getouterframes() would read source context of the whole stack
+    return _read_source_line(sys._getframe(jump_frames))
+
+
+def _read_source_line(frame) -> str:
+    # Module globals allow linecache to get source of modules loaded by import hooks (e.g. zipimport)
+    string = linecache.getline(frame.f_code.co_filename, frame.f_lineno, frame.f_globals).strip()
+    if not string:
+        print("Warning: Keepvariable was not correctly executed, source code of the call is not available")
     return string
 
 
+# (filename, lineno) -> result of analyze_definition() of the source line
+_call_site_definitions: dict[tuple[str, int], tuple[str, str, list]] = {}
+
+
+def analyze_call_site(jump_frames):
+    """Return analyze_definition() of the source line executed in a frame 'jump_frames' levels up, like get_definition().
+
+    Results are cached per code location, so repeated calls from the same line (e.g. in a loop) do not read
+    or parse the source again.
+    """
+    frame = sys._getframe(jump_frames)
+    code_location = (frame.f_code.co_filename, frame.f_lineno)
+    definition = _call_site_definitions.get(code_location)
+    if definition is None:
+        linecache.checkcache(code_location[0])  # Lines of a file changed since linecache read it would be stale
+        string = _read_source_line(frame)
+        definition = analyze_definition(string)
+        if string:  # Missing source is reported on every call, as before
+            _call_site_definitions[code_location] = definition
+    return definition
+
+
 def analyze_definition(string):
     args = string[string.find("(") + 1:-1].split(",")
     inputs = []
@@ -47,18 +119,24 @@ def analyze_definition(string):
     return (varname, keyword, inputs)
 
 
+@lru_cache(maxsize=1024)
+def _compile_inputs(joined_inputs: str):
+    return compile(joined_inputs, "<string>", "eval")
+
+
 kept_variables = {}
 
 
 class Var:
     def __new__(cls, var):
-        definition = get_definition(2, var)
-        varname, keyword, inputs = analyze_definition(definition)
+        varname, keyword, inputs = analyze_call_site(2)
+        if not varname:  # Source of the call is not available (e.g. exec), the warning was printed
+            return var
         joined_inputs = ",".join(inputs)
         try:
             # not use ast.literal_eval -> wrong handling of strings for this use case
-            kept_variables[varname] = eval(joined_inputs)
-        except NameError:
+            kept_variables[varname] = eval(_compile_inputs(joined_inputs))
+        except (NameError, SyntaxError):  # SyntaxError - arguments continue on the next lines
             kept_variables[varname] = var
         return var
 
@@ -78,48 +156,178 @@ class VarSafe:
         joined_inputs = ",".join(inputs)
         try:
             # not use ast.literal_eval -> wrong handling of strings for this use case
-            kept_variables[varname] = eval(joined_inputs)
+            kept_variables[varname] = eval(_compile_inputs(joined_inputs))
         except NameError:
             kept_variables[varname] = var
         return var
 
 
-def save_variables(variables, filename="vars.kpv"):
-    with open(filename, "w+", encoding="utf8", errors="ignore") as file:
-        # errors ignore dirty way - might be improved
-        # try:
-        file.write(str(variables))  # .encode("utf-8")
-        # except UnicodeEncodeError:
-        # print("")
-        # pass
+# Binary .kpv format (version 2): header, records of the variables, JSON index {varname: [offset, length, kind]}.
+# Files without the magic are the original text format - str() of the whole dict on one line.
+KPV_MAGIC = b"\x00KPV"
+KPV_VERSION = 2
+_KPV_HEADER = struct.Struct("<4sHQ")  # magic, version, offset of the index
 
+# Absolute filename -> ((mtime, size, inode), index), indexes of binary .kpv files read in this process
+_kpv_indexes: dict[str, tuple[tuple[int, int, int], dict[str, list]]] = {}
 
-def load_variable_safe(filename="vars.kpv", varname="varname"):
+
+def _encode_kpv_record(value) -> tuple[bytes, str]:
+    """Return the record of a variable and its kind - 'literal' (Python literal) or 'value' (keepvariable serialized)."""
+    if isinstance(value, (np.ndarray, pd.DataFrame, datetime.datetime)):
+        serializer = _KpvSerializer()
+        # E.g. MultiIndex or non-JSON index names are not supported by the 'numpy' codec, mixed-type columns by arrow
+        fallback_codecs = ["arrow", "json"] if is_codec_available("arrow") else ["json"]
+        while True:
+            try:
+                record = serializer.parse_saved_value(value)
+                break
+            except (TypeError, ValueError):
+                if not fallback_codecs:
+                    raise
+                serializer.dataframe_codec = fallback_codecs.pop(0)
+        return (record if isinstance(record, bytes) else record.encode("utf8")), "value"
+    if isinstance(value, np.generic):
+        value = value.item()  # repr() of numpy scalars is not a Python literal
+    return repr(value).encode("utf8", errors="ignore"), "literal"
+
+
+def _decode_kpv_record(record: bytearray, kind: str):
+    if kind == "value":
+        return _KpvSerializer().decode_loaded_value(record)
+    return ast.literal_eval(record.decode("utf8"))
+
+
+def save_variables(variables, filename="vars.kpv"):
+    """Save variables into a binary .kpv file with an index, so that load_variable() reads only the requested one."""
+    index = {}
+    temp_filename = filename + ".tmp"
+    try:
+        with open(temp_filename, "wb") as file:
+            file.write(_KPV_HEADER.pack(KPV_MAGIC, KPV_VERSION, 0))
+            for varname, value in variables.items():
+                record, kind = _encode_kpv_record(value)
+                index[varname] = [file.tell(), len(record), kind]
+                file.write(record)
+
+            index_offset = file.tell()
+            file.write(json.dumps(index).encode("utf8"))
+            file.seek(0)
+            file.write(_KPV_HEADER.pack(KPV_MAGIC, KPV_VERSION, index_offset))
+        # Replaced atomically - readers never see a partially written file, cached indexes notice the new inode
+        os.replace(temp_filename, filename)
+    finally:
+        # Left only if writing failed, the previous file is kept then
+        if os.path.exists(temp_filename):
+            os.remove(temp_filename)
+
+
+def _read_kpv_index(filename: str) -> Optional[dict[str, list]]:
+    """Return index of a binary .kpv file (cached until the file changes), None for the text format."""
+    path = os.path.abspath(filename)
+    stat = os.stat(path)
+    signature = (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+    cached = _kpv_indexes.get(path)
+    if cached is not None and cached[0] == signature:
+        return cached[1]
+
+    with open(path, "rb") as file:
+        header = file.read(_KPV_HEADER.size)
+        if len(header) < _KPV_HEADER.size or header[:len(KPV_MAGIC)] != KPV_MAGIC:
+            return None
+        _, version, index_offset = _KPV_HEADER.unpack(header)
+        if version > KPV_VERSION:
+            raise ValueError(f"'{filename}' was saved by a newer keepvariable (kpv format version {version})")
+        file.seek(index_offset)
+        index = json.loads(file.read())
+    _kpv_indexes[path] = (signature, index)
+    return index
+
+
+def _load_text_kpv(filename: str) -> dict:
     with open(filename, encoding="utf8", errors="ignore") as file:
         # errors ignore dirty way - might be improved
         rows = file.readlines()
-    variable_dict = ast.literal_eval(rows[0])
-    this_variable = variable_dict[varname]
-    return this_variable
+    return ast.literal_eval(rows[0])
+
+
+def load_variable_safe(filename="vars.kpv", varname="varname"):
+    index = _read_kpv_index(filename)
+    if index is None:
+        return _load_text_kpv(filename)[varname]
+
+    offset, length, kind = index[varname]
+    record = bytearray(length)  # Mutable buffer - loaded numpy arrays are writable without a copy
+    with open(filename, "rb") as file:
+        file.seek(offset)
+        file.readinto(record)
+    return _decode_kpv_record(record, kind)
 
 
 def load_variable(filename="vars.kpv"):
-    definition = get_definition(2)
-    varname, keyword, inputs = analyze_definition(definition)
+    varname, keyword, inputs = analyze_call_site(2)
     this_variable = load_variable_safe(filename=filename, varname=varname)
     return this_variable
 
 
 def load_variables(filename="vars.kpv"):
-    with open(filename, encoding="utf8", errors="ignore") as file:
-        # errors ignore dirty way - might be improved
-        rows = file.readlines()
-    variable_dict = ast.literal_eval(rows[0])
-    return variable_dict
+    index = _read_kpv_index(filename)
+    if index is None:
+        return _load_text_kpv(filename)
+
+    with open(filename, "rb") as file:
+        data = bytearray(file.read())
+    return {
+        varname: _decode_kpv_record(data[offset:offset + length], kind)
+        for varname, (offset, length, kind) in index.items()
+    }
+
+
+class _LengthTree:
+    """Fenwick tree of numbers of elements taken from each referenced list of a RefList.
+
+    Offset of a referenced list and the referenced list holding a position are found in O(log n).
+    """
+
+    def __init__(self, lengths: list[int]):
+        self._tree = [0] * (len(lengths) + 1)
+        for i, length in enumerate(lengths):
+            self.add(i, length)
+
+    def add(self, i: int, delta: int):
+        i += 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def offset(self, i: int) -> int:
+        """Return the number of elements taken from referenced lists before the i-th one."""
+        total = 0
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, position: int) -> int:
+        """Return index of the first referenced list which ends at or after position."""
+        i = 0
+        step = 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            if i + step < len(self._tree) and self._tree[i + step] < position:
+                i += step
+                position -= self._tree[i]
+            step >>= 1
+        return i
 
 
 class RefList:
-    """This object type serves for enabling grouping lists of objects (e.g. visible/draggable) with common attribute in one list which is always up to date."""
+    """This object type serves for enabling grouping lists of objects (e.g. visible/draggable) with common attribute in one list which is always up to date.
+
+    Changes are propagated incrementally - every list keeps the number of elements it holds from each referenced list,
+    so a change of a referenced list is applied at the right offset of all lists it is embedded in (on all levels),
+    without rebuilding them. Changes made directly on a list with referenced_lists are applied to the referenced
+    list holding the position, so all lists stay consistent.
+    """
 
     def __init__(self, elements=None, referenced_lists=None):
         if elements is None:
@@ -128,33 +336,115 @@ class RefList:
         self.elements = elements
         self.referenced_lists = referenced_lists
         self.embedded_in_lists = []
+        self._occurrences = []  # (list this list is embedded in, position of this list in its referenced_lists)
+        self._lengths = None  # Number of elements taken from each of referenced_lists
         if self.referenced_lists is not None:
             self.elements = []
             for i, magic_list in enumerate(self.referenced_lists):
-                for item in magic_list.elements:
-                    self.elements.append(item)
-                self.referenced_lists[i].embedded_in_lists.append(self)
+                self.elements.extend(magic_list.elements)
+                magic_list.embedded_in_lists.append(self)
+                magic_list._occurrences.append((self, i))
+            self._lengths = _LengthTree([len(magic_list.elements) for magic_list in self.referenced_lists])
+
+    def _insert(self, position: int, items: list):
+        if self.referenced_lists:
+            i = self._lengths.find(position)  # Position between two referenced lists goes to the end of the first one
+            self.referenced_lists[i]._insert(position - self._lengths.offset(i), items)
+        else:
+            self._insert_elements(position, items)
+
+    def _remove(self, position: int):
+        if self.referenced_lists:
+            i = self._lengths.find(position + 1)
+            self.referenced_lists[i]._remove(position - self._lengths.offset(i))
+        else:
+            self._remove_elements(position, position + 1)
+
+    def _insert_elements(self, position: int, items: list):
+        self.elements[position:position] = items
+        for embedded_in_list, i in self._occurrences:
+            offset = embedded_in_list._lengths.offset(i)
+            embedded_in_list._lengths.add(i, len(items))
+            embedded_in_list._insert_elements(offset + position, items)
+
+    def _remove_elements(self, start: int, stop: int):
+        del self.elements[start:stop]
+        for embedded_in_list, i in self._occurrences:
+            offset = embedded_in_list._lengths.offset(i)
+            embedded_in_list._lengths.add(i, start - stop)
+            embedded_in_list._remove_elements(offset + start, offset + stop)
 
     def append(self, obj):
-        self.elements.append(obj)
-        for i, list1 in enumerate(self.embedded_in_lists):
-            self.embedded_in_lists[i].elements = []
-            for j in range(len(list1.referenced_lists)):
-                self.embedded_in_lists[i].elements += list1.referenced_lists[j].elements
+        self._insert(len(self.elements), [obj])
+
+    def extend(self, objects: Iterable):
+        self._insert(len(self.elements), list(objects))
+
+    def insert(self, index: int, obj):
+        position = index + len(self.elements) if index < 0 else index
+        self._insert(min(max(position, 0), len(self.elements)), [obj])  # Clamped like list.insert()
 
-    def pop(self, index):
-        self.elements.pop(index)
-        for _i, item in enumerate(self.embedded_in_lists):
-            item.elements.pop(index)
+    def pop(self, index=-1):
+        position = range(len(self.elements))[index]  # Raises IndexError like list.pop()
+        obj = self.elements[position]
+        self._remove(position)
+        return obj
+
+    def remove(self, obj):
+        self.pop(self.elements.index(obj))
+
+    def __iter__(self):
+        return iter(self.elements)
+
+    def __len__(self):
+        return len(self.elements)
+
+    def __getitem__(self, index):
+        return self.elements[index]
+
+    def __contains__(self, obj):
+        return obj in self.elements
 
     def __str__(self):
         return str(self.elements)
 
 
-class AbstractKeepVariableServer(ABC):
+class KeepVariableSerializer:
+    """Serialization of values shared by the sync and async KeepVariable servers."""
+
+    # 'json' keeps DataFrames human readable, binary codecs ('arrow', 'parquet', 'numpy') keep dtypes and index
+    dataframe_codec: str = "json"
+    # Backends which can store raw bytes get binary payloads as they are, others get them base64 wrapped in JSON
+    binary_values_supported: bool = False
+    # Serialized values of at least compression_threshold bytes are compressed, see _init_compression()
+    compression: Optional[str] = None
+    compression_threshold: int = 64 * 1024
+    compression_stats: Optional[CompressionStats] = None
+    # Codecs of value types, shared by all servers - use codecs.copy() to register codecs only for one server
+    codecs: CodecRegistry = default_codecs
+
+    def _init_compression(self, compression: Optional[str], compression_threshold: int):
+        self.compression = resolve_compression(compression)
+        self.compression_threshold = compression_threshold
+        self.compression_stats = CompressionStats()
+
+    def _binary_value(self, payload: bytes) -> Union[bytes, str]:
+        return payload if self.binary_values_supported else binary_payload_to_text(payload)
+
+    def _decode_binary_payload(self, payload: bytes) -> Any:
+        header, body = unpack_binary_payload(payload)
+        if header["object_type"] == "compressed":
+            return self.decode_loaded_value(decompress_value(header, body, self.compression_stats))
+        elif header["object_type"] == "pd.DataFrame":
+            return binary_to_dataframe(header, body)
+        elif header["object_type"] == "np.ndarray":
+            return binary_to_ndarray(header, body)
+        raise ValueError(f"Unknown binary payload object_type '{header['object_type']}'")
+
     def _json_serialize_dataframe(self, df: pd.DataFrame) -> str:
         """Takes a pandas DataFrame and serialized it to a json-like string.
         The function uses pd.DataFrame().to_json() approach so as to handle various variable types with ease (pd.NA, pd.NaT, datetime etc.).
+        Index values, names and dtype are kept, dtypes of columns are not (e.g. datetimes are loaded as epoch milliseconds).
 
         Example:
         -------
@@ -173,6 +463,10 @@ class AbstractKeepVariableServer(ABC):
         df_as_dict = json.loads(df_json)
         df_as_dict["object_type"] = 'pd.DataFrame'
         df_as_dict["attrs"] = df.attrs
+        if not is_default_index(df.index):  # Values of the index are in df_as_dict["index"]
+            df_as_dict["index_names"] = list(df.index.names)
+            if not isinstance(df.index, pd.MultiIndex):
+                df_as_dict["index_dtype"] = str(df.index.dtype)
         df_json = json.dumps(df_as_dict)
 
         return df_json
@@ -188,51 +482,25 @@ class AbstractKeepVariableServer(ABC):
         :return: Jsonified value
         :rtype: Any
         """
-        if additional_params is None:
-            additional_params = {}
-
-        if value is None:
-            value = json.dumps({"object_type": "NoneType"})  # Redis does not natively support None values
-        elif (
-            isinstance(value, list) or isinstance(value, bool) or isinstance(value, dict) or
-            isinstance(value, int) or isinstance(value, float)
+        value_type = type(value)
+        if value_type is not str:  # Strings are stored as they are
+            if additional_params is None:
+                additional_params = {}
+            value = self.codecs.encoder(value_type)(self, value, additional_params)
+
+        if (
+            self.compression is not None and isinstance(value, (str, bytes)) and
+            len(value) >= self.compression_threshold
         ):
-            value = json.dumps(value)
-        elif isinstance(value, pd.DataFrame):
-            value = self._json_serialize_dataframe(value)
-            # Old implementation
-            # TODO: Keep for now, delete in following commits
-            # data = value.values.tolist()
-            # columns = list(value.columns)
-            # final_data = {
-            #     "columns": columns,
-            #     "data": data,
-            #     "object_type": "pd.DataFrame",
-            # }
-            # print(final_data)
-            # value = json.dumps(final_data)
-        elif isinstance(value, np.ndarray):
-            data = value.tolist()
-            final_data = {"data": data, "object_type": "np.ndarray"}
-            value = json.dumps(final_data)
-
-        elif isinstance(value, datetime.datetime):
-            data = value.strftime("%Y-%m-%d %H:%M:%S")
-            final_data = {"data": data, "object_type": "datetime.datetime"}
-            value = json.dumps(final_data)
-        elif inspect.isfunction(value):
-            code = additional_params.get("code")
-            value = {"code": code, "object_type": "function"}
-            value = json.dumps(code)
-        elif inspect.isclass(value):
-            code = additional_params.get("code")
-            value = {"code": code, "object_type": "class"}
-            value = json.dumps(code)
+            value = compress_value(value, self.compression, self.compression_stats) or value
 
+        if is_binary_payload(value):
+            value = self._binary_value(value)
         return value
 
-    def decode_loaded_value(self,
-                            value: str) -> Union[dict, pd.DataFrame, np.ndarray, datetime.datetime]:
+    def decode_loaded_value(
+        self, value: Union[str, bytes]
+    ) -> Union[dict, pd.DataFrame, np.ndarray, datetime.datetime]:
         """Decode value stored in redis into it's initial value. For functions and classes only their code is returned --> they need to be evaluated afterwards!!!.
 
         :param value: Variable value from redis
@@ -240,28 +508,213 @@ class AbstractKeepVariableServer(ABC):
         :return: Parsed variable value
         :rtype: Any
         """
+        if is_binary_payload(value):
+            return self._decode_binary_payload(value)
+        if isinstance(value, (bytes, bytearray)):
+            value = value.decode("utf-8")
+        if not value or value[0] not in JSON_START_CHARACTERS:  # Plain string, it can not be JSON
+            return value
+
         try:
             value = json.loads(value)
-            if isinstance(value, dict) and "object_type" in value:
-                if value["object_type"] == "NoneType":
-                    return None
-                elif value["object_type"] == "pd.DataFrame":
-                    df = pd.DataFrame(value["data"], columns=value["columns"])
-                    if "attrs" in value:
-                        df.attrs = value["attrs"]
-                    return df
-                elif value["object_type"] == "np.ndarray":
-                    array = pd.DataFrame(value["data"]).values  # to ensure 64bit values in array
-                    return array
-
-                elif value["object_type"] == "datetime.datetime":
-                    datetime_value = datetime.datetime.strptime(value["data"], "%Y-%m-%d %H:%M:%S")
-                    return datetime_value
-                elif (value["object_type"] == "function" or value["object_type"] == "class"):
-                    return value["code"]
-            return value
         except json.JSONDecodeError:  # if type is str, it fails to decode
             return value
+        if type(value) is dict and "object_type" in value:
+            decoder = self.codecs.decoder(value["object_type"])
+            if decoder is not None:
+                return decoder(self, value)
+        return value
+
+
+class _KpvSerializer(KeepVariableSerializer):
+    """Serializer of numpy/pandas values in binary .kpv files - raw buffers, dtypes and index are kept."""
+
+    dataframe_codec = "numpy"
+    binary_values_supported = True
+
+
+def build_search_query_string(
+    text_params: Optional[dict[str, tuple]] = None, tag_params: Optional[dict[str, tuple]] = None
+) -> str:
+    """Build RedisSearch query string from TAG/TEXT field conditions, e.g. "@type:PIPEL @status:{QUEUED|COMPLETED}"."""
+    final_query = ""
+
+    if text_params is not None:
+        text_query_template = "@{field}:{value}"
+        for field, values in text_params.items():
+            value_str = "|".join(values)
+            final_query += text_query_template.format(field=field, value=value_str)
+
+    if tag_params is not None:
+        tag_query_template = "@{field}:{{{value}}}"
+        for field, values in tag_params.items():
+            value_str = "|".join(values)
+            final_query += tag_query_template.format(field=field, value=value_str)
+
+    # If no query was specified, return all records from the index
+    if final_query == "":
+        final_query = "*"
+
+    # Query example: "@type:PIPEL @status:{QUEUED|COMPLETED}"
+    # Explanation: find all jobs with type field containing 'PIPEL' and status being either 'QUEUED' or 'COMPLETED'
+    return final_query
+
+
+def build_search_query(
+    text_params: Optional[dict[str, tuple]] = None, tag_params: Optional[dict[str, tuple]] = None,
+    field_to_sort_by: Optional[str] = None, asc=True, paginate: Optional[tuple[int, int]] = None
+) -> Query:
+    """Build RedisSearch query object from TAG/TEXT field conditions, see build_search_query_string()."""
+    query_object = Query(build_search_query_string(text_params, tag_params))
+
+    if field_to_sort_by:
+        query_object.sort_by(field_to_sort_by, asc=asc)
+    if paginate:
+        query_object.paging(*paginate)
+    return query_object
+
+
+def filter_query_records(
+    found_records: list[tuple[str, dict]], tag_params: Optional[dict[str, tuple]] = None,
+    text_params: Optional[dict[str, tuple]] = None, field_to_sort_by: Optional[str] = None, asc=True,
+    paginate: Optional[tuple[int, int]] = None
+) -> dict[str, dict]:
+    """Filter, sort and paginate decoded records the way RedisSearch would, used by the local servers.
+
+    Values which are not JSON objects (arrays, DataFrames, ...) have no fields, so they never match tag or text params.
+    """
+    # TAG search
+    if tag_params is not None:
+        for field, values in tag_params.items():
+            found_records = [
+                (record_id, record) for record_id, record in found_records
+                if isinstance(record, dict) and record.get(field) and record.get(field) in values
+            ]
+
+    # TEXT search
+    if text_params is not None:
+        for field, values in text_params.items():
+            for value in values:
+                # E.g. value = "QUEU", job.get(field) = "QUEUED"
+                found_records = [
+                    (record_id, record) for record_id, record in found_records
+                    if isinstance(record, dict) and record.get(field) and value in record.get(field)
+                ]
+
+    if field_to_sort_by:
+        found_records = sorted(found_records, key=lambda x: x[1][field_to_sort_by])
+        if not asc:
+            found_records.reverse()
+    if paginate:
+        start = paginate[0]
+        end = paginate[0] + paginate[1]
+        found_records = found_records[start:end]
+
+    return dict(found_records)
+
+
+class AbstractKeepVariableServer(KeepVariableSerializer, ABC):
+    # DataFrames with more rows are stored as row chunks under separate keys, None disables chunking
+    dataframe_chunk_rows: Optional[int] = None
+    # Number of chunks serialized and sent together when writing a chunked DataFrame
+    chunk_write_batch: int = 8
+    # Collector of per-operation metrics, see enable_metrics()
+    metrics: Optional[MetricsCollector] = None
+
+    def _init_metrics(self, metrics: Optional[MetricsCollector]):
+        if metrics is not None:
+            self.enable_metrics(metrics)
+
+    def enable_metrics(self, collector: Optional[MetricsCollector] = None) -> MetricsCollector:
+        """Record call counts, errors, payload sizes and serialize/transport/deserialize latency of operations.
+
+        Operations called inside another one (e.g. mset of DataFrame chunks inside set) are accounted to the outer one.
+
+        :param collector: receiver of the measurements, defaults to None (new InMemoryMetricsCollector)
+        :type collector: Optional[MetricsCollector]
+        :return: the collector in use
+        :rtype: MetricsCollector
+        """
+        self.metrics = InMemoryMetricsCollector() if collector is None else collector
+        instrument_server(self, self.metrics)
+        return self.metrics
+
+    def disable_metrics(self):
+        """Stop recording metrics, operations are called without any overhead again."""
+        uninstrument_server(self)
+        self.metrics = None
+
+    def _should_chunk(self, value: Any) -> bool:
+        return (
+            self.dataframe_chunk_rows is not None and isinstance(value, pd.DataFrame) and
+            len(value) > self.dataframe_chunk_rows
+        )
+
+    def _set_chunked(
+        self, key: str, df: pd.DataFrame, additional_params: Optional[dict] = None, *,
+        pipeline: Optional[RedisPipeline] = None
+    ):
+        """Store DataFrame as row chunks under new versioned keys, then switch the manifest under 'key'.
+
+        Chunks of the previous version are discarded only after the manifest was switched,
+        so readers never see a half-written DataFrame.
+        """
+        old_chunk_keys = self._find_chunk_keys((key,))
+        manifest = ChunkedDataFrameManifest.from_dataframe(key, df, self.dataframe_chunk_rows, uuid.uuid4().hex)
+
+        chunk_rows = self.dataframe_chunk_rows
+        for batch in iterate_in_chunks(list(enumerate(manifest.chunk_keys)), self.chunk_write_batch):
+            chunks = {chunk_key: df.iloc[i * chunk_rows:(i + 1) * chunk_rows] for i, chunk_key in batch}
+            self.mset(chunks, additional_params, pipeline=pipeline)
+
+        result = self.set(key, manifest.to_dict(), pipeline=pipeline)
+        if old_chunk_keys:
+            self._discard_chunks(old_chunk_keys, pipeline=pipeline)
+        return result
+
+    def _discard_chunks(self, chunk_keys: list[str], *, pipeline: Optional[RedisPipeline] = None):
+        self.delete(*chunk_keys, pipeline=pipeline)
+
+    def _assemble_chunks(self, key: str, value: Any, *, retry: bool = True) -> Any:
+        """Reassemble DataFrame if value is a manifest of a chunked DataFrame, return other values unchanged."""
+        if not isinstance(value, ChunkedDataFrameManifest):
+            return value
+
+        chunks = self.mget(value.chunk_keys)
+        if any(chunk is None for chunk in chunks):
+            if retry:  # The DataFrame was overwritten while reading, read the new version
+                return self._assemble_chunks(key, self._get_stored(key), retry=False)
+            raise KeyError(f"Chunks of DataFrame '{key}' are missing")
+        return value.assemble(chunks)
+
+    def iter_chunks(self, key: str) -> Iterator[pd.DataFrame]:
+        """Yield DataFrame stored under 'key' chunk by chunk, so that only one chunk is held in memory.
+
+        Values which are not chunked DataFrames are yielded as a whole, nothing is yielded for a missing key.
+        """
+        value = self._get_stored(key)
+        if not isinstance(value, ChunkedDataFrameManifest):
+            if value is not None:
+                yield value
+            return
+
+        offset = 0
+        for chunk_key in value.chunk_keys:
+            chunk = self._get_stored(chunk_key)
+            if chunk is None:
+                raise KeyError(f"Chunk '{chunk_key}' of DataFrame '{key}' is missing")
+            yield value.prepare_chunk(chunk, offset)
+            offset += len(chunk)
+
+    @abstractmethod
+    def _get_stored(self, key: str) -> Optional[Any]:
+        """Return decoded value of a key, manifests of chunked DataFrames are returned as they are."""
+        pass
+
+    @abstractmethod
+    def _find_chunk_keys(self, names: tuple[str, ...]) -> list[str]:
+        """Return chunk keys of those names which hold a chunked DataFrame manifest, without decoding other values."""
+        pass
 
     @abstractmethod
     def lock(self, *args, **kwargs) -> RedisLock:
@@ -282,12 +735,70 @@ class AbstractKeepVariableServer(ABC):
     def get(self, key: str) -> Union[dict, pd.DataFrame, np.ndarray, datetime.datetime]:
         pass
 
+    @abstractmethod
+    def mset(
+        self, mapping: dict[str, Any], additional_params: Optional[dict] = None, *,
+        pipeline: Optional[RedisPipeline] = None
+    ) -> Optional[RedisPipeline]:
+        """Set multiple keys at once - explanations are in abstract subclasses docstrings."""
+        pass
+
+    @abstractmethod
+    def mget(self, keys: list[str]) -> list[Optional[Any]]:
+        """Get values of multiple keys at once, in the order of 'keys'. Missing keys are returned as None."""
+        pass
+
     @abstractmethod
     def json_mset(self, name: str, params: dict, *,
                   pipeline: Optional[RedisPipeline] = None) -> Optional[RedisPipeline]:
         """Set multiple keys in json document - explanations are in abstract subclasses docstrings."""
         pass
 
+    @abstractmethod
+    def json_mset_if(self, name: str, params: dict[str, Any], conditions: dict[str, Any]) -> bool:
+        """Atomically set multiple paths in a JSON document, only if the document matches all 'conditions'.
+
+        e.g. json_mset_if("jobs:1", {"$.status": "RUNNING", "$.worker": "w1"}, {"$.status": ("QUEUED", "PAUSED")})
+
+        :param name: key under which a JSON document is stored
+        :type name: str
+        :param params: JSON Paths to values to set, see json_mset()
+        :type params: dict[str, Any]
+        :param conditions: JSON Path to a tuple of allowed scalar values (or a single value), every element
+        the path points to must have one of them. A missing element is None.
+        :type conditions: dict[str, Any]
+        :return: True if the document matched and was updated, False if it did not match or does not exist
+        :rtype: bool
+        """
+        pass
+
+    def json_cas(self, name: str, path: str, expected: Any, new: Any) -> bool:
+        """Atomically compare-and-set - set 'path' to 'new' only if its current value is 'expected'.
+
+        :return: True if the value was set
+        :rtype: bool
+        """
+        return self.json_mset_if(name, {path: new}, {path: (expected,)})
+
+    @abstractmethod
+    def json_incr(self, name: str, path: str, amount: Union[int, float] = 1) -> Optional[Union[int, float]]:
+        """Atomically add 'amount' to numbers in a JSON document, the same way on all servers.
+
+        A missing key is created as a document holding only the new element. Without wildcards, a missing element
+        of an object (or a null element) is created with value 'amount', AssertionError is raised if its parent
+        does not exist - the document is not changed then. With wildcards, only the matched numbers are incremented.
+
+        :param name: key under which a JSON document is stored
+        :type name: str
+        :param path: JSON Path of the counter, e.g. "$.stats.retries"
+        :type path: str
+        :param amount: number to add, defaults to 1
+        :type amount: Union[int, float]
+        :return: the new value (of the last element for paths with wildcards), None if it is not a number
+        :rtype: Optional[Union[int, float]]
+        """
+        pass
+
     @abstractmethod
     def query(
         self, *, text_params: Optional[dict[str, tuple]] = None,
@@ -297,6 +808,25 @@ class AbstractKeepVariableServer(ABC):
         """Query KeepVariable store - explanations are in abstract subclasses docstrings."""
         pass
 
+    @abstractmethod
+    def iter_query(
+        self, *, text_params: Optional[dict[str, tuple]] = None,
+        tag_params: Optional[dict[str, tuple]] = None, entity_key: str, index_name: str = "index",
+        field_to_sort_by: Optional[str] = None, asc=True, page_size: int = 1000,
+        return_fields: Optional[list[str]] = None, **kwargs
+    ) -> Iterator[tuple[str, dict]]:
+        """Stream query results page by page instead of building one dict, conditions are the same as in query().
+
+        :param page_size: how many records to fetch in one round trip, defaults to 1000
+        :type page_size: int, optional
+        :param return_fields: field names or JSON paths to return instead of whole records, e.g. ["status", "$.meta.owner"].
+        A missing field is None
+        :type return_fields: Optional[list[str]], optional
+        :return: iterator of (key, record) tuples, e.g. ('jobs:43', {'status': 'QUEUED'})
+        :rtype: Iterator[tuple[str, dict]]
+        """
+        pass
+
     # Implemented, but currently not used
     @abstractmethod
     def arrlen(self, name: str, path: str, *,
@@ -340,6 +870,36 @@ class AbstractKeepVariableServer(ABC):
         """
         pass
 
+    @abstractmethod
+    def scan_iter(self, match_string: str, count: int = 50, type_: Optional[str] = None) -> Iterator[str]:
+        """Yield keys matching a glob-style pattern as they are found, without collecting them first - see scan()."""
+        pass
+
+    def scan_values(
+        self, match_string: str, count: int = 1000, type_: Optional[str] = None
+    ) -> Iterator[tuple[str, Any]]:
+        """Yield (key, value) pairs of keys matching a glob-style pattern, values are read by mget() in batches.
+
+        Memory use is bounded by one batch. Keys deleted between finding them and reading them are skipped.
+
+        :param match_string: string pattern to match keys against, e.g. 'jobs:*'
+        :type match_string: str
+        :param count: how many keys to find and read in one batch, defaults to 1000
+        :type count: int, optional
+        :param type_: filter on specified Redis key type, defaults to None
+        :type type_: Optional[str], optional
+        :return: iterator of (key, decoded value) tuples
+        :rtype: Iterator[tuple[str, Any]]
+        """
+        keys = self.scan_iter(match_string, count, type_)
+        while True:
+            batch = list(islice(keys, count))
+            if not batch:
+                return
+            for key, value in zip(batch, self.mget(batch)):
+                if value is not None:
+                    yield key, value
+
     @abstractmethod
     def delete(self, *names: str,
                pipeline: Optional[RedisPipeline] = None) -> Union[int, RedisPipeline]:
@@ -347,20 +907,419 @@ class AbstractKeepVariableServer(ABC):
         pass
 
 
+def _snapshot_entry(value: str) -> str:
+    """Return a stored value as JSON text of the snapshot file.
+
+    Serialized values are JSON already and are written as they are. Plain strings (including base64 wrapped
+    binary payloads) are stored without JSON encoding, so they are encoded here - _load_snapshot() json.dumps()
+    every loaded value, which turns them back into the same stored string.
+    """
+    if value and value[0] in JSON_START_CHARACTERS:
+        try:
+            json.loads(value)
+            return value
+        except json.JSONDecodeError:
+            pass
+    return json.dumps(value)
+
+
+def _synchronized(method):
+    """Run a method of KeepVariableDummyRedisServer under its update lock."""
+    @wraps(method)
+    def synchronized_method(self, *args, **kwargs):
+        with self._update_lock:
+            return method(self, *args, **kwargs)
+
+    return synchronized_method
+
+
 class KeepVariableDummyRedisServer(AbstractKeepVariableServer):
-    def __init__(self, host="localhost"):
+    def __init__(
+        self, host="localhost", storage_path: str = "kv_storage.json", *, write_log: bool = False,
+        log_compaction_threshold: int = 16 * 1024 * 1024, log_fsync: bool = False,
+        read_cache: bool = True, check_disk: bool = True, dataframe_codec: str = "json",
+        compression: Optional[str] = None, compression_threshold: int = 64 * 1024,
+        dataframe_chunk_rows: Optional[int] = None, tag_indexes: Optional[dict[str, Iterable[str]]] = None,
+        flush_interval_ms: Optional[int] = 0, metrics: Optional[MetricsCollector] = None
+    ):
+        """Local file-based stand-in for KeepVariableRedisServer.
+
+        JSON documents changed by json_mset/arrappend are kept decoded in memory and updated in place,
+        they are serialized again only when the changes are flushed to the file.
+
+        :param storage_path: path of the JSON snapshot file, defaults to "kv_storage.json"
+        :type storage_path: str
+        :param write_log: if True, every set/delete/json_mset appends one record to an append-only
+        log (storage_path with .log extension) instead of rewriting the whole snapshot file.
+        The snapshot and the log are replayed on startup, defaults to False
+        :type write_log: bool
+        :param log_compaction_threshold: size of the log in bytes, after which the log is compacted
+        into the snapshot file, defaults to 16 MB
+        :type log_compaction_threshold: int
+        :param log_fsync: fsync the log after every record (survives OS crash, not only process crash),
+        defaults to False
+        :type log_fsync: bool
+        :param read_cache: keep decoded values of get() in memory. Mutable cached values are returned as copies,
+        defaults to True
+        :type read_cache: bool
+        :param check_disk: on get(), check whether the storage file was changed by another process
+        (by its mtime, size and inode) and reload it if so. Disable for single-process use, defaults to True
+        :type check_disk: bool
+        :param dataframe_codec: serialization of DataFrames - 'json', 'arrow', 'parquet' or 'numpy', defaults to 'json'
+        :type dataframe_codec: str
+        :param compression: compress serialized values - 'zlib', 'lz4' or 'zstd', defaults to None (no compression)
+        :type compression: Optional[str]
+        :param compression_threshold: minimal size of a serialized value to be compressed, defaults to 64 kB
+        :type compression_threshold: int
+        :param dataframe_chunk_rows: store DataFrames with more rows as row chunks, see iter_chunks(), defaults to None
+        :type dataframe_chunk_rows: Optional[int]
+        :param tag_indexes: entity key to tag fields mapping, e.g. {'jobs': ('status',)}. Records of the entity
+        are indexed by values of these fields in memory, so query() with tag_params on them does not decode
+        the whole store - similar to TAG fields of a RedisSearch index, defaults to None
+        :type tag_indexes: Optional[dict[str, Iterable[str]]]
+        :param flush_interval_ms: when changes are written to the file - 0 on every write, N at most every N ms
+        (checked on every operation, pending changes are also flushed at interpreter exit), None only by flush().
+        Other processes do not see unflushed changes, defaults to 0
+        :type flush_interval_ms: Optional[int]
+        :param metrics: collector of per-operation metrics, see enable_metrics(), defaults to None (disabled)
+        :type metrics: Optional[MetricsCollector]
+        """
         self.host = host
+        self.storage_path = storage_path
+        self.log_path = os.path.splitext(storage_path)[0] + ".log"
+        self.write_log = write_log
+        self.log_compaction_threshold = log_compaction_threshold
+        self.log_fsync = log_fsync
+        self.read_cache = read_cache
+        self.check_disk = check_disk
+        self.dataframe_codec = resolve_dataframe_codec(dataframe_codec)
+        self._init_compression(compression, compression_threshold)
+        self.dataframe_chunk_rows = dataframe_chunk_rows
+        self.tag_indexes = {entity_key: tuple(fields) for entity_key, fields in (tag_indexes or {}).items()}
+        self.flush_interval_ms = flush_interval_ms
         self.storage = {}
-        
+        # Writes of concurrent threads are serialized, so that json_mset_if/json_incr are atomic read-modify-writes
+        self._update_lock = threading.RLock()
+
+        # Live JSON documents changed by json_mset/arrappend, authoritative over their serialized form in self.storage
+        self._documents: dict[str, Any] = {}
+        self._stale_documents: set[str] = set()  # Documents changed since they were serialized into self.storage
+        self._unflushed: set[str] = set()  # Keys changed (or deleted) since the last flush
+        self._last_flush = time.monotonic()
+
+        # (entity_key, field) -> tag value -> record names, dicts are used as insertion ordered sets
+        self._tag_index: dict[tuple[str, str], dict[Hashable, dict[str, None]]] = {}
+        self._tag_index_entries: dict[str, list[tuple[tuple[str, str], Hashable]]] = {}  # Record name -> its entries
+        self._sorted_keys: Optional[list[str]] = None  # Sorted key names for scan(), None when it has to be rebuilt
+
+        self._read_cache = {}  # Decoded values returned by get()
+        self._storage_signature = None  # (mtime, size, inode) of the storage file when it was last synced
+
+        self._log_offset = 0  # Position in the log up to which records were applied to self.storage
+        self._log_inode = None
+
+        self._load_snapshot()
+        if self.write_log:
+            self._replay_log(truncate_incomplete=True)
+        if self.flush_interval_ms != 0:
+            atexit.register(_flush_at_exit, weakref.ref(self))
+        self._init_metrics(metrics)
+
+    def _storage_file_signature(self) -> Optional[tuple[int, int, int]]:
+        try:
+            stat = os.stat(self.storage_path)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+    def _load_snapshot(self, *, keep_on_error: bool = False):
         try:
-            if os.path.isfile("kv_storage.json"):
-                with open("kv_storage.json") as file:
+            signature = self._storage_file_signature()
+            if signature is not None:
+                with open(self.storage_path) as file:
                     json_string = file.read()
                     json_dict = json.loads(json_string)
                     self.storage = {key: json.dumps(value) for key, value in json_dict.items()}
+                self._read_cache.clear()
+                self._documents.clear()
+                self._stale_documents.clear()
+                self._rebuild_tag_indexes()
+            self._storage_signature = signature
         except json.decoder.JSONDecodeError as e:
             print("Keepvariable error, json loading failed - check whether json data is not corrupt: "+str(e))
-            self.storage={}
+            if not keep_on_error:
+                self.storage={}
+                self._read_cache.clear()
+                self._documents.clear()
+                self._stale_documents.clear()
+                self._rebuild_tag_indexes()
+
+    def _index_record(self, name: str):
+        """Update sorted key index and tag indexes after the value of a key was changed or deleted."""
+        if self._sorted_keys is not None:
+            position = bisect.bisect_left(self._sorted_keys, name)
+            is_indexed = position < len(self._sorted_keys) and self._sorted_keys[position] == name
+            if name in self.storage and not is_indexed:
+                self._sorted_keys.insert(position, name)
+            elif name not in self.storage and is_indexed:
+                del self._sorted_keys[position]
+
+        for index_key, tag in self._tag_index_entries.pop(name, ()):
+            names = self._tag_index[index_key][tag]
+            names.pop(name, None)
+            if not names:
+                del self._tag_index[index_key][tag]
+
+        entity_keys = [entity_key for entity_key in self.tag_indexes if entity_key in name]
+        if not entity_keys or name not in self.storage:
+            return
+        record = self._documents[name] if name in self._documents else self.decode_loaded_value(self.storage[name])
+        if not isinstance(record, dict):
+            return
+
+        entries = []
+        for entity_key in entity_keys:
+            for field in self.tag_indexes[entity_key]:
+                tag = record.get(field)
+                # Same condition as in the unindexed TAG search - empty values never match
+                if not tag or not isinstance(tag, Hashable):
+                    continue
+                self._tag_index.setdefault((entity_key, field), {}).setdefault(tag, {})[name] = None
+                entries.append(((entity_key, field), tag))
+        if entries:
+            self._tag_index_entries[name] = entries
+
+    def _begin_batch_update(self, size: int):
+        if size > 256:
+            self._sorted_keys = None  # Sorting all keys again on the next scan is cheaper than inserting one by one
+
+    def _rebuild_tag_indexes(self):
+        self._sorted_keys = None
+        self._tag_index.clear()
+        self._tag_index_entries.clear()
+        if self.tag_indexes:
+            for name in self.storage:
+                self._index_record(name)
+
+    def _refresh_from_disk(self):
+        """Reload storage if it was changed on disk by another process since it was last synced."""
+        if self.write_log:
+            self._replay_log()
+        # Unflushed changes would be lost by reloading, they overwrite the file when flushed instead
+        elif self._storage_file_signature() != self._storage_signature and not self._unflushed:
+            self._load_snapshot(keep_on_error=True)
+
+    def _document(self, name: str) -> Any:
+        """Return live decoded JSON document, decoding it only on first access."""
+        if name in self._documents:
+            return self._documents[name]
+        if name in self._read_cache:
+            json_obj = self._read_cache.pop(name)
+        else:
+            json_obj = self.decode_loaded_value(self.storage[name]) if name in self.storage else {}
+        if isinstance(json_obj, (dict, list)) and name in self.storage:
+            self._documents[name] = json_obj
+        return json_obj
+
+    def _document_changed(self, name: str, json_obj: Any):
+        if name not in self.storage:  # New keys are serialized right away, key listings rely on self.storage
+            self.storage[name] = self.parse_saved_value(json_obj)
+        self._documents[name] = json_obj
+        self._stale_documents.add(name)
+        self._read_cache.pop(name, None)
+        self._index_record(name)
+
+    def _value_replaced(self, key: str):
+        """Forget live document and cached decoded value of a key, whose serialized value was replaced or deleted."""
+        self._documents.pop(key, None)
+        self._stale_documents.discard(key)
+        self._read_cache.pop(key, None)
+        self._index_record(key)
+
+    def _serialize_documents(self):
+        """Serialize changed live documents into self.storage."""
+        for name in self._stale_documents:
+            if name in self._documents:
+                self.storage[name] = self.parse_saved_value(self._documents[name])
+        self._stale_documents.clear()
+
+    def _persist(self, keys: Iterable[str], record: dict):
+        """Write a change of 'keys' to the file according to flush_interval_ms, 'record' is its write log record."""
+        if self.flush_interval_ms == 0:
+            if self.write_log:
+                self._append_log_record(record)
+            else:
+                self._write_storage_file()
+        else:
+            self._unflushed.update(keys)
+            self._flush_if_due()
+
+    def _flush_if_due(self):
+        if (
+            self._unflushed and self.flush_interval_ms is not None and
+            (time.monotonic() - self._last_flush) * 1000 >= self.flush_interval_ms
+        ):
+            self.flush()
+
+    @_synchronized
+    def flush(self):
+        """Write changes which were not written yet (see flush_interval_ms) to the file, only changed keys are serialized."""
+        self._serialize_documents()
+        if self._unflushed:
+            if self.write_log:
+                values = {key: self.storage[key] for key in self._unflushed if key in self.storage}
+                deleted_keys = [key for key in self._unflushed if key not in self.storage]
+                if values:
+                    self._append_log_record({"op": "mset", "values": values})
+                if deleted_keys:
+                    self._append_log_record({"op": "delete", "keys": deleted_keys})
+            else:
+                self._write_storage_file()
+            self._unflushed.clear()
+        self._last_flush = time.monotonic()
+
+    def _write_storage_file(self):
+        """Rewrite the whole storage file from self.storage (used when write_log is disabled)."""
+        self._serialize_documents()
+        with open(self.storage_path, "w") as file:
+            file.write(self._snapshot_json())
+        self._storage_signature = self._storage_file_signature()
+
+    def _snapshot_json(self) -> str:
+        """Return the snapshot file content - JSON object of all keys, _load_snapshot() reads it back."""
+        return "{" + ", ".join(
+            f"{json.dumps(key)}: {_snapshot_entry(value)}" for key, value in self.storage.items()
+        ) + "}"
+
+    def _path_state_record(self, name: str, json_obj: Any, path: str) -> dict:
+        """Return write log record setting the elements a path points to to their current values.
+
+        Records hold resulting values, not deltas (appended objects, increments), so that a record applied again
+        does not change the document - see compact() and _append_log_record().
+        """
+        compiled_path = compile_json_path(path)
+        if compiled_path.steps and not compiled_path.has_wildcard:
+            return {"op": "json_mset", "key": name, "params": {path: compiled_path.get(json_obj)[0]}}
+        # Elements matched by a wildcard may differ, the whole document is written instead
+        return {"op": "set", "key": name, "value": self.parse_saved_value(json_obj)}
+
+    def _apply_log_record(self, record: dict):
+        op = record["op"]
+        if op == "set":
+            self.storage[record["key"]] = record["value"]
+            self._value_replaced(record["key"])
+        elif op == "delete":
+            self._begin_batch_update(len(record["keys"]))
+            for name in record["keys"]:
+                self.storage.pop(name, None)
+                self._value_replaced(name)
+        elif op == "mset":
+            self._begin_batch_update(len(record["values"]))
+            self.storage.update(record["values"])
+            for key in record["values"]:
+                self._value_replaced(key)
+        elif op == "json_mset":
+            name = record["key"]
+            self._document_changed(name, apply_json_params(self._document(name), record["params"]))
+        elif op == "arrappend":  # Written by older versions, replayed twice it appends the objects twice
+            name = record["key"]
+            json_obj = self._document(name)
+            self._extend_arrays(json_obj, record["path"], record["objects"])
+            self._document_changed(name, json_obj)
+        elif op == "json_incr":  # Written by older versions, replayed twice it increments twice
+            name = record["key"]
+            json_obj = self._document(name)
+            increment_json_values(json_obj, record["path"], record["amount"])
+            self._document_changed(name, json_obj)
+
+    def _replay_log(self, truncate_incomplete: bool = False):
+        """Apply records of the write log which were not applied yet.
+
+        Only complete (newline terminated and decodable) records are applied. With truncate_incomplete,
+        a partially written record at the end of the log (e.g. after a crash) is truncated away.
+        """
+        try:
+            stat = os.stat(self.log_path)
+        except FileNotFoundError:
+            self._log_offset = 0
+            self._log_inode = None
+            return
+        if stat.st_ino == self._log_inode and stat.st_size == self._log_offset:
+            return  # Nothing new was appended
+
+        with open(self.log_path, "rb+") as file:
+            stat = os.fstat(file.fileno())
+            if stat.st_ino != self._log_inode or stat.st_size < self._log_offset:
+                # Log was compacted (or replaced) in the meantime - snapshot contains the applied records
+                if self._log_inode is not None:
+                    self._load_snapshot(keep_on_error=True)
+                self._log_offset = 0
+                self._log_inode = stat.st_ino
+
+            file.seek(self._log_offset)
+            data = file.read()
+
+            offset = self._log_offset
+            for line in data.splitlines(keepends=True):
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    break
+                self._apply_log_record(record)
+                offset += len(line)
+
+            if truncate_incomplete and offset < stat.st_size:
+                print(f"Keepvariable warning, incomplete record at the end of '{self.log_path}' was discarded")
+                file.truncate(offset)
+            self._log_offset = offset
+
+    def _append_log_record(self, record: dict):
+        """Append one record to the write log, compact the log if it exceeds the size threshold."""
+        data = (json.dumps(record) + "\n").encode("utf8")
+        with open(self.log_path, "ab") as file:
+            stat = os.fstat(file.fileno())
+            file.write(data)
+            file.flush()
+            if self.log_fsync:
+                os.fsync(file.fileno())
+
+        if self._log_inode is None:  # Log file was just created
+            self._log_inode = stat.st_ino
+        if stat.st_ino == self._log_inode and stat.st_size == self._log_offset:
+            # Nobody else appended since the last replay, the record does not need to be replayed
+            self._log_offset += len(data)
+        # Otherwise the record is replayed after the records of other processes - it is already applied,
+        # but records set resulting values, so applying it again keeps the same order of changes as in the log
+
+        if self._log_offset >= self.log_compaction_threshold:
+            self.compact()
+
+    @_synchronized
+    def compact(self):
+        """Write the whole storage into the snapshot file atomically and truncate the write log."""
+        if self.write_log:
+            self._replay_log()
+        self._serialize_documents()
+
+        temp_path = self.storage_path + ".tmp"
+        with open(temp_path, "w") as file:
+            file.write(self._snapshot_json())
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(temp_path, self.storage_path)
+
+        # After a crash between the two replaces, the records are replayed on top of the snapshot which already
+        # contains them - records set resulting values, so applying them again does not change the storage.
+        # The log is replaced, not truncated, so that other processes notice the compaction by inode change.
+        if self.write_log:
+            with open(temp_path, "wb"):
+                pass
+            os.replace(temp_path, self.log_path)
+            self._log_inode = os.stat(self.log_path).st_ino
+            self._log_offset = 0
+        self._unflushed.clear()  # The snapshot contains all changes
 
     def lock(self, *args, **kwargs) -> RedisLock:
         """Create a fake lock, which does nothing but allows KeepVariableDummyRedisServer to conform to the interface."""
@@ -376,56 +1335,81 @@ class KeepVariableDummyRedisServer(AbstractKeepVariableServer):
     def pipeline(self, *args, **kwargs) -> RedisPipeline:
         raise NotImplementedError("Pipelining operations is not available for DummyRedisServer")
 
+    @_synchronized
     def set(self, key: str, value: Any, additional_params: Optional[dict] = None,
             **kwargs) -> dict[str, str]:
         additional_params = {} if additional_params is None else additional_params
+        if self._should_chunk(value):
+            return self._set_chunked(key, value, additional_params)
+        old_chunk_keys = self._find_chunk_keys((key,))
 
         value = self.parse_saved_value(value, additional_params)
         self.storage[key] = value
+        self._value_replaced(key)
+        self._persist((key,), {"op": "set", "key": key, "value": value})
 
-        with open("kv_storage.json", "w") as file:
-            
-            json_key_value_pairs=[]
-            for key, value in self.storage.items():
-                if "screenshot" in key: #Temporary hotfix - TODO: solve properly!
-                    json_key_value_pairs.append(f'"{key}": "{value}"')
-                else:
-                    json_key_value_pairs.append(f'"{key}": {value}')
-            final_json = "{" + ", ".join(
-                json_key_value_pairs
-                #f'"{key}": {value}' for key, value in self.storage.items()
-            ) + "}"
-            file.write(final_json)
-
+        if old_chunk_keys:  # Chunked DataFrame was overwritten by a plain value
+            self._discard_chunks(old_chunk_keys)
         return {key: value}
 
+    def _find_chunk_keys(self, names: tuple[str, ...]) -> list[str]:
+        return [
+            chunk_key for name in names if ChunkedDataFrameManifest.is_manifest_value(self.storage.get(name))
+            for chunk_key in self._get_stored(name).chunk_keys
+        ]
+
     def get(self, key: str) -> Union[dict, pd.DataFrame, np.ndarray, datetime.datetime]:
-        
-        encoded_value = None
-        try:
-            if os.path.isfile("kv_storage.json"):
-                with open("kv_storage.json") as file:
-                    json_string = file.read()
-                    json_dict = json.loads(json_string)
-                    stored_value = json_dict.get(key)
-                    encoded_value=json.dumps(stored_value)
-                    
-        except json.decoder.JSONDecodeError as e:
-            print("Keepvariable error in get(), json loading failed - check whether json data is not corrupt: "+str(e))
-        
-        if encoded_value is not None:
-            decoded_value = self.decode_loaded_value(encoded_value)
-        
-            
-        else:
-            value = self.storage.get(key)
-            # Do not move this condition to decode_loaded_value(), it only deals with missing keys
-            if value is None:
-                return None
-    
-            decoded_value = self.decode_loaded_value(value)
+        if self.check_disk:
+            self._refresh_from_disk()  # Only re-reads the file if another process changed it
+        self._flush_if_due()
+        return self._assemble_chunks(key, self._get_stored(key))
+
+    def _get_stored(self, key: str) -> Optional[Any]:
+        # Live documents and cached values are returned as copies, so that mutations do not leak into the store
+        if key in self._documents:
+            return copy_mutable_value(self._documents[key])
+        if key in self._read_cache:
+            return copy_mutable_value(self._read_cache[key])
+
+        value = self.storage.get(key)
+        # Do not move this condition to decode_loaded_value(), it only deals with missing keys
+        if value is None:
+            return None
+
+        decoded_value = self.decode_loaded_value(value)
+        if self.read_cache:
+            self._read_cache[key] = decoded_value
+            return copy_mutable_value(decoded_value)
         return decoded_value
 
+    @_synchronized
+    def mset(self, mapping: dict[str, Any], additional_params: Optional[dict] = None,
+             **kwargs) -> dict[str, str]:
+        """Set multiple keys with a single write of the storage file (or a single write log record).
+
+        :param mapping: key to value mapping
+        :type mapping: dict[str, Any]
+        :param additional_params: additional serialization parameters applied to every value, defaults to None
+        :type additional_params: Optional[dict], optional
+        :return: key to serialized value mapping
+        :rtype: dict[str, str]
+        """
+        values = {key: self.parse_saved_value(value, additional_params) for key, value in mapping.items()}
+        self._begin_batch_update(len(values))
+        self.storage.update(values)
+        for key in values:
+            self._value_replaced(key)
+        self._persist(values, {"op": "mset", "values": values})
+
+        return values
+
+    def mget(self, keys: list[str], **kwargs) -> list[Optional[Any]]:
+        if self.check_disk:
+            self._refresh_from_disk()
+        self._flush_if_due()
+        return [self._assemble_chunks(key, self._get_stored(key)) for key in keys]
+
+    @_synchronized
     def json_mset(self, name: str, params: dict, *args, **kwargs) -> None:
         """Set multiple keys in a JSON document.
 
@@ -439,18 +1423,39 @@ class KeepVariableDummyRedisServer(AbstractKeepVariableServer):
         e.g.
         params = {"$.is_saved"=true, "$.status"=SomeEnum.COMPLETED.value}
         """
-        json_obj = self.decode_loaded_value(self.storage[name]) if name in self.storage else {}
+        # The live document is updated in place, write log gets only the changed paths, not the whole document
+        self._document_changed(name, apply_json_params(self._document(name), params))
+        self._persist((name,), {"op": "json_mset", "key": name, "params": params})
 
-        for json_path, value in params.items():
-            element, final_key = access_element_by_path(json_obj, json_path)
-            if element is None:
-                json_obj = value
-            elif final_key is None:
-                element = value
-            else:
-                element[final_key] = value
+    @_synchronized
+    def json_mset_if(self, name: str, params: dict[str, Any], conditions: dict[str, Any]) -> bool:
+        """Set multiple paths in a JSON document only if it matches all 'conditions', see AbstractKeepVariableServer.
 
-        self.set(name, json_obj)
+        Atomic against other threads of this process - all writes of the server hold the same lock.
+        """
+        conditions = normalize_json_conditions(conditions)
+        if self.check_disk:
+            self._refresh_from_disk()
+        if name not in self.storage or not json_conditions_match(self._document(name), conditions):
+            return False
+        self.json_mset(name, params)
+        return True
+
+    @_synchronized
+    def json_incr(self, name: str, path: str, amount: Union[int, float] = 1) -> Optional[Union[int, float]]:
+        if self.check_disk:
+            self._refresh_from_disk()
+        json_obj = self._document(name)
+        try:
+            new_value = increment_json_values(json_obj, path, amount)
+        except IncorrectPathError as e:
+            raise AssertionError("Nested object does not exist - most probably due to incorrect path arg") from e
+        if new_value is None and name not in self.storage:  # Nothing matched, no document is created
+            return None
+
+        self._document_changed(name, json_obj)
+        self._persist((name,), self._path_state_record(name, json_obj, path))
+        return new_value
 
     def query(
         self,
@@ -469,8 +1474,11 @@ class KeepVariableDummyRedisServer(AbstractKeepVariableServer):
 
         :param text_params: key name to a tuple of values mapping, e.g. {'status': ('pipel', ...), ...}
         :type text_params: dict[str, tuple]
-        :param tag_params: key name to a tuple of values mapping, e.g. {'status': ('QUEUED', ...), ...}
+        :param tag_params: key name to a tuple of values mapping, e.g. {'status': ('QUEUED', ...), ...}.
+        Fields listed in tag_indexes of the entity are resolved from the in-memory index
         :type tag_params: dict[str, tuple]
+        :param entity_key: substring of key names of the queried records - e.g. "jobs"
+        :type entity_key: str
         :param field_to_sort_by: attribute name by which results should be sorted
         :type field_to_sort_by: str
         :param asc: True if sort in ascending order, defaults to True
@@ -487,113 +1495,337 @@ class KeepVariableDummyRedisServer(AbstractKeepVariableServer):
 
         if ignored_keywords is None:
             ignored_keywords = ["index", "pk", "lock"]
+        if self.check_disk:
+            self._refresh_from_disk()
+        self._serialize_documents()  # Records are decoded from self.storage, results are not shared with it
+
+        tag_params = {} if tag_params is None else tag_params
+        indexed_fields = [field for field in tag_params if field in self.tag_indexes.get(entity_key, ())]
+        if indexed_fields:
+            # Only records with matching tags are decoded
+            record_names = None
+            for field in indexed_fields:
+                tag_index = self._tag_index.get((entity_key, field), {})
+                matching_names = {}
+                for value in tag_params[field]:
+                    matching_names.update(tag_index.get(value, {}))
+                if record_names is None:
+                    record_names = matching_names
+                else:
+                    record_names = {name: None for name in record_names if name in matching_names}
+
+            if len(record_names) > 1:
+                # Storage order, like the unindexed search - pagination and ties of sorting depend on it
+                record_names = [name for name in self.storage if name in record_names]
+            found_records: list[tuple[str, dict]] = [
+                (record_name, self.decode_loaded_value(self.storage[record_name]))
+                for record_name in record_names
+                if not occurence_of_ignored_keywords(record_name, ignored_keywords)
+            ]
+        else:
+            found_records: list[tuple[str, dict]] = [
+                (record_name, self.decode_loaded_value(value))
+                for record_name, value in self.storage.items() if entity_key in record_name and
+                not occurence_of_ignored_keywords(record_name, ignored_keywords)
+            ]  # e.g. [('jobs:43', job_dict), ...]
+
+        unindexed_tag_params = {field: values for field, values in tag_params.items() if field not in indexed_fields}
+        return filter_query_records(
+            found_records, unindexed_tag_params, text_params, field_to_sort_by, asc, paginate
+        )
 
-        found_records: list[tuple[str, dict]] = [
-            (record_name, self.decode_loaded_value(value))
-            for record_name, value in self.storage.items() if entity_key in record_name and
-            not occurence_of_ignored_keywords(record_name, ignored_keywords)
-        ]  # e.g. [('jobs:43', job_dict), ...]
-
-        # TAG search
-        if tag_params is not None:
-            for field, values in tag_params.items():
-                found_records = [
-                    (record_id, record) for record_id, record in found_records
-                    if record.get(field) and record.get(field) in values
-                ]
-
-        # TEXT search
-        if text_params is not None:
-            for field, values in text_params.items():
-                for value in values:
-                    # E.g. value = "QUEU", job.get(field) = "QUEUED"
-                    found_records = {
-                        (record_id, record) for record_id, record in found_records
-                        if record.get(field) and value in record.get(field)
-                    }
-
-        if field_to_sort_by:
-            found_records = sorted(found_records, key=lambda x: x[1][field_to_sort_by])
-            if not asc:
-                found_records.reverse()
-        if paginate:
-            start = paginate[0]
-            end = paginate[0] + paginate[1]
-            found_records = found_records[start:end]
+    def iter_query(
+        self,
+        *,
+        text_params: Optional[dict[str, tuple]] = None,
+        tag_params: Optional[dict[str, tuple]] = None,
+        entity_key: str,
+        index_name: str = "index",
+        field_to_sort_by: Optional[str] = None,
+        asc=True,
+        page_size: int = 1000,
+        return_fields: Optional[list[str]] = None,
+        ignored_keywords: list[str] = None,
+        **kwargs,
+    ) -> Iterator[tuple[str, dict]]:
+        """Iterate over query() results, see AbstractKeepVariableServer.iter_query().
 
-        return dict(found_records)
+        Records are held in memory already, so they are matched at once and page_size is not used.
+        """
+        found_records = self.query(
+            text_params=text_params, tag_params=tag_params, entity_key=entity_key, index_name=index_name,
+            field_to_sort_by=field_to_sort_by, asc=asc, ignored_keywords=ignored_keywords
+        )
+        for record_name, record in found_records.items():
+            yield record_name, record if return_fields is None else project_record(record, return_fields)
 
     def arrlen(self, name: str, path: str, **kwargs) -> Optional[int]:
         try:
-            json_obj = self.decode_loaded_value(self.storage[name]) if name in self.storage else {}
+            json_obj = self._document(name)
 
-            element, final_key = access_element_by_path(json_obj, path)
-            if element is None:
-                return len(json_obj)
-            elif final_key is None:
-                return len(element)
-            else:
-                return len(element[final_key])
+            arrays = compile_json_path(path).get(json_obj)  # More arrays match a path with wildcards
+            return len(arrays[-1]) if arrays else None
         except (KeyError, IndexError) as e:
             raise AssertionError(
                 "Nested object does not exist - most probably due to incorrect path arg"
             ) from e
 
+    @_synchronized
     def arrappend(self, name: str, path: str, objects: Iterable, **kwargs) -> Optional[int]:
+        objects = list(objects)
         try:
-            json_obj = self.decode_loaded_value(self.storage[name]) if name in self.storage else {}
-
-            element, final_key = access_element_by_path(json_obj, path)
-            if element is None:
-                json_obj.extend(objects)
-                array_length = len(json_obj)
-            elif final_key is None:
-                element.extend(objects)
-                array_length = len(element)
-            else:
-                element[final_key].extend(objects)
-                array_length = len(element[final_key])
+            json_obj = self._document(name)
+            array_length = self._extend_arrays(json_obj, path, objects)
         except (KeyError, IndexError) as e:
             raise AssertionError(
                 "Nested object does not exist - most probably due to incorrect path arg"
             ) from e
 
-        self.set(name, json_obj)
+        self._document_changed(name, json_obj)
+        self._persist((name,), self._path_state_record(name, json_obj, path))
         return array_length
 
+    @staticmethod
+    def _extend_arrays(json_obj: Any, path: str, objects: list) -> Optional[int]:
+        arrays = compile_json_path(path).get(json_obj)  # More arrays match a path with wildcards
+        for array in arrays:
+            array.extend(objects)
+        return len(arrays[-1]) if arrays else None
+
     def scan(self, match_string: str, *args, **kwargs) -> list[str]:
         """Find saved keys, matching their name with a given glob-style pattern. This command does not block the server, as it is based on a cursor-style iterator.
 
         :param match_string: string pattern to match keys against, e.g. 'jobs:*'
         :type match_string: str
-        :return: list of found key names
+        :return: list of found key names, sorted
         :rtype: list[str]
         """
-        # Convert glob-style pattern to regex
-        match_pattern = match_string.replace("*", ".*").replace("?", ".")
-        results = [key for key in self.storage.keys() if re.search(match_pattern, key)]
-        return results
+        return list(self.scan_iter(match_string))
+
+    def scan_iter(self, match_string: str, *args, **kwargs) -> Iterator[str]:
+        """Yield saved keys matching a glob-style pattern (same semantics as Redis SCAN MATCH) in sorted order.
 
+        Keys are looked up in a sorted index, so patterns with a literal prefix like 'jobs:*' only visit
+        keys starting with 'jobs:'. Keys are taken from the index at the time of the call.
+
+        :param match_string: string pattern to match keys against, e.g. 'jobs:*'
+        :type match_string: str
+        """
+        if self.check_disk:
+            self._refresh_from_disk()
+
+        prefix, is_literal = split_glob_prefix(match_string)
+        if is_literal:
+            if prefix in self.storage:
+                yield prefix
+            return
+
+        if self._sorted_keys is None:
+            self._sorted_keys = sorted(self.storage)
+        start = bisect.bisect_left(self._sorted_keys, prefix)
+        end = len(self._sorted_keys)
+        if prefix:
+            # The smallest string greater than all strings starting with the prefix
+            end = bisect.bisect_left(self._sorted_keys, prefix[:-1] + chr(ord(prefix[-1]) + 1), start)
+
+        pattern = compile_glob(match_string)
+        for key in self._sorted_keys[start:end]:
+            if pattern.fullmatch(key):
+                yield key
+
+    @_synchronized
     def delete(self, *names: str, **kwargs) -> int:
-        return sum(1 for name in names if self.storage.pop(name, None))
+        # Chunks of chunked DataFrames are deleted together with their manifest
+        chunk_keys = self._find_chunk_keys(names)
+        deleted_count = sum(1 for name in names if self.storage.pop(name, None))
+        for chunk_key in chunk_keys:
+            self.storage.pop(chunk_key, None)
+        names = names + tuple(chunk_keys)
+
+        self._begin_batch_update(len(names))
+        for name in names:
+            self._value_replaced(name)
+        if deleted_count or chunk_keys:
+            self._persist(names, {"op": "delete", "keys": list(names)})
+        return deleted_count
+
+
+def _flush_at_exit(server_ref: weakref.ref):
+    server = server_ref()
+    if server is not None:
+        server.flush()
+
+
+# Values of string keys and RedisJSON documents in one round trip - GET fails with WRONGTYPE on a JSON document,
+# which is then read by JSON.GET. Returns the values in the order of KEYS, nil for missing keys.
+GET_VALUES_SCRIPT = """
+local result = {}
+for i, key in ipairs(KEYS) do
+    local value = redis.pcall('GET', key)
+    if type(value) == 'table' and value['err'] then
+        value = redis.pcall('JSON.GET', key, '.')
+        if type(value) == 'table' and value['err'] then
+            value = false
+        end
+    end
+    result[i] = value
+end
+return result
+"""
+
+
+# ARGV[1] is a JSON list of [path, [allowed values]] conditions, then pairs of path and JSON encoded value to set.
+# Returns 1 if the document existed and matched all conditions and was updated, 0 otherwise.
+JSON_MSET_IF_SCRIPT = """
+if redis.call('EXISTS', KEYS[1]) == 0 then
+    return 0
+end
+local conditions = cjson.decode(ARGV[1])
+for _, condition in ipairs(conditions) do
+    local values = cjson.decode(redis.call('JSON.GET', KEYS[1], condition[1]))
+    if #values == 0 then
+        values = {cjson.null}
+    end
+    for _, value in ipairs(values) do
+        local allowed = false
+        for _, allowed_value in ipairs(condition[2]) do
+            if value == allowed_value then
+                allowed = true
+                break
+            end
+        end
+        if not allowed then
+            return 0
+        end
+    end
+end
+for i = 2, #ARGV, 2 do
+    redis.call('JSON.SET', KEYS[1], ARGV[i], ARGV[i + 1])
+end
+return 1
+"""
+
+# JSON.NUMINCRBY which creates a missing element with value ARGV[2] instead of failing, returns a JSON list of new values
+# ARGV: path, amount, path of the parent of the element ('' for paths with wildcards) - see increment_json_values().
+# A missing key is created only for an element of the root object, false (nil reply) means nothing can be created
+JSON_INCR_SCRIPT = """
+local found = redis.call('JSON.GET', KEYS[1], ARGV[1])
+if not found then
+    if ARGV[3] ~= '$' then
+        return ARGV[3] == '' and '[]' or false
+    end
+    redis.call('JSON.SET', KEYS[1], '$', '{}')
+    found = '[]'
+end
+found = cjson.decode(found)
+if ARGV[3] == '' then
+    if #found > 0 then
+        redis.call('JSON.NUMINCRBY', KEYS[1], ARGV[1], ARGV[2])
+    end
+elseif #found > 0 and found[1] ~= cjson.null then
+    redis.call('JSON.NUMINCRBY', KEYS[1], ARGV[1], ARGV[2])
+elseif #found > 0 or redis.call('JSON.TYPE', KEYS[1], ARGV[3])[1] == 'object' then
+    redis.call('JSON.SET', KEYS[1], ARGV[1], ARGV[2])
+else
+    return false
+end
+return redis.call('JSON.GET', KEYS[1], ARGV[1])
+"""
+
+
+def decode_json_incr_reply(reply: Optional[Union[str, bytes]]) -> Optional[Union[int, float]]:
+    """Return the new value from a reply of JSON_INCR_SCRIPT, nil reply means the element can not be created."""
+    if reply is None:
+        raise AssertionError("Nested object does not exist - most probably due to incorrect path arg")
+    new_values = json.loads(reply)
+    new_value = new_values[-1] if new_values else None
+    return new_value if isinstance(new_value, (int, float)) and not isinstance(new_value, bool) else None
 
 
 class KeepVariableRedisServer(AbstractKeepVariableServer):
+    binary_values_supported = True
+    # Chunks of overwritten DataFrames expire after this many seconds, readers of the old manifest can still finish
+    chunk_grace_period: int = 60
+
     def __init__(
         self, host: str = "localhost", port: int = 6379, db: int = 0, username: str = 'default',
-        password: Optional[str] = None
+        password: Optional[str] = None, dataframe_codec: str = "json",
+        client_cache: Optional[ClientSideCache] = None, compression: Optional[str] = None,
+        compression_threshold: int = 64 * 1024, dataframe_chunk_rows: Optional[int] = None,
+        metrics: Optional[MetricsCollector] = None, connection_pool: Optional[KeepVariableConnectionPool] = None,
+        unix_socket_path: Optional[str] = None, **pool_kwargs
     ):
+        """Redis backed KeepVariable store.
+
+        :param dataframe_codec: serialization of DataFrames - 'json', 'arrow', 'parquet' or 'numpy', defaults to 'json'
+        :type dataframe_codec: str
+        :param client_cache: opt-in local cache of values decoded by get(), kept coherent by Redis
+        CLIENT TRACKING invalidations (or by TTL when tracking is not available), defaults to None
+        :type client_cache: Optional[ClientSideCache]
+        :param compression: compress serialized values - 'zlib', 'lz4' or 'zstd', defaults to None (no compression)
+        :type compression: Optional[str]
+        :param compression_threshold: minimal size of a serialized value to be compressed, defaults to 64 kB
+        :type compression_threshold: int
+        :param dataframe_chunk_rows: store DataFrames with more rows as row chunks (pipelined writes,
+        streaming reads by iter_chunks()), defaults to None
+        :type dataframe_chunk_rows: Optional[int]
+        :param metrics: collector of per-operation metrics, see enable_metrics(), defaults to None (disabled)
+        :type metrics: Optional[MetricsCollector]
+        :param connection_pool: pools shared with other servers of the process, connection arguments are ignored
+        then, defaults to None (own pools)
+        :type connection_pool: Optional[KeepVariableConnectionPool]
+        :param unix_socket_path: connect through a unix domain socket instead of host and port, defaults to None
+        :type unix_socket_path: Optional[str]
+        :param pool_kwargs: settings of own pools - max_connections, blocking, socket_timeout, retries, ...,
+        see KeepVariableConnectionPool
+        """
+        if connection_pool is not None and client_cache is not None:
+            raise ValueError("client_cache needs own connection pools, connections of a shared pool are not tracked")
         self.host: str = host
         self.port: int = port
         self.db = db
         self.username: str = username
         self.password: Optional[str] = password
-
-        # Redis instance maintains connection pool internally, additionally it is thread-safe.
-        self.redis = redis.Redis(
-            host=self.host, port=self.port, username=self.username, db=self.db,
-            password=self.password, decode_responses=True, charset="utf-8"
-        )
+        self.dataframe_codec = resolve_dataframe_codec(dataframe_codec)
+        self._init_compression(compression, compression_threshold)
+        self.dataframe_chunk_rows = dataframe_chunk_rows
+        self.client_cache = client_cache
+
+        tracking_kwargs = {}
+        self._invalidation_listener = None
+        if self.client_cache is not None:
+            address_kwargs = (
+                {"connection_class": redis.UnixDomainSocketConnection, "path": unix_socket_path}
+                if unix_socket_path is not None else {"host": self.host, "port": self.port}
+            )
+            listener = RedisInvalidationListener(
+                self.client_cache, username=self.username, db=self.db, password=self.password, **address_kwargs
+            )
+            try:
+                listener.start()
+                self._invalidation_listener = listener
+                # Every new pooled connection turns tracking on, invalidations are redirected to the listener
+                tracking_kwargs["redis_connect_func"] = listener.enable_tracking
+            except redis.exceptions.RedisError as e:  # e.g. Redis < 6.0
+                print(f"Keepvariable warning, CLIENT TRACKING is not available, client cache entries expire by TTL: {e}")
+                listener.stop()
+
+        self._owns_connection_pool = connection_pool is None
+        if connection_pool is None:
+            connection_pool = KeepVariableConnectionPool(
+                host=self.host, port=self.port, db=self.db, username=self.username, password=self.password,
+                unix_socket_path=unix_socket_path, **pool_kwargs, **tracking_kwargs
+            )
+        self.connection_pool = connection_pool
+        # Redis instances are thread-safe, commands take connections from the pools
+        self.redis = redis.Redis(connection_pool=connection_pool.text_pool)
+        # Values are read as raw bytes, binary payloads cannot be decoded as utf-8
+        self.redis_binary = redis.Redis(connection_pool=connection_pool.binary_pool)
+        # Sent by EVALSHA (EVAL on the first call), None once scripting turned out to be disabled on the server
+        self._get_values_script = self.redis_binary.register_script(GET_VALUES_SCRIPT)
+        self._json_mset_if_script = self.redis.register_script(JSON_MSET_IF_SCRIPT)
+        self._json_incr_script = self.redis.register_script(JSON_INCR_SCRIPT)
+        self._init_metrics(metrics)
 
     @property
     def kept_variables(self):
@@ -611,33 +1843,169 @@ class KeepVariableRedisServer(AbstractKeepVariableServer):
         """Create a Redis Pipeline object, which can be used to execute multiple commands atomically."""
         return self.redis.pipeline(transaction=transaction)
 
+    def pool_stats(self) -> dict[str, dict[str, Optional[int]]]:
+        """Return numbers of created, used and idle connections of the pools, see KeepVariableConnectionPool.stats()."""
+        return self.connection_pool.stats()
+
+    def close(self):
+        """Stop the invalidation listener of client_cache and close connections of own pools.
+
+        A connection_pool shared with other servers is left open, call its disconnect() when none of them is used.
+        """
+        if self._invalidation_listener is not None:
+            self._invalidation_listener.stop()
+            self._invalidation_listener = None
+        if self._owns_connection_pool:
+            self.connection_pool.disconnect()
+
+    def __enter__(self) -> "KeepVariableRedisServer":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
     def set(
         self, key: str, value: str, additional_params: Optional[dict] = None, *,
         pipeline: Optional[RedisPipeline] = None
     ):
         if additional_params is None:
             additional_params = {}
+        if self._should_chunk(value):
+            return self._set_chunked(key, value, additional_params, pipeline=pipeline)
+        # With chunking enabled, a plain value may overwrite a chunked DataFrame - costs one extra round trip
+        old_chunk_keys = self._find_chunk_keys((key,)) if self.dataframe_chunk_rows is not None else []
 
         value = self.parse_saved_value(value, additional_params)
 
+        self._invalidate_cached(key)
         if pipeline:
-            return pipeline.set(key, value)
+            result = pipeline.set(key, value)
         else:
-            return self.redis.set(key, value)
+            result = self.redis.set(key, value)
+
+        if old_chunk_keys:
+            self._discard_chunks(old_chunk_keys, pipeline=pipeline)
+        return result
+
+    def _invalidate_cached(self, *keys: str):
+        if self.client_cache is not None:
+            self.client_cache.invalidate(*keys)
 
     def get(self, key: str) -> Optional[Any]:
-        try:
-            value = self.redis.get(key)
-
-            # Do not move this condition to decode_loaded_value(), it only deals with missing keys
-            if value is None:
-                return value
-            decoded_value = self.decode_loaded_value(value)
-        # Raised when trying to get JSON document in Redis. JSON documents have their own get method
-        except redis.exceptions.ResponseError:
-            decoded_value = self.redis.json().get(key)
+        return self._assemble_chunks(key, self._get_stored(key))
+
+    def _get_stored(self, key: str) -> Optional[Any]:
+        token = None
+        if self.client_cache is not None:
+            found, cached_value = self.client_cache.get(key)
+            if found:
+                return cached_value
+            token = self.client_cache.begin_read(key)
+
+        ((decoded_value, size),) = self._fetch_values([key])
+        if self.client_cache is not None and decoded_value is not None:
+            self.client_cache.put(key, decoded_value, size, token)
+            return copy_mutable_value(decoded_value)  # The cached object itself is never handed out
         return decoded_value
 
+    def _fetch_values(self, keys: list[str]) -> list[tuple[Optional[Any], int]]:
+        """Read and decode values of string keys and JSON documents (can be mixed) in one round trip.
+
+        :return: (decoded value or None for missing keys, size of the stored value) for every key
+        :rtype: list[tuple[Optional[Any], int]]
+        """
+        if self._get_values_script is not None:
+            try:
+                reply = self._get_values_script(keys=keys)
+            except redis.exceptions.ResponseError as e:  # e.g. scripting disabled by ACL or a managed service
+                print(f"Keepvariable warning, Lua scripting is not available, reading by MGET and JSON.MGET: {e}")
+                self._get_values_script = None
+            else:
+                return [
+                    (None, 0) if value is None else (self.decode_loaded_value(value), len(value))
+                    for value in reply
+                ]
+
+        with self.redis_binary.pipeline(transaction=False) as pipe:
+            pipe.mget(keys)
+            # Raw command - documents are returned as JSON text and decoded by decode_loaded_value() like strings
+            pipe.execute_command("JSON.MGET", *keys, ".")
+            string_values, json_values = pipe.execute(raise_on_error=False)
+        if isinstance(json_values, Exception):  # e.g. RedisJSON module is not loaded
+            json_values = [None] * len(keys)
+
+        values = []
+        for string_value, json_value in zip(string_values, json_values):
+            if string_value is not None:
+                values.append((self.decode_loaded_value(string_value), len(string_value)))
+            elif json_value is not None:
+                values.append((self.decode_loaded_value(json_value), len(json_value)))
+            else:
+                values.append((None, 0))
+        return values
+
+    def mset(
+        self, mapping: dict[str, Any], additional_params: Optional[dict] = None, *,
+        pipeline: Optional[RedisPipeline] = None, chunk_size: int = 1000
+    ) -> Optional[RedisPipeline]:
+        """Set multiple keys. Values are serialized the same way as in set().
+
+        :param mapping: key to value mapping
+        :type mapping: dict[str, Any]
+        :param additional_params: additional serialization parameters applied to every value, defaults to None
+        :type additional_params: Optional[dict], optional
+        :param pipeline: pipeline in which operations can be executed in, defaults to None
+        :type pipeline: Optional[RedisPipeline], optional
+        :param chunk_size: number of SET commands sent in one round trip, defaults to 1000
+        :type chunk_size: int, optional
+        :return: return pipeline if passed, otherwise execute the SET commands
+        :rtype: Optional[RedisPipeline]
+        """
+        items = [(key, self.parse_saved_value(value, additional_params)) for key, value in mapping.items()]
+        self._invalidate_cached(*mapping)
+
+        if pipeline:
+            for key, value in items:
+                pipeline.set(key, value)
+            return pipeline
+
+        for chunk in iterate_in_chunks(items, chunk_size):
+            with self.redis.pipeline(transaction=False) as pipe:
+                for key, value in chunk:
+                    pipe.set(key, value)
+                pipe.execute()
+
+    def mget(self, keys: list[str], *, chunk_size: int = 1000) -> list[Optional[Any]]:
+        """Get values of multiple keys in the order of 'keys'. String and JSON document keys can be mixed.
+
+        Each chunk of keys costs one round trip - a Lua script reads strings by GET and JSON documents by JSON.GET.
+        Without scripting, MGET and JSON.MGET are pipelined together and JSON.MGET result is used for the keys
+        which are not strings.
+
+        :param keys: names of the keys
+        :type keys: list[str]
+        :param chunk_size: number of keys fetched in one round trip, defaults to 1000
+        :type chunk_size: int, optional
+        :return: decoded values, None for missing keys
+        :rtype: list[Optional[Any]]
+        """
+        values = []
+        for chunk in iterate_in_chunks(list(keys), chunk_size):
+            values.extend(value for value, size in self._fetch_values(chunk))
+        return [self._assemble_chunks(key, value) for key, value in zip(keys, values)]
+
+    def _discard_chunks(self, chunk_keys: list[str], *, pipeline: Optional[RedisPipeline] = None):
+        self._invalidate_cached(*chunk_keys)
+        if pipeline:
+            for chunk_key in chunk_keys:
+                pipeline.expire(chunk_key, self.chunk_grace_period)
+            return
+
+        with self.redis.pipeline(transaction=False) as pipe:
+            for chunk_key in chunk_keys:
+                pipe.expire(chunk_key, self.chunk_grace_period)
+            pipe.execute()
+
     def json_mset(
         self, name: str, params: dict[str, Any], *, pipeline: Optional[RedisPipeline] = None
     ) -> Optional[RedisPipeline]:
@@ -657,6 +2025,7 @@ class KeepVariableRedisServer(AbstractKeepVariableServer):
         e.g.
         params = {"$.is_saved"=true, "$.status"=SomeEnum.COMPLETED.value}
         """
+        self._invalidate_cached(name)
         if pipeline:
             for json_xpath, value in params.items():
                 pipeline.json().set(name, json_xpath, value)
@@ -667,6 +2036,27 @@ class KeepVariableRedisServer(AbstractKeepVariableServer):
                 pipe.json().set(name, json_xpath, value)
             pipe.execute()
 
+    def json_mset_if(self, name: str, params: dict[str, Any], conditions: dict[str, Any]) -> bool:
+        """Set multiple paths in a JSON document only if it matches all 'conditions', see AbstractKeepVariableServer.
+
+        Conditions are checked and paths are set by one Lua script (EVALSHA) - atomic, one round trip, no lock.
+        """
+        conditions = normalize_json_conditions(conditions)
+        encoded_conditions = json.dumps([[to_jsonpath(path), list(values)] for path, values in conditions.items()])
+        args = [encoded_conditions]
+        for json_path, value in params.items():
+            args.extend((to_jsonpath(json_path), json.dumps(value)))
+
+        self._invalidate_cached(name)
+        return bool(self._json_mset_if_script(keys=[name], args=args))
+
+    def json_incr(self, name: str, path: str, amount: Union[int, float] = 1) -> Optional[Union[int, float]]:
+        self._invalidate_cached(name)
+        reply = self._json_incr_script(
+            keys=[name], args=[to_jsonpath(path), json.dumps(amount), parent_json_path(path) or ""]
+        )
+        return decode_json_incr_reply(reply)
+
     def query(
         self, *, text_params: Optional[dict[str, tuple]] = None,
         tag_params: Optional[dict[str, tuple]] = None, entity_key: str, index_name: str = "index",
@@ -693,38 +2083,101 @@ class KeepVariableRedisServer(AbstractKeepVariableServer):
         :return: {'jobs:43': job_dict, ...}
         :rtype: dict[str, Any]
         """
-        final_query = ""
-
-        if text_params is not None:
-            text_query_template = "@{field}:{value}"
-            for field, values in text_params.items():
-                value_str = "|".join(values)
-                final_query += text_query_template.format(field=field, value=value_str)
-
-        if tag_params is not None:
-            tag_query_template = "@{field}:{{{value}}}"
-            for field, values in tag_params.items():
-                value_str = "|".join(values)
-                final_query += tag_query_template.format(field=field, value=value_str)
-
-        # If no query was specified, return all records from the index
-        if final_query == "":
-            final_query = "*"
-
-        # Query example: "@type:PIPEL @status:{QUEUED|COMPLETED}"
-        # Explanation: find all jobs with type field containing 'PIPEL' and status being either 'QUEUED' or 'COMPLETED'
-        query_object = Query(final_query)
-
-        if field_to_sort_by:
-            query_object.sort_by(field_to_sort_by, asc=asc)
-        if paginate:
-            query_object.paging(*paginate)
+        query_object = build_search_query(text_params, tag_params, field_to_sort_by, asc, paginate)
 
         assert len(entity_key) > 0  #entity needs to be specified
         index_key = entity_key + ":" + index_name
         job_docs: list = self.redis.ft(index_key).search(query_object).docs
         return {job_doc.id: self.decode_loaded_value(job_doc.json) for job_doc in job_docs}
 
+    def iter_query(
+        self, *, text_params: Optional[dict[str, tuple]] = None,
+        tag_params: Optional[dict[str, tuple]] = None, entity_key: str, index_name: str = "index",
+        field_to_sort_by: Optional[str] = None, asc=True, page_size: int = 1000,
+        return_fields: Optional[list[str]] = None, **kwargs
+    ) -> Iterator[tuple[str, dict]]:
+        """Stream RedisSearch results, see AbstractKeepVariableServer.iter_query().
+
+        Unsorted results are read through an FT.AGGREGATE cursor, sorted ones page by page with FT.SEARCH LIMIT.
+        With return_fields only the projected JSON paths are transferred and decoded instead of whole documents.
+
+        :param page_size: how many records to fetch in one round trip, defaults to 1000
+        :type page_size: int, optional
+        :param return_fields: field names or JSON paths to return instead of whole records, e.g. ["status", "$.meta.owner"]
+        :type return_fields: Optional[list[str]], optional
+        :return: iterator of (key, record) tuples, e.g. ('jobs:43', {'status': 'QUEUED'})
+        :rtype: Iterator[tuple[str, dict]]
+        """
+        assert len(entity_key) > 0  #entity needs to be specified
+        assert page_size > 0
+        index_key = entity_key + ":" + index_name
+        query_string = build_search_query_string(text_params, tag_params)
+        # Results are loaded under positional aliases, JSON paths are not valid RedisSearch property names
+        json_paths = ["$"] if return_fields is None else [to_jsonpath(field) for field in return_fields]
+        aliases = [f"__field_{i}" for i in range(len(json_paths))]
+
+        def to_record(loaded_fields: dict) -> dict:
+            if return_fields is None:
+                return self.decode_loaded_value(loaded_fields[aliases[0]])
+            return {
+                field: None if loaded_fields.get(alias) is None else self.decode_loaded_value(loaded_fields[alias])
+                for field, alias in zip(return_fields, aliases)
+            }
+
+        if field_to_sort_by:
+            yield from self._iter_query_pages(
+                index_key, query_string, field_to_sort_by, asc, page_size, json_paths, aliases, to_record
+            )
+        else:
+            yield from self._iter_query_cursor(index_key, query_string, page_size, json_paths, aliases, to_record)
+
+    def _iter_query_cursor(
+        self, index_key: str, query_string: str, page_size: int, json_paths: list[str], aliases: list[str],
+        to_record: Callable[[dict], dict]
+    ) -> Iterator[tuple[str, dict]]:
+        """Read FT.AGGREGATE ... WITHCURSOR results, the cursor is deleted if the iteration is abandoned early."""
+        load_args = ["@__key"]
+        for json_path, alias in zip(json_paths, aliases):
+            load_args += [json_path, "AS", alias]
+        request = AggregateRequest(query_string).load(*load_args).cursor(count=page_size)
+
+        search_index = self.redis.ft(index_key)
+        cursor = None
+        try:
+            result = search_index.aggregate(request)
+            while True:
+                cursor = result.cursor
+                for row in result.rows:
+                    loaded_fields = dict(zip(row[::2], row[1::2]))
+                    yield loaded_fields["__key"], to_record(loaded_fields)
+                if cursor is None or not cursor.cid:
+                    return
+                result = search_index.aggregate(cursor)
+        finally:
+            if cursor is not None and cursor.cid:
+                try:
+                    self.redis.execute_command("FT.CURSOR", "DEL", index_key, cursor.cid)
+                except redis.ResponseError:
+                    pass  # Cursor has already expired
+
+    def _iter_query_pages(
+        self, index_key: str, query_string: str, field_to_sort_by: str, asc: bool, page_size: int,
+        json_paths: list[str], aliases: list[str], to_record: Callable[[dict], dict]
+    ) -> Iterator[tuple[str, dict]]:
+        """Read sorted FT.SEARCH results with LIMIT offset page_size until a page comes back incomplete."""
+        search_index = self.redis.ft(index_key)
+        offset = 0
+        while True:
+            query_object = Query(query_string).sort_by(field_to_sort_by, asc=asc).paging(offset, page_size)
+            for json_path, alias in zip(json_paths, aliases):
+                query_object.return_field(json_path, as_field=alias)
+            docs = search_index.search(query_object).docs
+            for doc in docs:
+                yield doc.id, to_record({alias: getattr(doc, alias, None) for alias in aliases})
+            if len(docs) < page_size:
+                return
+            offset += page_size
+
     def arrlen(self, name: str, path: str, *,
                pipeline: Optional[RedisPipeline] = None) -> Union[int, None, RedisPipeline]:
         if pipeline:
@@ -734,6 +2187,7 @@ class KeepVariableRedisServer(AbstractKeepVariableServer):
     def arrappend(
         self, name: str, path: str, objects: Iterable, *, pipeline: Optional[RedisPipeline] = None
     ) -> Union[int, None, RedisPipeline]:
+        self._invalidate_cached(name)
         if pipeline:
             return pipeline.json().arrappend(name, path, *objects)
         return self.redis.json().arrappend(name, path, *objects).pop()
@@ -752,7 +2206,46 @@ class KeepVariableRedisServer(AbstractKeepVariableServer):
         :return: list of found keys
         :rtype: list[str]
         """
-        return list(self.redis.scan_iter(match_string, count, type_))
+        return list(self.scan_iter(match_string, count, type_))
+
+    def scan_iter(self, match_string: str, count: int = 50, type_: Optional[str] = None) -> Iterator[str]:
+        """Yield keys matching a glob-style pattern, one SCAN call is made per 'count' keys visited.
+
+        As with SCAN, a key may be yielded more than once if keys are added or removed during the iteration.
+        """
+        return self.redis.scan_iter(match_string, count, type_)
+
+    def scan_values(
+        self, match_string: str, count: int = 1000, type_: Optional[str] = None
+    ) -> Iterator[tuple[str, Any]]:
+        """Yield (key, value) pairs of keys matching a glob-style pattern, see AbstractKeepVariableServer.scan_values().
+
+        Keys of every SCAN reply are read together by _fetch_values() - string keys and JSON documents can be mixed,
+        so each batch costs the SCAN call and one read round trip. Chunked DataFrames are assembled.
+        """
+        cursor = 0
+        while True:
+            cursor, keys = self.redis.scan(cursor, match_string, count, type_)
+            if keys:
+                for key, (value, size) in zip(keys, self._fetch_values(keys)):
+                    if value is not None:  # Deleted after SCAN returned it
+                        yield key, self._assemble_chunks(key, value)
+            if cursor == 0:
+                return
+
+    def _find_chunk_keys(self, names: tuple[str, ...]) -> list[str]:
+        """Only value prefixes are fetched, values are decoded just for manifests."""
+        prefix_length = len(ChunkedDataFrameManifest.object_type) + 20
+        with self.redis_binary.pipeline(transaction=False) as pipe:
+            for name in names:
+                pipe.getrange(name, 0, prefix_length)
+            prefixes = pipe.execute(raise_on_error=False)  # JSON documents raise WRONGTYPE
+
+        chunk_keys = []
+        for name, prefix in zip(names, prefixes):
+            if isinstance(prefix, bytes) and ChunkedDataFrameManifest.is_manifest_value(prefix.decode("utf-8", "ignore")):
+                chunk_keys.extend(self._get_stored(name).chunk_keys)
+        return chunk_keys
 
     def delete(self, *names: str,
                pipeline: Optional[RedisPipeline] = None) -> Union[int, RedisPipeline]:
@@ -763,6 +2256,16 @@ class KeepVariableRedisServer(AbstractKeepVariableServer):
         :return: number of deleted keys or a pipeline in case it was passed to a function
         :rtype: int | RedisPipeline
         """
+        # Chunks of chunked DataFrames are deleted together with their manifest, but not counted - as on other backends
+        chunk_keys = self._find_chunk_keys(names) if self.dataframe_chunk_rows is not None else []
+        self._invalidate_cached(*names, *chunk_keys)
         if pipeline:
-            return pipeline.delete(*names)
-        return self.redis.delete(*names)
+            return pipeline.delete(*names, *chunk_keys)
+        if not chunk_keys:
+            return self.redis.delete(*names)
+
+        with self.redis.pipeline() as pipe:
+            pipe.delete(*names)
+            pipe.delete(*chunk_keys)
+            deleted_count, _ = pipe.execute()
+        return deleted_count
@@ -0,0 +1,602 @@
+import sqlite3
+import threading
+import time
+import uuid
+from collections.abc import Iterable
+from contextlib import contextmanager
+from typing import Any, Callable, Iterator, Optional, Union
+
+import redis
+
+from keepvariable.instrumentation import MetricsCollector
+from keepvariable.keepvariable_core import AbstractKeepVariableServer, filter_query_records
+from keepvariable.serialization import ChunkedDataFrameManifest, resolve_dataframe_codec
+from keepvariable.utils import (
+    IncorrectPathError,
+    apply_json_params,
+    compile_glob,
+    compile_json_path,
+    increment_json_values,
+    iterate_in_chunks,
+    json_conditions_match,
+    normalize_json_conditions,
+    project_record,
+    split_glob_prefix,
+)
+
+# SQLite limits the number of host parameters in one statement (999 before 3.32)
+SQLITE_MAX_PARAMETERS = 900
+
+
+class SQLitePipeline:
+    """Queue of KeepVariableSQLiteServer operations, mimicking Redis Pipeline.
+
+    Operations are executed by execute() in a single SQLite transaction (or one by one with transaction=False),
+    results are returned in a list in the order of queueing.
+    """
+
+    def __init__(self, server: "KeepVariableSQLiteServer", transaction: bool = True):
+        self.server = server
+        self.transaction = transaction
+        self.command_stack: list[tuple[Callable, tuple, dict]] = []
+
+    def __enter__(self) -> "SQLitePipeline":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.reset()
+
+    def __len__(self) -> int:
+        return len(self.command_stack)
+
+    def queue(self, function: Callable, *args, **kwargs) -> "SQLitePipeline":
+        self.command_stack.append((function, args, kwargs))
+        return self
+
+    def reset(self):
+        self.command_stack = []
+
+    def execute(self) -> list:
+        commands, self.command_stack = self.command_stack, []
+        if not self.transaction:
+            return [function(*args, **kwargs) for function, args, kwargs in commands]
+        with self.server._transaction():
+            return [function(*args, **kwargs) for function, args, kwargs in commands]
+
+
+class SQLiteLock:
+    """Lock shared by all processes using the same database file, with the interface of Redis Lock.
+
+    The lock is a row of the locks table holding a random token. With 'timeout', the lock expires
+    after that many seconds, so a crashed owner does not block others forever.
+    """
+
+    def __init__(
+        self, server: "KeepVariableSQLiteServer", name: str, timeout: Optional[float] = None,
+        sleep: float = 0.1, blocking: bool = True, blocking_timeout: Optional[float] = None
+    ):
+        self.server = server
+        self.name = name
+        self.timeout = timeout
+        self.sleep = sleep
+        self.blocking = blocking
+        self.blocking_timeout = blocking_timeout
+        self.token: Optional[str] = None
+
+    def __enter__(self) -> "SQLiteLock":
+        if self.acquire():
+            return self
+        raise redis.exceptions.LockError("Unable to acquire lock within the time specified")
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.release()
+
+    def acquire(self, blocking: Optional[bool] = None, blocking_timeout: Optional[float] = None) -> bool:
+        blocking = self.blocking if blocking is None else blocking
+        blocking_timeout = self.blocking_timeout if blocking_timeout is None else blocking_timeout
+        token = uuid.uuid4().hex
+        stop_at = None if blocking_timeout is None else time.monotonic() + blocking_timeout
+
+        while True:
+            if self._try_acquire(token):
+                self.token = token
+                return True
+            if not blocking or (stop_at is not None and time.monotonic() > stop_at):
+                return False
+            time.sleep(self.sleep)
+
+    def _try_acquire(self, token: str) -> bool:
+        now = time.time()
+        expires_at = None if self.timeout is None else now + self.timeout
+        with self.server._transaction() as connection:
+            connection.execute(
+                "DELETE FROM kv_locks WHERE name = ? AND expires_at IS NOT NULL AND expires_at <= ?", (self.name, now)
+            )
+            cursor = connection.execute(
+                "INSERT OR IGNORE INTO kv_locks (name, token, expires_at) VALUES (?, ?, ?)",
+                (self.name, token, expires_at)
+            )
+            return cursor.rowcount == 1
+
+    def release(self):
+        if self.token is None:
+            raise redis.exceptions.LockError("Cannot release an unlocked lock")
+        token, self.token = self.token, None
+        with self.server._transaction() as connection:
+            cursor = connection.execute("DELETE FROM kv_locks WHERE name = ? AND token = ?", (self.name, token))
+        if cursor.rowcount == 0:
+            raise redis.exceptions.LockNotOwnedError("Cannot release a lock that's no longer owned")
+
+    def locked(self) -> bool:
+        row = self.server._connection().execute(
+            "SELECT 1 FROM kv_locks WHERE name = ? AND (expires_at IS NULL OR expires_at > ?)", (self.name, time.time())
+        ).fetchone()
+        return row is not None
+
+    def owned(self) -> bool:
+        if self.token is None:
+            return False
+        row = self.server._connection().execute(
+            "SELECT 1 FROM kv_locks WHERE name = ? AND token = ? AND (expires_at IS NULL OR expires_at > ?)",
+            (self.name, self.token, time.time())
+        ).fetchone()
+        return row is not None
+
+
+class KeepVariableSQLiteServer(AbstractKeepVariableServer):
+    """Local KeepVariable store in a SQLite database in WAL mode, safe to share by multiple processes.
+
+    Readers run concurrently with a single writer, every write is a row-level upsert in its own transaction
+    (or in the transaction of a pipeline). Keys are the primary key, so gets and prefix scans are O(log n).
+    """
+
+    binary_values_supported = True
+
+    def __init__(
+        self, storage_path: str = "kv_storage.sqlite", *, busy_timeout: float = 30.0,
+        synchronous: str = "NORMAL", dataframe_codec: str = "json", compression: Optional[str] = None,
+        compression_threshold: int = 64 * 1024, dataframe_chunk_rows: Optional[int] = None,
+        metrics: Optional[MetricsCollector] = None
+    ):
+        """
+        :param storage_path: path of the SQLite database file, defaults to "kv_storage.sqlite"
+        :type storage_path: str
+        :param busy_timeout: how many seconds a write waits for another process holding the write lock, defaults to 30.0
+        :type busy_timeout: float
+        :param synchronous: SQLite synchronous pragma - 'NORMAL' survives process crashes in WAL mode,
+        'FULL' survives also OS crashes, defaults to "NORMAL"
+        :type synchronous: str
+        :param dataframe_codec: serialization of DataFrames - 'json', 'arrow', 'parquet' or 'numpy', defaults to 'json'
+        :type dataframe_codec: str
+        :param compression: compress serialized values - 'zlib', 'lz4' or 'zstd', defaults to None (no compression)
+        :type compression: Optional[str]
+        :param compression_threshold: minimal size of a serialized value to be compressed, defaults to 64 kB
+        :type compression_threshold: int
+        :param dataframe_chunk_rows: store DataFrames with more rows as row chunks, see iter_chunks(), defaults to None
+        :type dataframe_chunk_rows: Optional[int]
+        :param metrics: collector of per-operation metrics, see enable_metrics(), defaults to None (disabled)
+        :type metrics: Optional[MetricsCollector]
+        """
+        if synchronous.upper() not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"Unknown synchronous mode '{synchronous}'")
+        self.storage_path = storage_path
+        self.busy_timeout = busy_timeout
+        self.synchronous = synchronous.upper()
+        self.dataframe_codec = resolve_dataframe_codec(dataframe_codec)
+        self._init_compression(compression, compression_threshold)
+        self.dataframe_chunk_rows = dataframe_chunk_rows
+
+        # sqlite3 connections must not be shared by threads, every thread opens its own
+        self._local = threading.local()
+
+        connection = self._connection()
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS kv_store (key TEXT PRIMARY KEY, value NOT NULL) WITHOUT ROWID"
+        )
+        connection.execute(
+            "CREATE TABLE IF NOT EXISTS kv_locks (name TEXT PRIMARY KEY, token TEXT NOT NULL, expires_at REAL)"
+        )
+        self._init_metrics(metrics)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self._local, "connection", None)
+        if connection is None:
+            # Autocommit mode - transactions are started explicitly by _transaction()
+            connection = sqlite3.connect(self.storage_path, timeout=self.busy_timeout, isolation_level=None)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(f"PRAGMA synchronous={self.synchronous}")
+            self._local.connection = connection
+            self._local.transaction_depth = 0
+        return connection
+
+    @contextmanager
+    def _transaction(self) -> Iterator[sqlite3.Connection]:
+        """Run the block in a write transaction, nested blocks (e.g. operations of a pipeline) join the outer one."""
+        connection = self._connection()
+        if self._local.transaction_depth > 0:
+            self._local.transaction_depth += 1
+            try:
+                yield connection
+            finally:
+                self._local.transaction_depth -= 1
+            return
+
+        # IMMEDIATE takes the write lock at the start, read-modify-write operations cannot interleave
+        connection.execute("BEGIN IMMEDIATE")
+        self._local.transaction_depth = 1
+        try:
+            yield connection
+        except BaseException:
+            connection.execute("ROLLBACK")
+            raise
+        else:
+            connection.execute("COMMIT")
+        finally:
+            self._local.transaction_depth = 0
+
+    def close(self):
+        """Close the database connection of the current thread."""
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def lock(
+        self, name: str, timeout: Optional[float] = None, sleep: float = 0.1, blocking: bool = True,
+        blocking_timeout: Optional[float] = None, **kwargs
+    ) -> SQLiteLock:
+        """Create a lock shared by all processes using the database, use it as 'with server.lock(name):'.
+
+        :param name: name of the lock
+        :type name: str
+        :param timeout: lock expires after this many seconds, defaults to None (never expires)
+        :type timeout: Optional[float]
+        :param sleep: seconds between attempts to acquire a blocking lock, defaults to 0.1
+        :type sleep: float
+        :param blocking: whether acquire() waits until the lock is free, defaults to True
+        :type blocking: bool
+        :param blocking_timeout: maximum seconds acquire() waits, defaults to None (waits forever)
+        :type blocking_timeout: Optional[float]
+        """
+        return SQLiteLock(self, name, timeout, sleep, blocking, blocking_timeout)
+
+    def pipeline(self, *, transaction: bool = True) -> SQLitePipeline:
+        """Create a pipeline - operations passed the pipeline are executed by pipeline.execute() in one transaction."""
+        return SQLitePipeline(self, transaction=transaction)
+
+    def set(
+        self, key: str, value: Any, additional_params: Optional[dict] = None, *,
+        pipeline: Optional[SQLitePipeline] = None
+    ) -> Union[bool, SQLitePipeline]:
+        if pipeline is not None:
+            return pipeline.queue(self.set, key, value, additional_params)
+        if self._should_chunk(value):
+            return self._set_chunked(key, value, additional_params)
+
+        value = self.parse_saved_value(value, additional_params)
+        with self._transaction() as connection:
+            old_chunk_keys = self._find_chunk_keys((key,))
+            self._upsert(connection, [(key, value)])
+            if old_chunk_keys:  # Chunked DataFrame was overwritten by a plain value
+                self._discard_chunks(old_chunk_keys)
+        return True
+
+    @staticmethod
+    def _upsert(connection: sqlite3.Connection, items: list[tuple[str, Union[str, bytes]]]):
+        connection.executemany(
+            "INSERT INTO kv_store (key, value) VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+            items
+        )
+
+    def get(self, key: str) -> Optional[Any]:
+        return self._assemble_chunks(key, self._get_stored(key))
+
+    def _get_stored(self, key: str) -> Optional[Any]:
+        row = self._connection().execute("SELECT value FROM kv_store WHERE key = ?", (key,)).fetchone()
+        # Do not move this condition to decode_loaded_value(), it only deals with missing keys
+        if row is None:
+            return None
+        return self.decode_loaded_value(row[0])
+
+    def _find_chunk_keys(self, names: tuple[str, ...]) -> list[str]:
+        """Only value prefixes are compared in SQL, values are decoded just for manifests."""
+        manifest_prefix = f'{{"object_type": "{ChunkedDataFrameManifest.object_type}"'
+        chunk_keys = []
+        for chunk in iterate_in_chunks(list(names), SQLITE_MAX_PARAMETERS):
+            rows = self._connection().execute(
+                f"SELECT value FROM kv_store WHERE key IN ({', '.join('?' * len(chunk))}) "
+                f"AND typeof(value) = 'text' AND substr(value, 1, ?) = ?",
+                (*chunk, len(manifest_prefix), manifest_prefix)
+            ).fetchall()
+            for (value,) in rows:
+                chunk_keys.extend(self.decode_loaded_value(value).chunk_keys)
+        return chunk_keys
+
+    def mset(
+        self, mapping: dict[str, Any], additional_params: Optional[dict] = None, *,
+        pipeline: Optional[SQLitePipeline] = None
+    ) -> Optional[SQLitePipeline]:
+        """Set multiple keys in a single transaction.
+
+        :param mapping: key to value mapping
+        :type mapping: dict[str, Any]
+        :param additional_params: additional serialization parameters applied to every value, defaults to None
+        :type additional_params: Optional[dict], optional
+        :param pipeline: if provided, the operation is added to the pipeline
+        :type pipeline: Optional[SQLitePipeline]
+        """
+        if pipeline is not None:
+            return pipeline.queue(self.mset, mapping, additional_params)
+
+        items = [(key, self.parse_saved_value(value, additional_params)) for key, value in mapping.items()]
+        with self._transaction() as connection:
+            self._upsert(connection, items)
+
+    def mget(self, keys: list[str]) -> list[Optional[Any]]:
+        keys = list(keys)
+        stored_values = {}
+        connection = self._connection()
+        for chunk in iterate_in_chunks(list(dict.fromkeys(keys)), SQLITE_MAX_PARAMETERS):
+            rows = connection.execute(
+                f"SELECT key, value FROM kv_store WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            stored_values.update(rows)
+
+        values = []
+        for key in keys:
+            value = stored_values.get(key)
+            values.append(None if value is None else self._assemble_chunks(key, self.decode_loaded_value(value)))
+        return values
+
+    def json_mset(
+        self, name: str, params: dict, *, pipeline: Optional[SQLitePipeline] = None
+    ) -> Optional[SQLitePipeline]:
+        """Set multiple keys in a JSON document, atomically - the document is read and written in one transaction.
+
+        :param name: key under which a JSON document is stored
+        :type name: str
+        :param params: collection of arguments where keys are JSON Paths and values are values to set
+        :type params: dict
+        :param pipeline: if provided, the operation is added to the pipeline
+        :type pipeline: Optional[SQLitePipeline]
+        """
+        if pipeline is not None:
+            return pipeline.queue(self.json_mset, name, params)
+
+        with self._transaction() as connection:
+            json_obj = self._get_stored(name)
+            json_obj = apply_json_params({} if json_obj is None else json_obj, params)
+            self._upsert(connection, [(name, self.parse_saved_value(json_obj))])
+
+    def json_mset_if(self, name: str, params: dict[str, Any], conditions: dict[str, Any]) -> bool:
+        """Set multiple paths in a JSON document only if it matches all 'conditions', see AbstractKeepVariableServer.
+
+        The document is checked and written in one write transaction.
+        """
+        conditions = normalize_json_conditions(conditions)
+        with self._transaction() as connection:
+            json_obj = self._get_stored(name)
+            if json_obj is None or not json_conditions_match(json_obj, conditions):
+                return False
+            self._upsert(connection, [(name, self.parse_saved_value(apply_json_params(json_obj, params)))])
+        return True
+
+    def json_incr(self, name: str, path: str, amount: Union[int, float] = 1) -> Optional[Union[int, float]]:
+        with self._transaction() as connection:
+            json_obj = self._get_stored(name)
+            created = json_obj is None
+            json_obj = {} if created else json_obj
+            try:
+                new_value = increment_json_values(json_obj, path, amount)
+            except IncorrectPathError as e:
+                raise AssertionError(
+                    "Nested object does not exist - most probably due to incorrect path arg"
+                ) from e
+            if new_value is not None or not created:  # Nothing matched, no document is created
+                self._upsert(connection, [(name, self.parse_saved_value(json_obj))])
+        return new_value
+
+    def query(
+        self,
+        *,
+        text_params: Optional[dict[str, tuple]] = None,
+        tag_params: Optional[dict[str, tuple]] = None,
+        entity_key: str,
+        index_name: str = "index",
+        field_to_sort_by: Optional[str] = None,
+        asc=True,
+        paginate: Optional[tuple[int, int]] = None,
+        ignored_keywords: Optional[list[str]] = None,
+        **kwargs,
+    ) -> dict[str, dict]:
+        """Simplified alternative to RedisSearch, see KeepVariableDummyRedisServer.query().
+
+        TAG conditions are evaluated by SQLite on JSON documents, only matching records are decoded.
+        Compressed records are stored as BLOBs, those are decoded and matched in Python.
+
+        :param entity_key: substring of key names of the queried records - e.g. "jobs"
+        :type entity_key: str
+        :return: {'jobs:43': job_dict, ...}
+        :rtype: dict[str, dict]
+        """
+        conditions, parameters = self._query_conditions(entity_key, tag_params, ignored_keywords)
+        rows = self._connection().execute(
+            f"SELECT key, value FROM kv_store WHERE {' AND '.join(conditions)} ORDER BY key", parameters
+        ).fetchall()
+        found_records = self._decode_query_rows(rows)
+        # Tags are checked again, SQL comparison is less strict than the Python one (e.g. 1 = 1.0 = true)
+        return filter_query_records(found_records, tag_params, text_params, field_to_sort_by, asc, paginate)
+
+    def iter_query(
+        self,
+        *,
+        text_params: Optional[dict[str, tuple]] = None,
+        tag_params: Optional[dict[str, tuple]] = None,
+        entity_key: str,
+        index_name: str = "index",
+        field_to_sort_by: Optional[str] = None,
+        asc=True,
+        page_size: int = 1000,
+        return_fields: Optional[list[str]] = None,
+        ignored_keywords: Optional[list[str]] = None,
+        **kwargs,
+    ) -> Iterator[tuple[str, dict]]:
+        """Stream query() results, see AbstractKeepVariableServer.iter_query().
+
+        Unsorted results are read in pages of page_size rows ordered by key, so only one page is decoded at a time.
+        Sorting needs all matching records, those are sorted by query() first.
+        """
+        assert page_size > 0
+        if field_to_sort_by:
+            found_records = self.query(
+                text_params=text_params, tag_params=tag_params, entity_key=entity_key,
+                field_to_sort_by=field_to_sort_by, asc=asc, ignored_keywords=ignored_keywords
+            )
+            for record_name, record in found_records.items():
+                yield record_name, record if return_fields is None else project_record(record, return_fields)
+            return
+
+        conditions, parameters = self._query_conditions(entity_key, tag_params, ignored_keywords)
+        conditions.append("key > ?")
+        statement = f"SELECT key, value FROM kv_store WHERE {' AND '.join(conditions)} ORDER BY key LIMIT ?"
+        last_key = ""
+        while True:
+            rows = self._connection().execute(statement, (*parameters, last_key, page_size)).fetchall()
+            found_records = self._decode_query_rows(rows)
+            for record_name, record in filter_query_records(found_records, tag_params, text_params).items():
+                yield record_name, record if return_fields is None else project_record(record, return_fields)
+            if len(rows) < page_size:
+                return
+            last_key = rows[-1][0]  # Next page starts right after the last key
+
+    @staticmethod
+    def _query_conditions(
+        entity_key: str, tag_params: Optional[dict[str, tuple]], ignored_keywords: Optional[list[str]]
+    ) -> tuple[list[str], list[Any]]:
+        """Return SQL conditions and their parameters selecting records of the entity with matching TAG fields."""
+        if ignored_keywords is None:
+            ignored_keywords = ["index", "pk", "lock"]
+
+        conditions = ["instr(key, ?) > 0"]
+        parameters: list[Any] = [entity_key]
+        for keyword in ignored_keywords:
+            conditions.append("instr(key, ?) = 0")
+            parameters.append(keyword)
+
+        # Records are JSON objects - plain strings are skipped before json_extract() sees them. BLOB values
+        # (compressed records) cannot be matched by SQLite, they are decoded and matched by filter_query_records()
+        document_conditions = ["typeof(value) = 'text' AND json_valid(value) AND json_type(value) = 'object'"]
+        for field, values in (tag_params or {}).items():
+            document_conditions.append(f"json_extract(value, ?) IN ({', '.join('?' * len(values))})")
+            parameters.append('$."' + field.replace('"', '\\"') + '"')
+            parameters.extend(values)
+        conditions.append(f"(typeof(value) = 'blob' OR ({' AND '.join(document_conditions)}))")
+        return conditions, parameters
+
+    def _decode_query_rows(self, rows: list[tuple[str, Union[str, bytes]]]) -> list[tuple[str, dict]]:
+        """Decode rows selected by _query_conditions(), binary values which are not JSON objects are dropped."""
+        found_records = []
+        for record_name, value in rows:
+            record = self.decode_loaded_value(value)
+            if isinstance(record, dict):
+                found_records.append((record_name, record))
+        return found_records
+
+    def arrlen(self, name: str, path: str, **kwargs) -> Optional[int]:
+        try:
+            json_obj = self._get_stored(name)
+            json_obj = {} if json_obj is None else json_obj
+
+            arrays = compile_json_path(path).get(json_obj)  # More arrays match a path with wildcards
+            return len(arrays[-1]) if arrays else None
+        except (KeyError, IndexError) as e:
+            raise AssertionError(
+                "Nested object does not exist - most probably due to incorrect path arg"
+            ) from e
+
+    def arrappend(
+        self, name: str, path: str, objects: Iterable, *, pipeline: Optional[SQLitePipeline] = None
+    ) -> Union[int, None, SQLitePipeline]:
+        if pipeline is not None:
+            return pipeline.queue(self.arrappend, name, path, objects)
+
+        with self._transaction() as connection:
+            try:
+                json_obj = self._get_stored(name)
+                json_obj = {} if json_obj is None else json_obj
+
+                objects = list(objects)
+                arrays = compile_json_path(path).get(json_obj)  # More arrays match a path with wildcards
+                for array in arrays:
+                    array.extend(objects)
+                array_length = len(arrays[-1]) if arrays else None
+            except (KeyError, IndexError) as e:
+                raise AssertionError(
+                    "Nested object does not exist - most probably due to incorrect path arg"
+                ) from e
+
+            self._upsert(connection, [(name, self.parse_saved_value(json_obj))])
+        return array_length
+
+    def scan(self, match_string: str, count: int = 50, type_: Optional[str] = None) -> list[str]:
+        """Find saved keys, matching their name with a given glob-style pattern.
+
+        :param match_string: string pattern to match keys against, e.g. 'jobs:*'
+        :type match_string: str
+        :param count: how many keys to fetch from the database in one query, defaults to 50
+        :type count: int, optional
+        :return: list of found key names, sorted
+        :rtype: list[str]
+        """
+        return list(self.scan_iter(match_string, count))
+
+    def scan_iter(self, match_string: str, count: int = 50, type_: Optional[str] = None) -> Iterator[str]:
+        """Yield saved keys matching a glob-style pattern (same semantics as Redis SCAN MATCH) in sorted order.
+
+        Patterns with a literal prefix like 'jobs:*' are resolved as a range of the primary key index.
+        Keys are fetched in batches of 'count', no transaction is held open between the batches.
+        """
+        prefix, is_literal = split_glob_prefix(match_string)
+        connection = self._connection()
+        if is_literal:
+            if connection.execute("SELECT 1 FROM kv_store WHERE key = ?", (prefix,)).fetchone() is not None:
+                yield prefix
+            return
+
+        # The smallest string greater than all strings starting with the prefix
+        end = prefix[:-1] + chr(ord(prefix[-1]) + 1) if prefix else None
+        pattern = compile_glob(match_string)
+
+        query = "SELECT key FROM kv_store WHERE key >= ?" + (" AND key < ?" if end else "") + " ORDER BY key LIMIT ?"
+        start = prefix
+        while True:
+            keys = [key for (key,) in connection.execute(query, (start, end, count) if end else (start, count))]
+            for key in keys:
+                if pattern.fullmatch(key):
+                    yield key
+            if len(keys) < count:
+                return
+            start = keys[-1] + "\0"  # Next batch starts right after the last key
+
+    def delete(self, *names: str, pipeline: Optional[SQLitePipeline] = None) -> Union[int, SQLitePipeline]:
+        """Delete specified keys together with chunks of chunked DataFrames stored under them.
+
+        :param pipeline: if provided, the operation is added to the pipeline
+        :type pipeline: Optional[SQLitePipeline]
+        :return: number of deleted keys or a pipeline in case it was passed to a function
+        :rtype: int | SQLitePipeline
+        """
+        if pipeline is not None:
+            return pipeline.queue(self.delete, *names)
+
+        deleted_count = 0
+        with self._transaction() as connection:
+            chunk_keys = self._find_chunk_keys(names)
+            for chunk in iterate_in_chunks(list(dict.fromkeys(names)), SQLITE_MAX_PARAMETERS):
+                cursor = connection.execute(
+                    f"DELETE FROM kv_store WHERE key IN ({', '.join('?' * len(chunk))})", chunk
+                )
+                deleted_count += cursor.rowcount
+            for chunk in iterate_in_chunks(chunk_keys, SQLITE_MAX_PARAMETERS):
+                connection.execute(f"DELETE FROM kv_store WHERE key IN ({', '.join('?' * len(chunk))})", chunk)
+        return deleted_count
@@ -0,0 +1,408 @@
+import base64
+import io
+import json
+import struct
+import time
+import zlib
+from typing import Any, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+try:
+    import lz4.frame
+except ImportError:
+    lz4 = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# Binary payloads start with a NUL byte, so they can never be confused with a JSON document or a plain string
+BINARY_MAGIC = b"\x00KVB"
+_HEADER_LENGTH = struct.Struct("<I")
+
+DATAFRAME_CODECS = ("json", "arrow", "parquet", "numpy")
+COMPRESSION_CODECS = ("zlib", "lz4", "zstd")
+
+
+def pack_binary_payload(header: dict, body: bytes = b"") -> bytes:
+    """Frame a binary payload: magic, length of the JSON header, JSON header, raw body.
+
+    :param header: JSON serializable description of the body, must contain 'object_type'
+    :type header: dict
+    :param body: raw bytes, defaults to b""
+    :type body: bytes
+    :return: framed payload
+    :rtype: bytes
+    """
+    header_bytes = json.dumps(header).encode("utf8")
+    return b"".join((BINARY_MAGIC, _HEADER_LENGTH.pack(len(header_bytes)), header_bytes, body))
+
+
+def is_binary_payload(value) -> bool:
+    return isinstance(value, (bytes, bytearray, memoryview)) and bytes(value[:len(BINARY_MAGIC)]) == BINARY_MAGIC
+
+
+def unpack_binary_payload(payload: bytes) -> tuple[dict, memoryview]:
+    """Split a framed payload into its header and body. The body is a view, it is not copied.
+
+    :return: tuple[header, body]
+    :rtype: tuple[dict, memoryview]
+    """
+    view = memoryview(payload)
+    start = len(BINARY_MAGIC)
+    (header_length,) = _HEADER_LENGTH.unpack_from(view, start)
+    start += _HEADER_LENGTH.size
+    header = json.loads(bytes(view[start:start + header_length]))
+    return header, view[start + header_length:]
+
+
+def binary_payload_to_text(payload: bytes) -> str:
+    """Wrap a binary payload into a JSON string, for backends which can store only text."""
+    return json.dumps({"object_type": "binary", "data": base64.b64encode(payload).decode("ascii")})
+
+
+def text_to_binary_payload(value: dict) -> bytes:
+    """Inverse of binary_payload_to_text(), takes the already json-decoded envelope."""
+    return base64.b64decode(value["data"])
+
+
+class CompressionStats:
+    """Per server instance statistics of the transparent compression, used to tune the size threshold."""
+
+    def __init__(self):
+        self.compressed_values = 0
+        self.skipped_values = 0  # Values above threshold which did not get smaller
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.compress_seconds = 0.0
+        self.decompressed_values = 0
+        self.decompress_seconds = 0.0
+
+    @property
+    def ratio(self) -> float:
+        """Compressed size / original size of the compressed values."""
+        return self.bytes_out / self.bytes_in if self.bytes_in else 1.0
+
+    def as_dict(self) -> dict:
+        return {**vars(self), "ratio": self.ratio}
+
+
+def resolve_compression(compression: Optional[str]) -> Optional[str]:
+    """Validate compression codec name, fall back to zlib if lz4/zstandard is not installed."""
+    if compression is None:
+        return None
+    if compression not in COMPRESSION_CODECS:
+        raise ValueError(f"Unknown compression '{compression}', use one of {COMPRESSION_CODECS}")
+    if (compression == "lz4" and lz4 is None) or (compression == "zstd" and zstandard is None):
+        print(f"Keepvariable warning, '{compression}' is not installed - compression falls back to 'zlib'")
+        return "zlib"
+    return compression
+
+
+def compress(data: bytes, codec: str) -> bytes:
+    if codec == "zlib":
+        return zlib.compress(data)
+    elif codec == "lz4":
+        return lz4.frame.compress(data)
+    elif codec == "zstd":
+        return zstandard.ZstdCompressor().compress(data)
+    raise ValueError(f"Unknown compression '{codec}'")
+
+
+def decompress(data: bytes, codec: str) -> bytes:
+    if (codec == "lz4" and lz4 is None) or (codec == "zstd" and zstandard is None):
+        raise ImportError(f"Package providing '{codec}' is required to decode the stored value")
+
+    if codec == "zlib":
+        return zlib.decompress(data)
+    elif codec == "lz4":
+        return lz4.frame.decompress(data)
+    elif codec == "zstd":
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown compression '{codec}'")
+
+
+def compress_value(value: Union[str, bytes], codec: str, stats: Optional[CompressionStats] = None) -> Optional[bytes]:
+    """Compress serialized value into a binary payload, return None if compression does not reduce its size.
+
+    Text values are utf-8 encoded, header 'content' tells the decoder whether to decode the result back to text.
+    """
+    start = time.perf_counter()
+    content = "text" if isinstance(value, str) else "binary"
+    data = value.encode("utf-8") if isinstance(value, str) else bytes(value)
+    compressed = compress(data, codec)
+
+    if stats is not None:
+        stats.compress_seconds += time.perf_counter() - start
+    if len(compressed) >= len(data):
+        if stats is not None:
+            stats.skipped_values += 1
+        return None
+    if stats is not None:
+        stats.compressed_values += 1
+        stats.bytes_in += len(data)
+        stats.bytes_out += len(compressed)
+
+    return pack_binary_payload({"object_type": "compressed", "codec": codec, "content": content}, compressed)
+
+
+def decompress_value(header: dict, body: memoryview, stats: Optional[CompressionStats] = None) -> Union[str, bytes]:
+    """Inverse of compress_value(), returns the serialized value (text or binary payload)."""
+    start = time.perf_counter()
+    data = decompress(body, header["codec"])
+    if stats is not None:
+        stats.decompressed_values += 1
+        stats.decompress_seconds += time.perf_counter() - start
+    return data.decode("utf-8") if header["content"] == "text" else data
+
+
+def resolve_dataframe_codec(codec: str) -> str:
+    """Validate DataFrame codec name, fall back to pickle-free 'numpy' codec if pyarrow is not installed."""
+    if codec not in DATAFRAME_CODECS:
+        raise ValueError(f"Unknown DataFrame codec '{codec}', use one of {DATAFRAME_CODECS}")
+    if not is_codec_available(codec):
+        print(f"Keepvariable warning, pyarrow is not installed - '{codec}' DataFrame codec falls back to 'numpy'")
+        return "numpy"
+    return codec
+
+
+def is_codec_available(codec: str) -> bool:
+    """Check whether optional dependencies of a DataFrame codec are installed."""
+    return codec not in ("arrow", "parquet") or pa is not None
+
+
+def dataframe_to_binary(df: pd.DataFrame, codec: str) -> bytes:
+    """Serialize DataFrame into a binary payload, keeping dtypes and the index.
+
+    :param df: DataFrame to be serialized
+    :type df: pd.DataFrame
+    :param codec: 'arrow' (Arrow IPC stream), 'parquet' or 'numpy' (raw column buffers, no pyarrow needed)
+    :type codec: str
+    :return: framed binary payload
+    :rtype: bytes
+    """
+    header = {"object_type": "pd.DataFrame", "codec": codec, "attrs": df.attrs}
+
+    if codec == "arrow":
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        body = sink.getvalue().to_pybytes()
+    elif codec == "parquet":
+        table = pa.Table.from_pandas(df, preserve_index=True)
+        sink = io.BytesIO()
+        pq.write_table(table, sink)
+        body = sink.getvalue()
+    elif codec == "numpy":
+        columnar_header, body = _dataframe_to_columnar(df)
+        header.update(columnar_header)
+    else:
+        raise ValueError(f"DataFrame codec '{codec}' does not produce binary payloads")
+
+    return pack_binary_payload(header, body)
+
+
+def binary_to_dataframe(header: dict, body: memoryview) -> pd.DataFrame:
+    codec = header["codec"]
+    if codec in ("arrow", "parquet") and pa is None:
+        raise ImportError(f"pyarrow is required to decode DataFrame stored with '{codec}' codec")
+
+    if codec == "arrow":
+        df = pa.ipc.open_stream(pa.py_buffer(body)).read_all().to_pandas()
+    elif codec == "parquet":
+        df = pq.read_table(pa.BufferReader(pa.py_buffer(body))).to_pandas()
+    elif codec == "numpy":
+        df = _columnar_to_dataframe(header, body)
+    else:
+        raise ValueError(f"Unknown DataFrame codec '{codec}'")
+
+    df.attrs = header.get("attrs", {})
+    return df
+
+
+class ChunkedDataFrameManifest:
+    """Manifest of a DataFrame stored as row chunks under separate, versioned keys.
+
+    The manifest is stored under the key of the DataFrame itself, so switching it to a new version
+    is a single write - readers see either the old or the new set of chunks, never a mix.
+    """
+
+    object_type = "pd.DataFrame.chunked"
+
+    def __init__(self, chunk_keys: list[str], rows: int, default_index: bool, attrs: Optional[dict] = None):
+        self.chunk_keys = chunk_keys
+        self.rows = rows
+        self.default_index = default_index  # RangeIndex(0, rows) - it is rebuilt instead of relying on chunk index
+        self.attrs = attrs or {}
+
+    @classmethod
+    def from_dataframe(cls, key: str, df: pd.DataFrame, chunk_rows: int, version: str) -> "ChunkedDataFrameManifest":
+        chunk_count = max(1, -(-len(df) // chunk_rows))
+        chunk_keys = [f"{key}:chunks:{version}:{i}" for i in range(chunk_count)]
+        return cls(chunk_keys, len(df), is_default_index(df.index), df.attrs)
+
+    @classmethod
+    def is_manifest_value(cls, value: Any) -> bool:
+        """Cheap check of a serialized value, without decoding it - to_dict() always starts with object_type."""
+        return isinstance(value, str) and value.startswith(f'{{"object_type": "{cls.object_type}"')
+
+    @classmethod
+    def from_dict(cls, value: dict) -> "ChunkedDataFrameManifest":
+        return cls(value["chunk_keys"], value["rows"], value["default_index"], value.get("attrs"))
+
+    def to_dict(self) -> dict:
+        return {
+            "object_type": self.object_type,
+            "chunk_keys": self.chunk_keys,
+            "rows": self.rows,
+            "default_index": self.default_index,
+            "attrs": self.attrs,
+        }
+
+    def prepare_chunk(self, chunk: pd.DataFrame, offset: int) -> pd.DataFrame:
+        """Restore index and attrs of a chunk starting at row 'offset' of the whole DataFrame."""
+        if self.default_index:
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+        chunk.attrs = self.attrs
+        return chunk
+
+    def assemble(self, chunks: list[pd.DataFrame]) -> pd.DataFrame:
+        df = pd.concat(chunks, ignore_index=self.default_index)
+        df.attrs = self.attrs
+        return df
+
+
+def is_default_index(index: pd.Index) -> bool:
+    """Return True for an unnamed RangeIndex 0..n-1, which does not need to be stored with a DataFrame."""
+    return isinstance(index, pd.RangeIndex) and index.start == 0 and index.step == 1 and index.name is None
+
+
+def ndarray_to_binary(array: np.ndarray) -> bytes:
+    """Serialize ndarray as its raw buffer with a header describing dtype (incl. byte order), shape and order.
+
+    Works for N-D arrays and structured dtypes, but not for arrays holding Python objects.
+    """
+    if array.dtype.hasobject:
+        raise ValueError("Arrays with object dtype cannot be stored as raw buffer")
+
+    order = "F" if array.flags.f_contiguous and not array.flags.c_contiguous else "C"
+    header = {
+        "object_type": "np.ndarray",
+        "descr": np.lib.format.dtype_to_descr(array.dtype),
+        "shape": list(array.shape),
+        "order": order,
+    }
+    # ravel() does not copy contiguous arrays, uint8 view exposes the buffer for any dtype
+    data = array.ravel(order=order).view(np.uint8)
+    return pack_binary_payload(header, data)
+
+
+def binary_to_ndarray(header: dict, body: memoryview) -> np.ndarray:
+    """Decode ndarray without copying its data - the returned array is a read-only view of the payload, copy it to modify it.
+
+    Only values returned from a read cache (KeepVariableDummyRedisServer with read_cache) are writable copies.
+    """
+    dtype = np.lib.format.descr_to_dtype(_to_descr(header["descr"]))
+    array = np.frombuffer(body, dtype=dtype)
+    return array.reshape(header["shape"], order=header["order"])
+
+
+def _to_descr(descr):
+    """JSON turns tuples of structured dtype description into lists, numpy needs them back as tuples."""
+    if not isinstance(descr, list):
+        return descr
+    fields = []
+    for name, field_type, *shape in descr:
+        name = tuple(name) if isinstance(name, list) else name  # (title, name) pairs
+        fields.append((name, _to_descr(field_type), *(tuple(item) for item in shape)))
+    return fields
+
+
+def _dataframe_to_columnar(df: pd.DataFrame) -> tuple[dict, bytes]:
+    """Pickle-free DataFrame encoding: numeric/bool/datetime columns as raw buffers, other columns as JSON."""
+    if isinstance(df.index, pd.MultiIndex) or isinstance(df.columns, pd.MultiIndex):
+        raise ValueError("MultiIndex is not supported by the 'numpy' DataFrame codec")
+
+    chunks = []
+    offset = 0
+
+    def encode_series(series: pd.Series) -> dict:
+        nonlocal offset
+        dtype = series.dtype
+        entry = {}
+        if isinstance(dtype, pd.DatetimeTZDtype):
+            entry["tz"] = str(dtype.tz)
+            series = series.dt.tz_convert("UTC").dt.tz_localize(None)
+            dtype = series.dtype
+
+        if isinstance(dtype, np.dtype) and dtype.kind in "biufcmM":
+            data = np.ascontiguousarray(series.to_numpy()).tobytes()
+            entry.update({"dtype": dtype.str, "offset": offset, "nbytes": len(data)})
+            chunks.append(data)
+            offset += len(data)
+        else:
+            entry.update({
+                "dtype": str(dtype),
+                "values": json.loads(series.to_json(orient="values", date_format="iso")),
+            })
+        return entry
+
+    if isinstance(df.index, pd.RangeIndex):
+        index = {"range": [df.index.start, df.index.stop, df.index.step]}
+    else:
+        index = encode_series(df.index.to_series())
+    index["name"] = df.index.name
+
+    columns = [encode_series(df.iloc[:, i]) for i in range(df.shape[1])]
+    header = {
+        # labels may be timestamps or other non-JSON values, so they are encoded like the index
+        "columns": encode_series(df.columns.to_series()),
+        "columns_name": df.columns.name,
+        "column_data": columns,
+        "index": index,
+    }
+    return header, b"".join(chunks)
+
+
+def _columnar_to_dataframe(header: dict, body: memoryview) -> pd.DataFrame:
+    def decode_values(entry: dict):
+        if "offset" in entry:
+            dtype = np.dtype(entry["dtype"])
+            values = np.frombuffer(body, dtype=dtype, count=entry["nbytes"] // dtype.itemsize,
+                                   offset=entry["offset"])
+            series = pd.Series(values, copy=True)
+        else:
+            series = pd.Series(entry["values"], dtype=object)
+            try:
+                series = series.astype(entry["dtype"])
+            except (TypeError, ValueError):
+                pass  # Keep the values as objects if the original dtype cannot be restored
+        if "tz" in entry:
+            series = series.dt.tz_localize("UTC").dt.tz_convert(entry["tz"])
+        return series
+
+    index_entry = header["index"]
+    if "range" in index_entry:
+        index = pd.RangeIndex(*index_entry["range"], name=index_entry["name"])
+    else:
+        index = pd.Index(decode_values(index_entry), name=index_entry["name"])
+
+    data = {i: decode_values(entry).set_axis(index) for i, entry in enumerate(header["column_data"])}
+    df = pd.DataFrame(data, index=index)
+    labels = header["columns"]
+    if isinstance(labels, dict):
+        labels = decode_values(labels)
+    df.columns = pd.Index(labels, name=header["columns_name"])
+    return df
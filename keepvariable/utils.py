@@ -1,10 +1,274 @@
+import copy
+import datetime
+import json
 import re
-from typing import Optional, Union
+from functools import lru_cache
+from typing import Any, Iterable, Iterator, Optional, Union
 
 
 class IncorrectPathError(Exception): ...
 
 
+# Values of these types can be shared by a cache and its callers, they cannot be mutated
+_IMMUTABLE_TYPES = frozenset((str, bytes, int, float, bool, type(None), datetime.datetime, datetime.date))
+
+
+def copy_mutable_value(value: Any) -> Any:
+    """Return a deep copy of a mutable value (dict, list, DataFrame, ndarray, ...), immutable values as they are.
+
+    Used when a cached decoded value is returned, so that mutations by the caller do not leak into the cache.
+    """
+    value_type = type(value)
+    if value_type in _IMMUTABLE_TYPES:
+        return value
+    if value_type is dict or value_type is list:
+        return _copy_json(value)
+    return copy.deepcopy(value)
+
+
+def _copy_json(value: Any) -> Any:
+    """Faster deepcopy of decoded JSON - only dicts and lists are copied, anything else is left to copy_mutable_value()."""
+    value_type = type(value)
+    if value_type is dict:
+        return {key: _copy_json(item) for key, item in value.items()}
+    if value_type is list:
+        return [_copy_json(item) for item in value]
+    return copy_mutable_value(value)
+
+
+def iterate_in_chunks(items: list, chunk_size: int) -> Iterator[list]:
+    """Yield consecutive slices of 'items', each at most 'chunk_size' long."""
+    if chunk_size < 1:
+        raise ValueError("chunk_size must be a positive integer")
+    for start in range(0, len(items), chunk_size):
+        yield items[start:start + chunk_size]
+
+
+@lru_cache(maxsize=256)
+def compile_glob(pattern: str) -> re.Pattern:
+    """Compile Redis glob-style pattern into a regex, which has to be used with fullmatch().
+
+    Supported are '*', '?', '[abc]', '[^abc]', '[a-z]' and escaping of special characters with backslash,
+    all other characters (e.g. '.' or ':') match literally. Compiled patterns are cached.
+    """
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "*":
+            if not parts or parts[-1] != ".*":
+                parts.append(".*")
+        elif char == "?":
+            parts.append(".")
+        elif char == "\\" and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        elif char == "[":
+            regex, i = _translate_glob_bracket(pattern, i)
+            parts.append(regex)
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return re.compile("".join(parts), re.DOTALL)
+
+
+def _translate_glob_bracket(pattern: str, start: int) -> tuple[str, int]:
+    """Translate '[...]' starting at 'start' into a regex character class, return it with index of its last character.
+
+    Follows stringmatchlen() of Redis - 'x-]' is a range up to ']' and a set which is not closed
+    extends to the end of the pattern.
+    """
+    i = start + 1
+    negate = i < len(pattern) and pattern[i] == "^"
+    if negate:
+        i += 1
+
+    items = []
+    while i < len(pattern):
+        char = pattern[i]
+        if char == "\\" and i + 1 < len(pattern):
+            i += 1
+            items.append(re.escape(pattern[i]))
+        elif char == "]":
+            break
+        elif i + 2 < len(pattern) and pattern[i + 1] == "-":
+            low, high = sorted((char, pattern[i + 2]))
+            items.append(re.escape(low) + "-" + re.escape(high))
+            i += 2
+        else:
+            items.append(re.escape(char))
+        i += 1
+    else:
+        i = len(pattern) - 1
+
+    if not items:  # Empty set matches nothing, negated empty set matches anything
+        return ("." if negate else "(?!)"), i
+    return "[" + ("^" if negate else "") + "".join(items) + "]", i
+
+
+def split_glob_prefix(pattern: str) -> tuple[str, bool]:
+    """Return literal prefix of a glob-style pattern and whether the whole pattern is literal.
+
+    e.g. "jobs:*" -> ("jobs:", False), "jobs:4" -> ("jobs:4", True)
+    """
+    prefix = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char in "*?[":
+            return "".join(prefix), False
+        if char == "\\" and i + 1 < len(pattern):
+            i += 1
+        prefix.append(pattern[i])
+        i += 1
+    return "".join(prefix), True
+
+
+class _Wildcard:
+    def __repr__(self):
+        return "*"
+
+
+# Step of a JsonPath matching all elements of a list or all values of a dict - "[*]" or ".*"
+WILDCARD = _Wildcard()
+
+
+class JsonPath:
+    """Compiled Redis JSON path, e.g. "$.job.nodes[2].status", "$.nodes[-1]", "$.jobs[*].status" or "$['a.b']".
+
+    The path is parsed once into steps - dict keys, list indices (negative count from the end) and WILDCARD.
+    Use compile_json_path() to get cached instances.
+    """
+
+    __slots__ = ("path", "steps", "has_wildcard")
+
+    def __init__(self, path: str):
+        self.path = path
+        self.steps: tuple[Union[str, int, _Wildcard], ...] = tuple(_parse_json_path(path))
+        self.has_wildcard = any(step is WILDCARD for step in self.steps)
+
+    def __repr__(self):
+        return f"JsonPath({self.path!r})"
+
+    def parents(self, json_obj: Any) -> list[tuple[Any, Union[str, int]]]:
+        """Return (parent object, key or index) of every element the path points to. Empty list for the root path.
+
+        Without wildcards, a missing element on the way raises like indexing does. With wildcards,
+        elements without the following keys are skipped, as in RedisJSON - also scalars and elements,
+        which can not hold the final key (lists for object keys, objects or too short lists for indices).
+        """
+        if not self.steps:
+            return []
+        nodes = [json_obj]
+        try:
+            for step in self.steps[:-1]:
+                nodes = [child for node in nodes for child in self._children(node, step)]
+        except (AttributeError, IndexError) as e:
+            raise IncorrectPathError(f"Path '{self.path}' could not be accessed") from e
+
+        final_step = self.steps[-1]
+        if final_step is WILDCARD:
+            return [(node, key) for node in nodes for key in self._keys(node)]
+        if self.has_wildcard:
+            nodes = [node for node in nodes if self._can_hold(node, final_step)]
+        return [(node, final_step) for node in nodes]
+
+    def get(self, json_obj: Any) -> list:
+        """Return all elements the path points to."""
+        if not self.steps:
+            return [json_obj]
+        if not self.has_wildcard:
+            return [parent[key] for parent, key in self.parents(json_obj)]
+        return [child for parent, key in self.parents(json_obj) for child in self._children(parent, key)]
+
+    def set(self, json_obj: Any, value: Any) -> Any:
+        """Set all elements the path points to, return the (possibly replaced) document."""
+        if not self.steps:
+            return value
+        parents = self.parents(json_obj)
+        if self.has_wildcard:
+            # Like JSON.SET of RedisJSON - existing elements are updated, missing keys are created only
+            # if none of the elements exists
+            existing = [(parent, key) for parent, key in parents if isinstance(parent, list) or key in parent]
+            parents = existing or parents
+        for parent, key in parents:
+            parent[key] = value
+        return json_obj
+
+    def _children(self, node: Any, step: Union[str, int, _Wildcard]) -> list:
+        if step is WILDCARD:
+            if isinstance(node, dict):
+                return list(node.values())
+            return list(node) if isinstance(node, list) else []
+        if not self.has_wildcard:
+            return [node[step]]
+        if not self._can_hold(node, step):
+            return []
+        try:
+            return [node[step]]
+        except KeyError:
+            return []
+
+    @staticmethod
+    def _keys(node: Any) -> list:
+        if isinstance(node, dict):
+            return list(node)
+        return list(range(len(node))) if isinstance(node, list) else []
+
+    @staticmethod
+    def _can_hold(node: Any, step: Union[str, int]) -> bool:
+        if isinstance(step, str):
+            return isinstance(node, dict)
+        return isinstance(node, list) and -len(node) <= step < len(node)
+
+
+@lru_cache(maxsize=1024)
+def compile_json_path(json_path: str) -> JsonPath:
+    """Return compiled JsonPath, the most recently used paths are cached."""
+    return JsonPath(json_path)
+
+
+def _parse_json_path(json_path: str) -> list:
+    steps = []
+    i = 1 if json_path.startswith("$") else 0
+    while i < len(json_path):
+        char = json_path[i]
+        if char == "[":
+            end = json_path.find("]", i)
+            if json_path[i + 1:i + 2] in ("'", '"'):  # Quoted key, may contain dots and brackets
+                quote = json_path[i + 1]
+                end = json_path.find(quote, i + 2)
+                if end == -1 or json_path[end + 1:end + 2] != "]":
+                    raise IncorrectPathError(f"Path '{json_path}' has an unterminated key at position {i}")
+                steps.append(json_path[i + 2:end])
+                end += 1
+            elif end == -1:
+                raise IncorrectPathError(f"Path '{json_path}' has an unterminated index at position {i}")
+            else:
+                index = json_path[i + 1:end].strip()
+                if index == "*":
+                    steps.append(WILDCARD)
+                else:
+                    try:
+                        steps.append(int(index))
+                    except ValueError as e:
+                        raise IncorrectPathError(f"Path '{json_path}' has an invalid index '{index}'") from e
+            i = end + 1
+        else:
+            if char == ".":
+                i += 1
+            end = i
+            while end < len(json_path) and json_path[end] not in ".[":
+                end += 1
+            key = json_path[i:end]
+            if key == "*":
+                steps.append(WILDCARD)
+            elif key:  # Empty keys come from the legacy root path "." or a leading dot, e.g. ".status"
+                steps.append(key)
+            i = end
+    return steps
+
+
 def access_element_by_path(json_obj: Union[dict, list], json_path: str) -> tuple: #[Optional[object], Optional[Union[str, int]]] #not compatible with Python 3.9
     """Traverse a JSON document under 'name' to access the object defined by the 'path' argument.
 
@@ -23,48 +287,135 @@ def access_element_by_path(json_obj: Union[dict, list], json_path: str) -> tuple
     tuple[referenced_object, key] --> referenced_object[key] = ...
 
     If referenced object is None, overwrite the json_obj itself, as the reference cannot be
-    constructed for outermost object.
+    constructed for outermost object. Paths with wildcards point to multiple objects, use JsonPath.parents().
     """
-    path_stack = parse_path_to_stack(json_path)
-    current_obj = json_obj
+    compiled_path = compile_json_path(json_path)
+    if compiled_path.has_wildcard:
+        raise IncorrectPathError(f"Path '{json_path}' contains a wildcard, use JsonPath.parents()")
 
-    if not path_stack: # With the empty stack, no reference can be passed - object must be overwritten directly
+    parents = compiled_path.parents(json_obj)
+    if not parents: # With the empty stack, no reference can be passed - object must be overwritten directly
         return None, None
+    return parents[0]  # Returning parent object and final key or index
 
+
+def apply_json_params(json_obj: Any, params: dict) -> Any:
+    """Set values of JSON paths in a decoded JSON document, return the (possibly replaced) document.
+
+    All paths are applied to the one decoded document, each of them is parsed only once per process.
+    """
+    for json_path, value in params.items():
+        json_obj = compile_json_path(json_path).set(json_obj, value)
+    return json_obj
+
+
+def to_jsonpath(json_path: str) -> str:
+    """Return the path in JSONPath syntax, legacy paths are converted - "." to "$", "job.nodes" to "$.job.nodes"."""
+    if json_path.startswith("$"):
+        return json_path
+    if json_path == ".":
+        return "$"
+    if json_path.startswith((".", "[")):
+        return "$" + json_path
+    return "$." + json_path
+
+
+def normalize_json_conditions(conditions: dict[str, Any]) -> dict[str, tuple]:
+    """Return conditions as path -> tuple of allowed values, a single allowed value may be passed without a tuple.
+
+    Only scalar values (str, int, float, bool, None) can be compared, also by the Lua scripts on Redis.
+    """
+    normalized = {}
+    for json_path, allowed_values in conditions.items():
+        if not isinstance(allowed_values, (tuple, list, set, frozenset)):
+            allowed_values = (allowed_values,)
+        for value in allowed_values:
+            if value is not None and not isinstance(value, (str, int, float)):
+                raise ValueError(f"Condition on '{json_path}' can compare only scalar values, got {type(value)}")
+        normalized[json_path] = tuple(allowed_values)
+    return normalized
+
+
+def json_conditions_match(json_obj: Any, conditions: dict[str, tuple]) -> bool:
+    """Return True if every element each path points to has one of the allowed values, a missing element is None."""
+    for json_path, allowed_values in conditions.items():
+        try:
+            values = compile_json_path(json_path).get(json_obj)
+        except (KeyError, IndexError, TypeError, IncorrectPathError):
+            values = []
+        if any(value not in allowed_values for value in values or (None,)):
+            return False
+    return True
+
+
+def project_record(record: Any, return_fields: Iterable[str]) -> dict[str, Any]:
+    """Return only the requested fields of a record, fields are names or JSON paths, a missing field is None."""
+    projected = {}
+    for field in return_fields:
+        try:
+            values = compile_json_path(to_jsonpath(field)).get(record)
+        except (KeyError, IndexError, TypeError, IncorrectPathError):
+            values = []
+        projected[field] = values[0] if values else None
+    return projected
+
+
+def increment_json_values(json_obj: Any, json_path: str, amount: Union[int, float]) -> Optional[Union[int, float]]:
+    """Add 'amount' to every number the path points to, the same rule is implemented by JSON_INCR_SCRIPT on Redis.
+
+    Without wildcards, a missing element of an object (or a null element) is created with value 'amount',
+    IncorrectPathError is raised if its parent does not exist or is not an object - the document is not changed then.
+    With wildcards, only the matched numbers are incremented.
+
+    :return: the new value of the last element, None if it is not a number
+    :rtype: Optional[Union[int, float]]
+    """
+    compiled_path = compile_json_path(json_path)
     try:
-        for key in path_stack[:-1]:
-            current_obj = current_obj[key]
-        final_key = path_stack[-1]
-    except (AttributeError, IndexError) as e:
+        parents = compiled_path.parents(json_obj)
+    except (KeyError, TypeError) as e:
         raise IncorrectPathError(f"Path '{json_path}' could not be accessed") from e
+    if not compiled_path.has_wildcard:
+        for parent, key in parents:
+            if isinstance(parent, dict) and isinstance(key, str):
+                continue
+            if isinstance(parent, list) and isinstance(key, int) and -len(parent) <= key < len(parent):
+                continue
+            raise IncorrectPathError(f"Path '{json_path}' points to an element which can not be created")
+
+    new_value = None
+    for parent, key in parents:
+        current = parent.get(key) if isinstance(parent, dict) else parent[key]
+        if current is None and not compiled_path.has_wildcard:
+            new_value = parent[key] = amount
+        elif isinstance(current, (int, float)) and not isinstance(current, bool):
+            new_value = parent[key] = current + amount
+        else:
+            new_value = None
+    return new_value
+
+
+def parent_json_path(json_path: str) -> Optional[str]:
+    """Return JSONPath of the parent of the element a path points to, None for paths with wildcards.
+
+    e.g. "$.stats.retries" -> '$["stats"]', "$.nodes[2]" -> '$["nodes"]', "$.retries" -> "$"
+    """
+    compiled_path = compile_json_path(json_path)
+    if compiled_path.has_wildcard:
+        return None
+    return "$" + "".join(
+        f"[{step}]" if isinstance(step, int) else f"[{json.dumps(step)}]" for step in compiled_path.steps[:-1]
+    )
 
-    return current_obj, final_key  # Returning parent object and final key or index
 
 def parse_path_to_stack(json_path: str) -> list: #[Union[int, str]] #not compatible with python 3.9
     """Deconstruct path string into a stack of references allowing traversal.
 
     :param json_path: Redis JSON path string e.g. "$.job.nodes[2].status"
     :type json_path: str
-    :return: ["$", "job", "nodes", 2, "status"]
+    :return: ["job", "nodes", 2, "status"]
     :rtype: list[Union[int, str]]
 
-    e.g. "$.job.nodes[2].status" -> ["$", "job", "nodes", 2, "status"]
+    e.g. "$.job.nodes[-1].status" -> ["job", "nodes", -1, "status"], "$.jobs[*]" -> ["jobs", WILDCARD]
     """
-    elements = json_path.split(".")
-    pattern = r"\[(\d+)\]"  # Find any number consisting of 1 or more digits, enclosed by []
-    stack = []
-
-    try:
-        for element in elements:
-            key = element.split("[")[0]
-            if key != "$": # Omit root element
-                stack.append(key)
-
-            matches = re.findall(pattern, element)
-            for match in matches:
-                index = int(match)
-                stack.append(index)
-    except (AttributeError, IndexError, TypeError) as e:
-        raise IncorrectPathError(f"Path '{json_path}' could not be accessed") from e
-
-    return stack
+    return list(compile_json_path(json_path).steps)
@@ -0,0 +1,200 @@
+import datetime
+import json
+import types
+from typing import Any, Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from keepvariable.serialization import (
+    ChunkedDataFrameManifest,
+    dataframe_to_binary,
+    ndarray_to_binary,
+    text_to_binary_payload,
+)
+
+# encode(serializer, value, additional_params) -> str or bytes payload
+Encoder = Callable[[Any, Any, dict], Any]
+# decode(serializer, json-decoded dict with 'object_type') -> value
+Decoder = Callable[[Any, dict], Any]
+
+# Stored values which can be JSON start with one of these characters (after optional whitespace),
+# other strings are plain strings and are returned without trying json.loads()
+JSON_START_CHARACTERS = frozenset('{["-0123456789tfnNI \t\r\n')
+
+
+def _passthrough(serializer, value, additional_params: dict):
+    return value
+
+
+class CodecRegistry:
+    """Serialization of values by their type, used by KeepVariableSerializer.
+
+    Encoders are looked up by the exact type of a value, then by the classes of its MRO (so subclasses
+    share the codec of their base class), the result is cached per type. Values of types without a codec
+    are stored as they are (str, bytes). Encoded JSON objects carry their codec in the 'object_type'
+    tag, decode_loaded_value() dispatches on it directly.
+    """
+
+    def __init__(self):
+        self._encoders: dict[type, Encoder] = {}
+        self._decoders: dict[str, Decoder] = {}
+        self._tags: dict[str, type] = {}
+        self._resolved: dict[type, Encoder] = {}  # Cache of MRO lookups
+
+    def copy(self) -> "CodecRegistry":
+        registry = CodecRegistry()
+        registry._encoders = dict(self._encoders)
+        registry._decoders = dict(self._decoders)
+        registry._tags = dict(self._tags)
+        return registry
+
+    def register_encoder(self, type_: type, encoder: Encoder):
+        self._encoders[type_] = encoder
+        self._resolved = {}
+
+    def register_decoder(self, tag: str, decoder: Decoder):
+        self._decoders[tag] = decoder
+
+    def register(
+        self, type_: type, tag: str, encode: Callable[[Any], Any], decode: Callable[[Any], Any]
+    ):
+        """Register a codec for values of 'type_' (and its subclasses without their own codec).
+
+        Values are stored as JSON {"object_type": tag, "data": encode(value)}, decode(data) restores them.
+
+        e.g. register(decimal.Decimal, "decimal.Decimal", str, decimal.Decimal)
+
+        :param type_: class of the values
+        :type type_: type
+        :param tag: unique name of the codec stored with the values, it must not change once values are stored
+        :type tag: str
+        :param encode: converts a value into JSON serializable data
+        :type encode: Callable[[Any], Any]
+        :param decode: converts the data back into a value
+        :type decode: Callable[[Any], Any]
+        """
+        if self._tags.get(tag, type_) is not type_:
+            raise ValueError(f"Codec tag '{tag}' is already registered for {self._tags[tag]}")
+        if tag in self._decoders and tag not in self._tags:
+            raise ValueError(f"Codec tag '{tag}' is used by a built-in codec")
+        self._tags[tag] = type_
+
+        def encoder(serializer, value, additional_params: dict) -> str:
+            return json.dumps({"object_type": tag, "data": encode(value)})
+
+        def decoder(serializer, value: dict):
+            return decode(value["data"])
+
+        self.register_encoder(type_, encoder)
+        self.register_decoder(tag, decoder)
+
+    def encoder(self, type_: type) -> Encoder:
+        encoder = self._resolved.get(type_)
+        if encoder is None:
+            encoder = next((self._encoders[cls] for cls in type_.__mro__ if cls in self._encoders), _passthrough)
+            self._resolved[type_] = encoder
+        return encoder
+
+    def decoder(self, tag: Any) -> Optional[Decoder]:
+        return self._decoders.get(tag) if isinstance(tag, str) else None
+
+
+def _encode_json(serializer, value, additional_params: dict) -> str:
+    return json.dumps(value)
+
+
+def _encode_none(serializer, value, additional_params: dict) -> str:
+    return '{"object_type": "NoneType"}'  # Redis does not natively support None values
+
+
+def _encode_dataframe(serializer, value: pd.DataFrame, additional_params: dict):
+    if serializer.dataframe_codec == "json":
+        return serializer._json_serialize_dataframe(value)
+    return dataframe_to_binary(value, serializer.dataframe_codec)
+
+
+def _encode_ndarray(serializer, value: np.ndarray, additional_params: dict):
+    if value.dtype.hasobject:  # Python objects have no raw buffer representation
+        return json.dumps({"data": value.tolist(), "object_type": "np.ndarray"})
+    # Raw buffer with dtype/shape header, decoded without copying - the loaded array is read-only
+    return ndarray_to_binary(value)
+
+
+def _encode_datetime(serializer, value: datetime.datetime, additional_params: dict) -> str:
+    # Microseconds and UTC offset are written only when set, so naive whole-second values keep the old format.
+    # datetime.isoformat() also for pd.Timestamp, whose own isoformat() writes nanoseconds fromisoformat() rejects
+    return json.dumps({"data": datetime.datetime.isoformat(value, sep=" "), "object_type": "datetime.datetime"})
+
+
+def _encode_function(serializer, value, additional_params: dict) -> str:
+    return json.dumps({"code": additional_params.get("code"), "object_type": "function"})
+
+
+def _encode_class(serializer, value, additional_params: dict) -> str:
+    return json.dumps({"code": additional_params.get("code"), "object_type": "class"})
+
+
+def _decode_dataframe(serializer, value: dict) -> pd.DataFrame:
+    df = pd.DataFrame(value["data"], columns=value["columns"])
+    if "attrs" in value:
+        df.attrs = value["attrs"]
+    if "index_names" in value:  # Values written before index metadata was stored get the default index
+        df.index = _decode_dataframe_index(value["index"], value["index_names"], value.get("index_dtype"))
+    return df
+
+
+def _decode_dataframe_index(values: list, names: list, dtype: Optional[str]) -> pd.Index:
+    if len(names) > 1:
+        return pd.MultiIndex.from_tuples([tuple(item) for item in values], names=names)
+
+    index_dtype = pd.api.types.pandas_dtype(dtype) if dtype is not None else None
+    if index_dtype is not None and pd.api.types.is_datetime64_any_dtype(index_dtype):
+        # to_json() writes datetimes as epoch milliseconds
+        index = pd.to_datetime(values, unit="ms", utc=isinstance(index_dtype, pd.DatetimeTZDtype))
+        if isinstance(index_dtype, pd.DatetimeTZDtype):
+            index = index.tz_convert(index_dtype.tz)
+        return pd.Index(index.astype(index_dtype), name=names[0])
+    index = pd.Index(values, name=names[0])
+    return index if index_dtype is None else index.astype(index_dtype)
+
+
+def _decode_ndarray(serializer, value: dict) -> np.ndarray:
+    return pd.DataFrame(value["data"]).values  # to ensure 64bit values in array
+
+
+def _decode_datetime(serializer, value: dict) -> datetime.datetime:
+    return datetime.datetime.fromisoformat(value["data"])
+
+
+def _decode_code(serializer, value: dict):
+    return value["code"]  # Functions and classes are not evaluated, only their code is returned
+
+
+default_codecs = CodecRegistry()
+for _type in (list, bool, dict, int, float):
+    default_codecs.register_encoder(_type, _encode_json)
+default_codecs.register_encoder(type(None), _encode_none)
+default_codecs.register_encoder(pd.DataFrame, _encode_dataframe)
+default_codecs.register_encoder(np.ndarray, _encode_ndarray)
+default_codecs.register_encoder(datetime.datetime, _encode_datetime)
+default_codecs.register_encoder(types.FunctionType, _encode_function)
+default_codecs.register_encoder(type, _encode_class)
+
+default_codecs.register_decoder("NoneType", lambda serializer, value: None)
+default_codecs.register_decoder(
+    "binary", lambda serializer, value: serializer._decode_binary_payload(text_to_binary_payload(value))
+)
+default_codecs.register_decoder(
+    ChunkedDataFrameManifest.object_type, lambda serializer, value: ChunkedDataFrameManifest.from_dict(value)
+)
+default_codecs.register_decoder("pd.DataFrame", _decode_dataframe)
+default_codecs.register_decoder("np.ndarray", _decode_ndarray)
+default_codecs.register_decoder("datetime.datetime", _decode_datetime)
+default_codecs.register_decoder("function", _decode_code)
+default_codecs.register_decoder("class", _decode_code)
+
+
+def register_codec(type_: type, tag: str, encode: Callable[[Any], Any], decode: Callable[[Any], Any]):
+    """Register a codec of user type for all servers which use the default registry, see CodecRegistry.register()."""
+    default_codecs.register(type_, tag, encode, decode)
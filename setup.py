@@ -21,6 +21,13 @@ setuptools.setup(
     install_requires=[
           'redis'
      ],
+    extras_require={
+          'arrow': ['pyarrow'],
+          'lz4': ['lz4'],
+          'zstd': ['zstandard'],
+          'prometheus': ['prometheus_client'],
+          'opentelemetry': ['opentelemetry-api'],
+     },
     python_requires='>=3.6',
 )
     
\ No newline at end of file
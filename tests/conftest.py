@@ -0,0 +1,40 @@
+import pytest
+
+from keepvariable.keepvariable_core import KeepVariableDummyRedisServer, KeepVariableRedisServer
+from keepvariable.keepvariable_sqlite import KeepVariableSQLiteServer
+
+
+@pytest.fixture
+def fakeredis():
+    """fakeredis module - in-process Redis with RedisJSON and Lua scripting, tests of Redis servers are skipped without it."""
+    return pytest.importorskip("fakeredis")
+
+
+@pytest.fixture
+def fake_redis_kwargs(fakeredis):
+    """Connection arguments of KeepVariableRedisServer pools connecting to one in-process fakeredis server."""
+    connection_class = getattr(fakeredis, "FakeRedisConnection", None) or fakeredis.FakeConnection
+    return {"connection_class": connection_class, "server": fakeredis.FakeServer()}
+
+
+@pytest.fixture
+def redis_server(fake_redis_kwargs):
+    return KeepVariableRedisServer(**fake_redis_kwargs)
+
+
+@pytest.fixture
+def dummy_server(tmp_path):
+    return KeepVariableDummyRedisServer(storage_path=str(tmp_path / "kv_storage.json"))
+
+
+@pytest.fixture
+def sqlite_server(tmp_path):
+    server = KeepVariableSQLiteServer(str(tmp_path / "kv_storage.sqlite"))
+    yield server
+    server.close()
+
+
+@pytest.fixture(params=["dummy", "sqlite", "redis"])
+def any_server(request):
+    """Every synchronous backend, for behaviour which has to be the same on all of them."""
+    return request.getfixturevalue(f"{request.param}_server")
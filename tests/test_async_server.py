@@ -0,0 +1,127 @@
+import asyncio
+import datetime
+import types
+
+import pandas as pd
+import pytest
+
+import keepvariable.keepvariable_async as kv_async
+from keepvariable.keepvariable_core import KeepVariableRedisServer
+
+
+@pytest.fixture
+def servers(monkeypatch, fakeredis, fake_redis_kwargs):
+    """Sync server storing chunked DataFrames and async server reading the same fakeredis server."""
+    fake_server = fake_redis_kwargs["server"]
+
+    def fake_async_redis(*args, decode_responses=False, **kwargs):
+        return fakeredis.FakeAsyncRedis(server=fake_server, decode_responses=decode_responses)
+
+    monkeypatch.setattr(kv_async.aioredis, "Redis", fake_async_redis)
+    sync_server = KeepVariableRedisServer(dataframe_chunk_rows=2, **fake_redis_kwargs)
+    return sync_server, kv_async.AsyncKeepVariableRedisServer()
+
+
+def test_chunked_dataframes_are_assembled(servers):
+    sync_server, async_server = servers
+    df = pd.DataFrame({"a": range(5), "b": list("vwxyz")})
+    sync_server.set("frames:df", df)
+    sync_server.set("frames:plain", {"x": 1})
+
+    async def read():
+        value = await async_server.get("frames:df")
+        values = await async_server.mget(["frames:df", "frames:plain", "frames:missing"])
+        scanned = {key: value async for key, value in async_server.scan_values("frames:*")}
+        return value, values, scanned
+
+    value, values, scanned = asyncio.run(read())
+    pd.testing.assert_frame_equal(value, df)
+    pd.testing.assert_frame_equal(values[0], df)
+    assert values[1:] == [{"x": 1}, None]
+    pd.testing.assert_frame_equal(scanned["frames:df"], df)
+    assert scanned["frames:plain"] == {"x": 1}
+
+
+@pytest.mark.parametrize("lua_scripting", [True, False])
+def test_json_documents_are_decoded_by_decode_loaded_value(servers, lua_scripting):
+    sync_server, async_server = servers
+    sync_server.json_mset("moment", {"$": {"data": "2024-01-02 03:04:05.5", "object_type": "datetime.datetime"}})
+    sync_server.json_mset("text", {"$": "plain"})
+    if not lua_scripting:
+        async_server._get_values_script = None  # MGET and JSON.MGET fallback
+
+    values = asyncio.run(async_server.mget(["moment", "text"]))
+    assert values == [datetime.datetime(2024, 1, 2, 3, 4, 5, 500000), "plain"]
+
+
+def test_json_incr_follows_the_sync_rules(servers):
+    sync_server, async_server = servers
+
+    async def increment():
+        first = await async_server.json_incr("counters", "$.runs")
+        with pytest.raises(AssertionError):
+            await async_server.json_incr("counters", "$.stats.runs")
+        return first, await async_server.json_incr("counters", "$.runs", 2)
+
+    assert asyncio.run(increment()) == (1, 3)
+    assert sync_server.get("counters") == {"runs": 3}
+
+
+def test_dummy_iter_query(tmp_path):
+    server = kv_async.AsyncKeepVariableDummyRedisServer(storage_path=str(tmp_path / "kv_storage.json"))
+
+    async def query():
+        for i in range(3):
+            await server.set(f"jobs:{i}", {"status": "DONE" if i else "QUEUED", "id": i})
+        return [
+            record async for record in server.iter_query(
+                entity_key="jobs", tag_params={"status": ("DONE",)}, page_size=1, return_fields=["id"]
+            )
+        ]
+
+    assert asyncio.run(query()) == [("jobs:1", {"id": 1}), ("jobs:2", {"id": 2})]
+
+
+class ScriptedSearchIndex:
+    """Stand-in for the RedisSearch index - FT.AGGREGATE cursor pages, fakeredis has no search module."""
+
+    def __init__(self, pages):
+        self.pages = pages
+        self.requests = []
+
+    async def aggregate(self, request):
+        self.requests.append(request)
+        rows, cid = self.pages[len(self.requests) - 1]
+        return types.SimpleNamespace(rows=rows, cursor=types.SimpleNamespace(cid=cid))
+
+
+def test_redis_iter_query_reads_cursor_pages(servers, monkeypatch):
+    sync_server, async_server = servers
+    search_index = ScriptedSearchIndex([
+        ([["__key", "jobs:1", "__field_0", '"QUEUED"']], 7),
+        ([["__key", "jobs:2", "__field_0", '"DONE"']], 0),
+    ])
+    monkeypatch.setattr(async_server.redis, "ft", lambda index_key: search_index)
+
+    async def query():
+        return [record async for record in async_server.iter_query(entity_key="jobs", return_fields=["status"])]
+
+    assert asyncio.run(query()) == [("jobs:1", {"status": "QUEUED"}), ("jobs:2", {"status": "DONE"})]
+    assert len(search_index.requests) == 2
+
+
+def test_overwriting_and_deleting_chunked_dataframes_discards_chunks(servers):
+    sync_server, async_server = servers
+    sync_server.set("frames:df", pd.DataFrame({"a": range(5)}))
+    sync_server.set("frames:other", pd.DataFrame({"a": range(3)}))
+    old_chunk_keys = sync_server.scan("frames:df:chunks:*")
+    other_chunk_keys = sync_server.scan("frames:other:chunks:*")
+
+    async def overwrite_and_delete():
+        await async_server.set("frames:df", {"x": 1})
+        deleted = await async_server.delete("frames:other")
+        return await async_server.get("frames:df"), deleted
+
+    assert asyncio.run(overwrite_and_delete()) == ({"x": 1}, 1)
+    assert old_chunk_keys and all(0 < sync_server.redis.ttl(key) <= 60 for key in old_chunk_keys)
+    assert not sync_server.redis.exists(*other_chunk_keys)
@@ -0,0 +1,62 @@
+import importlib.util
+import linecache
+import os
+
+import pytest
+
+import keepvariable.keepvariable_core as kv_core
+from keepvariable.keepvariable_core import Var
+
+
+@pytest.fixture(autouse=True)
+def clean_kept_variables():
+    kv_core.kept_variables.clear()
+    yield
+    kv_core.kept_variables.clear()
+
+
+def test_source_line_of_repeated_calls_is_read_once(monkeypatch):
+    read_lines = []
+    read_source_line = kv_core._read_source_line
+
+    def counting_read_source_line(frame):
+        read_lines.append(frame.f_lineno)
+        return read_source_line(frame)
+
+    monkeypatch.setattr(kv_core, "_read_source_line", counting_read_source_line)
+
+    for i in range(3):
+        counter = Var(i)
+    assert counter == 2 and kv_core.kept_variables == {"counter": 2}
+    assert len(read_lines) == 1
+
+
+def test_call_without_source_warns_on_every_call(capsys):
+    namespace = {"Var": Var}
+    for _ in range(2):
+        exec("value = Var(5)", namespace)
+
+    assert namespace["value"] == 5
+    assert capsys.readouterr().out.count("source code of the call is not available") == 2
+    assert kv_core.kept_variables == {}
+
+
+def test_multi_line_call():
+    value = Var(
+        [1, 2]
+    )
+    assert value == [1, 2] and kv_core.kept_variables == {"value": [1, 2]}
+
+
+def test_changed_source_file_is_read_again(tmp_path):
+    module_path = tmp_path / "changed_module.py"
+    module_path.write_text("from keepvariable.keepvariable_core import Var\nold_name = Var(1)\n")
+    assert linecache.getline(str(module_path), 2).startswith("old_name")  # e.g. read for a traceback
+
+    module_path.write_text("from keepvariable.keepvariable_core import Var\nchanged_name = Var(1)\n")
+    stat = os.stat(module_path)
+    os.utime(module_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+    spec = importlib.util.spec_from_file_location("changed_module", module_path)
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+
+    assert kv_core.kept_variables == {"changed_name": 1}
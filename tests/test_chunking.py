@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+
+from keepvariable.keepvariable_core import KeepVariableRedisServer
+
+
+@pytest.fixture
+def chunked_server(any_server):
+    """Every synchronous backend storing DataFrames of more than 3 rows in chunks."""
+    any_server.dataframe_chunk_rows = 3
+    if isinstance(any_server, KeepVariableRedisServer):
+        any_server.chunk_grace_period = 0  # EXPIRE with 0 deletes the chunks at once, like the other backends
+    return any_server
+
+
+def chunk_keys(server, key):
+    return sorted(server.scan(f"{key}:chunks:*"))
+
+
+@pytest.mark.parametrize("df", [
+    pd.DataFrame({"a": range(7), "b": [f"v{i}" for i in range(7)]}),
+    pd.DataFrame({"a": range(6)}, index=[f"r{i}" for i in range(6)]),
+    pd.DataFrame({"a": [1.5, 2.5, 3.5, 4.5]}, index=pd.RangeIndex(10, 14)),
+], ids=["remainder", "str-index", "offset-range"])
+def test_chunked_dataframe_round_trip(chunked_server, df):
+    df.attrs = {"source": "test"}
+    chunked_server.set("df", df)
+
+    assert len(chunk_keys(chunked_server, "df")) == -(-len(df) // 3)
+    loaded = chunked_server.get("df")
+    pd.testing.assert_frame_equal(loaded, df)
+    assert loaded.attrs == {"source": "test"}
+    pd.testing.assert_frame_equal(chunked_server.mget(["df"])[0], df)
+
+
+def test_small_dataframe_is_not_chunked(chunked_server):
+    df = pd.DataFrame({"a": range(3)})
+    chunked_server.set("df", df)
+    assert chunk_keys(chunked_server, "df") == []
+    pd.testing.assert_frame_equal(chunked_server.get("df"), df)
+
+
+def test_overwriting_chunked_dataframe_discards_old_chunks(chunked_server):
+    chunked_server.set("df", pd.DataFrame({"a": range(9)}))
+    old_keys = chunk_keys(chunked_server, "df")
+
+    smaller = pd.DataFrame({"a": range(4)})
+    chunked_server.set("df", smaller)
+    new_keys = chunk_keys(chunked_server, "df")
+    assert len(new_keys) == 2 and not set(old_keys) & set(new_keys)
+    pd.testing.assert_frame_equal(chunked_server.get("df"), smaller)
+
+    chunked_server.set("df", {"plain": True})
+    assert chunk_keys(chunked_server, "df") == []
+    assert chunked_server.get("df") == {"plain": True}
+
+
+def test_deleting_chunked_dataframe_deletes_chunks(chunked_server):
+    chunked_server.set("df", pd.DataFrame({"a": range(5)}))
+    assert chunked_server.delete("df") == 1
+    assert chunk_keys(chunked_server, "df") == []
+    assert chunked_server.get("df") is None
+
+
+def test_iter_chunks(chunked_server):
+    df = pd.DataFrame({"a": range(7)})
+    chunked_server.set("df", df)
+    chunked_server.set("plain", {"x": 1})
+
+    chunks = list(chunked_server.iter_chunks("df"))
+    assert [len(chunk) for chunk in chunks] == [3, 3, 1]
+    assert [chunk.index[0] for chunk in chunks] == [0, 3, 6]  # Index of the whole DataFrame
+    pd.testing.assert_frame_equal(pd.concat(chunks), df)
+
+    assert list(chunked_server.iter_chunks("plain")) == [{"x": 1}]
+    assert list(chunked_server.iter_chunks("missing")) == []
+
+
+def test_iter_chunks_raises_for_missing_chunk(chunked_server):
+    chunked_server.set("df", pd.DataFrame({"a": range(5)}))
+    chunked_server.delete(chunk_keys(chunked_server, "df")[-1])
+
+    chunks = chunked_server.iter_chunks("df")
+    next(chunks)
+    with pytest.raises(KeyError):
+        next(chunks)
+
+
+def test_redis_chunks_of_overwritten_dataframe_expire(redis_server):
+    redis_server.dataframe_chunk_rows = 3
+    redis_server.set("df", pd.DataFrame({"a": range(5)}))
+    old_keys = chunk_keys(redis_server, "df")
+    redis_server.set("df", pd.DataFrame({"a": range(5)}))
+
+    assert all(0 < redis_server.redis.ttl(key) <= redis_server.chunk_grace_period for key in old_keys)
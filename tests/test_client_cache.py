@@ -0,0 +1,156 @@
+import queue
+import time
+
+import pandas as pd
+import pytest
+import redis
+
+import keepvariable.keepvariable_core as kv_core
+from keepvariable.client_cache import ClientSideCache, RedisInvalidationListener
+from keepvariable.connection_pool import KeepVariableConnectionPool
+
+
+class ScriptedConnection:
+    """Stand-in for the listener connection - replies to CLIENT ID and SUBSCRIBE, then returns queued messages."""
+
+    def __init__(self, **kwargs):
+        self.messages = queue.Queue()
+        self.replies = [7, [b"subscribe", RedisInvalidationListener.INVALIDATE_CHANNEL, 1]]
+
+    def connect(self):
+        pass
+
+    def send_command(self, *args):
+        pass
+
+    def read_response(self):
+        if self.replies:
+            return self.replies.pop(0)
+        message = self.messages.get(timeout=5)
+        if isinstance(message, Exception):
+            raise message
+        return message
+
+    def disconnect(self):
+        self.messages.put(redis.exceptions.ConnectionError("closed"))
+
+
+def wait_for(condition):
+    for _ in range(500):
+        if condition():
+            return
+        time.sleep(0.01)
+    raise AssertionError("condition was not met in time")
+
+
+def filled_cache(*keys):
+    cache = ClientSideCache()
+    for key in keys:
+        cache.put(key, {"key": key}, 10, cache.begin_read(key))
+    return cache
+
+
+def test_tracking_invalidations_remove_keys():
+    cache = filled_cache("a", "b")
+    listener = RedisInvalidationListener(cache, connection_class=ScriptedConnection)
+    assert listener.start() == 7
+    assert cache.tracking
+
+    listener.connection.messages.put([b"message", RedisInvalidationListener.INVALIDATE_CHANNEL, [b"a"]])
+    wait_for(lambda: cache.stats()["invalidations"] == 1)
+    assert cache.get("a") == (False, None)
+    assert cache.get("b") == (True, {"key": "b"})
+
+    listener.connection.messages.put([b"message", RedisInvalidationListener.INVALIDATE_CHANNEL, None])  # FLUSHALL
+    wait_for(lambda: cache.stats()["entries"] == 0)
+    listener.stop()
+
+
+def test_lost_listener_connection_flushes_cache_and_falls_back_to_ttl():
+    cache = filled_cache("a")
+    listener = RedisInvalidationListener(cache, connection_class=ScriptedConnection)
+    listener.start()
+    listener.stop()
+    wait_for(lambda: not cache.tracking)
+    assert cache.get("a") == (False, None)
+
+
+def test_invalidated_read_is_not_cached():
+    cache = ClientSideCache()
+    token = cache.begin_read("a")
+    cache.invalidate("a")  # Changed while the value was being fetched
+    cache.put("a", 1, 1, token)
+    assert cache.get("a") == (False, None)
+
+
+def test_cached_values_are_copies():
+    cache = filled_cache("a")
+    cache.put("df", pd.DataFrame({"x": [1]}), 10, cache.begin_read("df"))
+
+    found, value = cache.get("a")
+    value["key"] = "changed"
+    assert cache.get("a") == (True, {"key": "a"})
+
+    found, df = cache.get("df")
+    df.loc[0, "x"] = 2
+    assert cache.get("df")[1].loc[0, "x"] == 1
+
+
+@pytest.fixture
+def cached_redis_server(monkeypatch, fake_redis_kwargs):
+    class UnavailableListener(RedisInvalidationListener):
+        def start(self):
+            raise redis.exceptions.ResponseError("unknown command 'CLIENT TRACKING'")
+
+    monkeypatch.setattr(kv_core, "RedisInvalidationListener", UnavailableListener)
+    return kv_core.KeepVariableRedisServer(client_cache=ClientSideCache(ttl=60), **fake_redis_kwargs)
+
+
+def test_server_get_returns_copies_of_cached_values(cached_redis_server):
+    cached_redis_server.set("job", {"status": "QUEUED", "nodes": [1]})
+
+    job = cached_redis_server.get("job")  # Miss - the value is cached
+    job["status"] = "LOCAL-ONLY"
+    job["nodes"].append(2)
+    assert cached_redis_server.get("job") == {"status": "QUEUED", "nodes": [1]}  # Hit
+
+    cached_redis_server.get("job")["status"] = "LOCAL-ONLY"
+    assert cached_redis_server.get("job") == {"status": "QUEUED", "nodes": [1]}
+    assert cached_redis_server.client_cache.stats()["hits"] == 3
+
+
+def test_server_writes_invalidate_cached_values(cached_redis_server):
+    cached_redis_server.set("job", {"status": "QUEUED"})
+    cached_redis_server.get("job")
+    cached_redis_server.set("job", {"status": "DONE"})
+    assert cached_redis_server.get("job") == {"status": "DONE"}
+
+
+def test_close_stops_listener_and_disconnects_own_pools(monkeypatch, fake_redis_kwargs):
+    class ScriptedListener(RedisInvalidationListener):
+        def __init__(self, cache, **kwargs):
+            super().__init__(cache, connection_class=ScriptedConnection)
+
+        def enable_tracking(self, connection):
+            connection.on_connect()  # fakeredis does not know CLIENT TRACKING
+
+    monkeypatch.setattr(kv_core, "RedisInvalidationListener", ScriptedListener)
+    with kv_core.KeepVariableRedisServer(client_cache=ClientSideCache(), **fake_redis_kwargs) as server:
+        listener = server._invalidation_listener
+        server.set("a", 1)
+        assert server.get("a") == 1 and listener._thread.is_alive()
+        disconnected = []
+        monkeypatch.setattr(server.connection_pool, "disconnect", lambda: disconnected.append(True))
+
+    assert not listener._thread.is_alive() and not server.client_cache.tracking
+    assert disconnected == [True]
+
+
+def test_close_leaves_shared_pool_open(monkeypatch, fake_redis_kwargs):
+    pool = KeepVariableConnectionPool(**fake_redis_kwargs)
+    disconnected = []
+    monkeypatch.setattr(pool, "disconnect", lambda: disconnected.append(True))
+    with kv_core.KeepVariableRedisServer(connection_pool=pool) as server:
+        server.set("a", 1)
+    assert kv_core.KeepVariableRedisServer(connection_pool=pool).get("a") == 1
+    assert disconnected == []
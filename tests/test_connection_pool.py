@@ -0,0 +1,112 @@
+import types
+
+import pytest
+import redis
+
+from keepvariable.connection_pool import KeepVariableConnectionPool, _pool_stats
+from keepvariable.keepvariable_core import KeepVariableRedisServer
+
+
+@pytest.fixture
+def flaky_connection_class(fake_redis_kwargs):
+    """fakeredis connection failing the number of sends set in its 'failures' attribute."""
+    class FlakyConnection(fake_redis_kwargs["connection_class"]):
+        failures = 0
+
+        def send_packed_command(self, *args, **kwargs):
+            if FlakyConnection.failures:
+                FlakyConnection.failures -= 1
+                raise redis.ConnectionError("Connection reset by peer")
+            return super().send_packed_command(*args, **kwargs)
+
+    return FlakyConnection
+
+
+def test_stats_count_created_used_and_idle_connections(fake_redis_kwargs):
+    pool = KeepVariableConnectionPool(max_connections=5, **fake_redis_kwargs)
+    assert pool.stats()["text"] == {"created": 0, "in_use": 0, "available": 0, "max_connections": 5}
+
+    connection = pool.text_pool.get_connection()
+    other_connection = pool.text_pool.get_connection()
+    pool.text_pool.release(other_connection)
+    assert pool.stats() == {
+        "text": {"created": 2, "in_use": 1, "available": 1, "max_connections": 5},
+        "binary": {"created": 0, "in_use": 0, "available": 0, "max_connections": 5},
+    }
+    pool.text_pool.release(connection)
+
+
+@pytest.mark.parametrize("blocking", [False, True])
+def test_stats_without_public_connection_counts(monkeypatch, fake_redis_kwargs, blocking):
+    pool = KeepVariableConnectionPool(blocking=blocking, max_connections=3, **fake_redis_kwargs)
+    monkeypatch.setattr(pool.text_pool, "get_connection_count", None)  # redis-py < 7
+    connection = pool.text_pool.get_connection()
+    assert pool.stats()["text"] == {"created": 1, "in_use": 1, "available": 0, "max_connections": 3}
+    pool.text_pool.release(connection)
+    assert pool.stats()["text"] == {"created": 1, "in_use": 0, "available": 1, "max_connections": 3}
+
+
+def test_stats_of_pool_without_known_attributes():
+    pool = types.SimpleNamespace(max_connections=2 ** 31)
+    assert _pool_stats(pool) == {"created": None, "in_use": None, "available": None, "max_connections": None}
+
+
+def test_blocking_pool_waits_for_free_connection(fake_redis_kwargs):
+    pool = KeepVariableConnectionPool(blocking=True, max_connections=2, blocking_timeout=0.05, **fake_redis_kwargs)
+    assert isinstance(pool.text_pool, redis.BlockingConnectionPool)
+    connections = [pool.text_pool.get_connection() for _ in range(2)]
+    assert pool.stats()["text"] == {"created": 2, "in_use": 2, "available": 0, "max_connections": 2}
+
+    with pytest.raises(redis.ConnectionError):
+        pool.text_pool.get_connection()  # No connection is released within blocking_timeout
+    for connection in connections:
+        pool.text_pool.release(connection)
+
+    server = KeepVariableRedisServer(connection_pool=pool)
+    server.set("a", 1)
+    assert server.get("a") == 1
+
+
+def test_blocking_pool_has_default_max_connections(fake_redis_kwargs):
+    pool = KeepVariableConnectionPool(blocking=True, **fake_redis_kwargs)
+    assert pool.stats()["binary"]["max_connections"] == 50
+
+
+def test_commands_are_retried_with_backoff(fake_redis_kwargs, flaky_connection_class):
+    kwargs = {**fake_redis_kwargs, "connection_class": flaky_connection_class}
+    server = KeepVariableRedisServer(retries=3, retry_backoff_base=0.001, retry_backoff_cap=0.002, **kwargs)
+    flaky_connection_class.failures = 2
+    server.set("a", 1)
+    assert server.get("a") == 1 and flaky_connection_class.failures == 0
+
+    server = KeepVariableRedisServer(retries=1, retry_backoff_base=0.001, retry_backoff_cap=0.002, **kwargs)
+    flaky_connection_class.failures = 3
+    with pytest.raises(redis.ConnectionError):
+        server.set("a", 2)
+
+
+def test_unix_socket_connections(tmp_path):
+    socket_path = str(tmp_path / "redis.sock")
+    pool = KeepVariableConnectionPool(unix_socket_path=socket_path, socket_keepalive=True)
+    for redis_pool in (pool.text_pool, pool.binary_pool):
+        assert redis_pool.connection_class is redis.UnixDomainSocketConnection
+        assert redis_pool.connection_kwargs["path"] == socket_path
+        assert "host" not in redis_pool.connection_kwargs and "socket_keepalive" not in redis_pool.connection_kwargs
+
+    server = KeepVariableRedisServer(unix_socket_path=socket_path)
+    assert server.connection_pool.text_pool.connection_kwargs["path"] == socket_path
+    with pytest.raises(redis.ConnectionError):  # Nothing listens on the socket
+        server.get("a")
+
+
+def test_pool_shared_by_servers(fake_redis_kwargs):
+    pool = KeepVariableConnectionPool(**fake_redis_kwargs)
+    writer = KeepVariableRedisServer(connection_pool=pool)
+    reader = KeepVariableRedisServer(connection_pool=pool)
+    writer.set("a", {"x": 1})
+    assert reader.get("a") == {"x": 1}
+
+    assert reader.pool_stats() == writer.pool_stats() == pool.stats()
+    assert pool.stats()["text"]["created"] == 1  # Connection of the writer was reused by the reader
+    with pytest.raises(ValueError):
+        KeepVariableRedisServer(connection_pool=pool, client_cache=object())
@@ -0,0 +1,170 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from keepvariable.keepvariable_core import KeepVariableDummyRedisServer
+
+
+@pytest.fixture
+def storage_path(tmp_path):
+    return str(tmp_path / "kv_storage.json")
+
+
+@pytest.mark.parametrize("write_log", [False, True])
+def test_compressed_and_binary_values_survive_reload(storage_path, write_log):
+    kwargs = {"compression": "zlib", "compression_threshold": 100, "dataframe_codec": "numpy", "write_log": write_log}
+    server = KeepVariableDummyRedisServer(storage_path=storage_path, **kwargs)
+    server.set("screenshot_1", "A" * 5000)  # Compressed into a JSON envelope
+    server.set("quoted", 'say "hi"\n')
+    server.set("array", np.arange(10))
+    server.set("df", pd.DataFrame({"x": range(100)}))
+    server.set("doc", {"a": [1, 2]})
+    if write_log:
+        server.compact()
+
+    reloaded = KeepVariableDummyRedisServer(storage_path=storage_path, **kwargs)
+    assert reloaded.get("screenshot_1") == "A" * 5000
+    assert reloaded.get("quoted") == 'say "hi"\n'
+    np.testing.assert_array_equal(reloaded.get("array"), np.arange(10))
+    pd.testing.assert_frame_equal(reloaded.get("df"), pd.DataFrame({"x": range(100)}))
+    assert reloaded.get("doc") == {"a": [1, 2]}
+
+
+def test_log_replayed_after_crash_during_compaction(storage_path):
+    server = KeepVariableDummyRedisServer(storage_path=storage_path, write_log=True)
+    server.set("doc", {"nodes": [], "lists": {"a": [1], "b": []}})
+    server.compact()
+    server.arrappend("doc", "$.nodes", [1, 2])
+    server.arrappend("doc", "$.lists.a", [3])
+    server.arrappend("doc", "$.lists.*", ["x"])  # Wildcard - matched arrays are written as a whole document
+    server.json_incr("doc", "$.retries")
+    server.json_incr("doc", "$.retries", 2)
+
+    with open(server.log_path, "rb") as file:
+        log = file.read()
+    server.compact()
+    with open(server.log_path, "wb") as file:  # Crash before the log was replaced
+        file.write(log)
+
+    expected = {"nodes": [1, 2], "lists": {"a": [1, 3, "x"], "b": ["x"]}, "retries": 3}
+    assert KeepVariableDummyRedisServer(storage_path=storage_path, write_log=True).get("doc") == expected
+
+
+def test_own_log_record_replayed_after_records_of_other_process(storage_path):
+    writer = KeepVariableDummyRedisServer(storage_path=storage_path, write_log=True)
+    writer.set("doc", {"nodes": []})
+    other = KeepVariableDummyRedisServer(storage_path=storage_path, write_log=True)
+    other.set("other", 1)
+    writer.arrappend("doc", "$.nodes", [1])  # Appended after the record of the other process
+    other.set("other", 2)
+    writer.json_incr("doc", "$.retries")
+
+    assert writer.get("doc") == {"nodes": [1], "retries": 1}
+    assert writer.get("other") == 2
+    assert other.get("doc") == {"nodes": [1], "retries": 1}
+
+
+@pytest.mark.parametrize("read_cache", [False, True])
+def test_mutations_of_returned_values_do_not_leak_into_storage(storage_path, read_cache):
+    server = KeepVariableDummyRedisServer(storage_path=storage_path, read_cache=read_cache)
+    server.set("doc", {"nodes": [1]})
+    server.get("doc")["nodes"].append("cached")
+    server.json_mset("doc", {"$.status": "DONE"})  # Decodes the live document
+    server.get("doc")["nodes"].append("live")
+
+    assert server.get("doc") == {"nodes": [1], "status": "DONE"}
+    assert KeepVariableDummyRedisServer(storage_path=storage_path).get("doc") == {"nodes": [1], "status": "DONE"}
+
+
+def test_arrays_are_read_only_unless_returned_from_read_cache(storage_path):
+    server = KeepVariableDummyRedisServer(storage_path=storage_path, read_cache=False)
+    server.set("array", np.arange(4))
+    assert not server.get("array").flags.writeable
+
+    cached = KeepVariableDummyRedisServer(storage_path=storage_path, read_cache=True)
+    array = cached.get("array")
+    array[0] = 10  # A copy of the cached value
+    np.testing.assert_array_equal(cached.get("array"), np.arange(4))
+
+
+def query_indexed_and_unindexed(server, **kwargs):
+    """Run the query with and without the tag indexes of the server, both must return the same records in the same order."""
+    indexed = server.query(**kwargs)
+    tag_indexes, server.tag_indexes = server.tag_indexes, {}
+    try:
+        unindexed = server.query(**kwargs)
+    finally:
+        server.tag_indexes = tag_indexes
+    assert list(indexed.items()) == list(unindexed.items())
+    return indexed
+
+
+TAG_QUERIES = [
+    {"tag_params": {"status": ("DONE",)}},
+    {"tag_params": {"status": ("QUEUED", "DONE")}},
+    {"tag_params": {"status": ("DONE", "QUEUED"), "owner": ("ann",)}},
+    {"tag_params": {"status": ("QUEUED", "DONE")}, "paginate": (1, 2)},
+    {"tag_params": {"status": ("QUEUED", "DONE")}, "field_to_sort_by": "priority", "asc": False},
+    {"tag_params": {"status": ("DONE",)}, "text_params": {"name": ("job",)}},
+]
+
+
+def assert_tag_queries_match(server):
+    for query in TAG_QUERIES:
+        query_indexed_and_unindexed(server, entity_key="jobs", **query)
+
+
+@pytest.mark.parametrize("write_log", [False, True])
+def test_indexed_tag_queries_match_unindexed(storage_path, write_log):
+    server = KeepVariableDummyRedisServer(
+        storage_path=storage_path, write_log=write_log, tag_indexes={"jobs": ("status", "owner")}
+    )
+    for i in range(6):
+        server.set(f"jobs:{i}", {"status": "QUEUED", "owner": "ann" if i % 2 else "bob", "priority": i % 3,
+                                 "name": f"job {i}"})
+    server.set("jobs:lock", {"status": "DONE"})  # Ignored keyword
+    server.set("jobs:empty", {"status": "", "owner": None})
+    server.set("jobs:array", [1, 2])
+    assert_tag_queries_match(server)
+
+    server.json_mset("jobs:3", {"$.status": "DONE"})
+    server.json_mset("jobs:0", {"$.status": "DONE", "$.owner": "ann"})
+    server.json_mset("jobs:9", {"$": {"status": "DONE", "owner": "ann", "priority": 9, "name": "new job"}})
+    server.set("jobs:1", {"status": "DONE", "owner": "bob", "priority": 0, "name": "job 1"})
+    server.mset({"jobs:4": {"status": "DONE", "owner": "ann", "priority": 2, "name": "job 4"}})
+    assert set(query_indexed_and_unindexed(server, entity_key="jobs", tag_params={"status": ("DONE",)})) == {
+        "jobs:0", "jobs:1", "jobs:3", "jobs:4", "jobs:9"
+    }
+    assert_tag_queries_match(server)
+
+    server.delete("jobs:3", "jobs:9")
+    server.json_mset("jobs:4", {"$.status": "QUEUED"})
+    assert set(query_indexed_and_unindexed(server, entity_key="jobs", tag_params={"status": ("DONE",)})) == {
+        "jobs:0", "jobs:1"
+    }
+    assert_tag_queries_match(server)
+
+    # Indexes of another process are rebuilt from the snapshot and the replayed log
+    reloaded = KeepVariableDummyRedisServer(
+        storage_path=storage_path, write_log=write_log, tag_indexes={"jobs": ("status", "owner")}
+    )
+    assert list(reloaded.query(entity_key="jobs", tag_params={"status": ("DONE",)})) == list(
+        server.query(entity_key="jobs", tag_params={"status": ("DONE",)})
+    )
+    assert_tag_queries_match(reloaded)
+
+
+def test_tag_indexes_follow_changes_of_other_process(storage_path):
+    kwargs = {"storage_path": storage_path, "write_log": True, "tag_indexes": {"jobs": ("status",)}}
+    reader = KeepVariableDummyRedisServer(**kwargs)
+    writer = KeepVariableDummyRedisServer(**kwargs)
+    reader.set("jobs:1", {"status": "QUEUED"})
+
+    writer.json_mset("jobs:1", {"$.status": "DONE"})
+    writer.set("jobs:2", {"status": "DONE"})
+    writer.delete("jobs:2")
+    writer.set("jobs:3", {"status": "DONE"})
+    assert list(query_indexed_and_unindexed(reader, entity_key="jobs", tag_params={"status": ("DONE",)})) == [
+        "jobs:1", "jobs:3"
+    ]
+    assert query_indexed_and_unindexed(reader, entity_key="jobs", tag_params={"status": ("QUEUED",)}) == {}
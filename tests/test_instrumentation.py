@@ -0,0 +1,43 @@
+import pytest
+
+from keepvariable.instrumentation import InMemoryMetricsCollector
+
+
+@pytest.fixture
+def metrics(any_server):
+    for i in range(5):
+        any_server.set(f"jobs:{i}", {"status": "QUEUED", "id": i})
+    return any_server.enable_metrics(InMemoryMetricsCollector())
+
+
+def test_streaming_operations_record_a_sample_per_page(any_server, metrics):
+    assert len(list(any_server.scan_values("jobs:*", count=2))) == 5
+    stats = metrics.snapshot()["scan_values"]
+    assert 3 <= stats["calls"] <= 4  # Pages of 2, 2 and 1 items, the last SCAN reply may be empty
+    assert stats["bytes_in"] > 0 and stats["latency"]["deserialize"]["count"] == stats["calls"]
+
+    assert sorted(any_server.scan_iter("jobs:*")) == [f"jobs:{i}" for i in range(5)]
+    assert metrics.snapshot()["scan_iter"]["calls"] >= 1
+
+
+def test_iter_query_pages_and_early_stop(dummy_server):
+    for i in range(5):
+        dummy_server.set(f"jobs:{i}", {"status": "QUEUED"})
+    metrics = dummy_server.enable_metrics(InMemoryMetricsCollector())
+
+    records = dummy_server.iter_query(entity_key="jobs", page_size=2)
+    next(records)
+    records.close()  # Partial page is recorded when the caller stops early
+    assert metrics.snapshot()["iter_query"]["calls"] == 1
+
+    assert len(list(dummy_server.iter_query(entity_key="jobs", page_size=2))) == 5
+    assert metrics.snapshot()["iter_query"]["calls"] == 4
+
+
+def test_streaming_inside_operation_is_accounted_to_it(dummy_server):
+    dummy_server.set("jobs:1", 1)
+    metrics = dummy_server.enable_metrics(InMemoryMetricsCollector())
+    assert dummy_server.scan("jobs:*") == ["jobs:1"]
+    assert "scan_iter" not in metrics.snapshot()
+    dummy_server.disable_metrics()
+    assert "scan_iter" not in dummy_server.__dict__
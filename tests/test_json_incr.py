@@ -0,0 +1,38 @@
+import pytest
+
+
+def test_missing_key_and_element_are_created(any_server):
+    assert any_server.json_incr("counters", "$.runs") == 1
+    assert any_server.json_incr("counters", "$.runs", 2) == 3
+    assert any_server.json_incr("counters", "$.seconds", 0.5) == 0.5
+    assert any_server.get("counters") == {"runs": 3, "seconds": 0.5}
+
+
+def test_null_element_is_replaced_and_other_values_are_kept(any_server):
+    any_server.json_mset("doc", {"$": {"retries": None, "status": "QUEUED", "nodes": [1, None]}})
+    assert any_server.json_incr("doc", "$.retries", 5) == 5
+    assert any_server.json_incr("doc", "$.status") is None
+    assert any_server.json_incr("doc", "$.nodes[0]") == 2
+    assert any_server.json_incr("doc", "$.nodes[1]") == 1
+    assert any_server.get("doc") == {"retries": 5, "status": "QUEUED", "nodes": [2, 1]}
+
+
+@pytest.mark.parametrize("path", ["$.stats.retries", "$.nodes[2]", "$.status.retries"])
+def test_missing_parent_raises_and_changes_nothing(any_server, path):
+    any_server.json_mset("doc", {"$": {"status": "QUEUED", "nodes": [1]}})
+    with pytest.raises(AssertionError):
+        any_server.json_incr("doc", path)
+    assert any_server.get("doc") == {"status": "QUEUED", "nodes": [1]}
+
+    with pytest.raises(AssertionError):
+        any_server.json_incr("missing", path)
+    assert any_server.get("missing") is None
+
+
+def test_wildcard_increments_only_matched_numbers(any_server):
+    any_server.json_mset("doc", {"$": {"counts": {"a": 1, "b": "x", "c": None}}})
+    assert any_server.json_incr("doc", "$.counts.*", 2) is None  # The last matched element is not a number
+    assert any_server.get("doc") == {"counts": {"a": 3, "b": "x", "c": None}}
+
+    assert any_server.json_incr("missing", "$.counts.*") is None
+    assert any_server.get("missing") is None
@@ -0,0 +1,21 @@
+import datetime
+
+import pytest
+
+from keepvariable.instrumentation import InMemoryMetricsCollector
+
+
+@pytest.mark.parametrize("lua_scripting", [True, False])
+def test_json_documents_are_decoded_by_decode_loaded_value(redis_server, lua_scripting):
+    if not lua_scripting:
+        redis_server._get_values_script = None  # MGET and JSON.MGET fallback
+    redis_server.json_mset("doc", {"$": {"nodes": [1]}})
+    redis_server.json_mset("moment", {"$": {"data": "2024-01-02 03:04:05", "object_type": "datetime.datetime"}})
+    redis_server.json_mset("text", {"$": "plain"})
+    metrics = redis_server.enable_metrics(InMemoryMetricsCollector())
+
+    assert redis_server.get("doc") == {"nodes": [1]}
+    assert redis_server.mget(["moment", "text"]) == [datetime.datetime(2024, 1, 2, 3, 4, 5), "plain"]
+    stats = metrics.snapshot()
+    assert stats["get"]["bytes_in"] > 0 and stats["mget"]["bytes_in"] > 0
+    assert stats["mget"]["latency"]["deserialize"]["sum"] > 0
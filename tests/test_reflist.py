@@ -0,0 +1,55 @@
+import random
+
+from keepvariable.keepvariable_core import RefList
+
+
+def rebuilt(ref_list):
+    """Elements of a list rebuilt from its referenced lists - what the incrementally updated elements must equal."""
+    if ref_list.referenced_lists is None:
+        return list(ref_list.elements)
+    return [element for referenced in ref_list.referenced_lists for element in rebuilt(referenced)]
+
+
+def test_changes_of_referenced_lists_propagate_on_all_levels():
+    a, b = RefList([1, 2]), RefList([10, 20])
+    p = RefList(referenced_lists=[a, b, a])
+    q = RefList(referenced_lists=[p, RefList(["Q"])])
+
+    a.append(3)
+    b.insert(0, 5)
+    a.pop(0)
+    assert p.elements == [2, 3, 5, 10, 20, 2, 3]
+    assert q.elements == p.elements + ["Q"]
+
+
+def test_direct_changes_of_aggregate_go_to_referenced_lists():
+    a, b, c = RefList([1, 2, 3, 4]), RefList([10, 20, 30, 40]), RefList(["P"])
+    p = RefList(referenced_lists=[a, b, c])
+
+    p.pop(0)
+    a.append(5)
+    assert p.elements == [2, 3, 4, 5, 10, 20, 30, 40, "P"]
+    assert a.elements == [2, 3, 4, 5]
+
+    p.insert(4, 6)  # Boundary of a and b - appended to a
+    p.pop(5)
+    p.append("R")
+    assert (a.elements, b.elements, c.elements) == ([2, 3, 4, 5, 6], [20, 30, 40], ["P", "R"])
+    assert p.elements == rebuilt(p)
+
+
+def test_random_changes_keep_all_lists_consistent():
+    rng = random.Random(0)
+    leaves = [RefList(list(range(rng.randrange(4)))) for _ in range(6)]
+    middle = [RefList(referenced_lists=rng.sample(leaves, 3)) for _ in range(3)]
+    top = RefList(referenced_lists=middle + [leaves[0]])
+    lists = leaves + middle + [top]
+
+    for step in range(500):
+        ref_list = rng.choice(lists)
+        if ref_list.elements and rng.random() < 0.4:
+            ref_list.pop(rng.randrange(len(ref_list)))
+        else:
+            ref_list.insert(rng.randrange(len(ref_list) + 1), step)
+        for checked in lists:
+            assert checked.elements == rebuilt(checked)
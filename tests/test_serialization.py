@@ -0,0 +1,149 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from keepvariable.keepvariable_core import KeepVariableSerializer, load_variable_safe, load_variables, save_variables
+from keepvariable.serialization import (
+    DATAFRAME_CODECS,
+    binary_to_ndarray,
+    is_codec_available,
+    ndarray_to_binary,
+    unpack_binary_payload,
+)
+
+
+def serializer(dataframe_codec="json"):
+    serializer = KeepVariableSerializer()
+    serializer.dataframe_codec = dataframe_codec
+    return serializer
+
+
+@pytest.mark.parametrize("dataframe_codec", [codec for codec in DATAFRAME_CODECS if is_codec_available(codec)])
+@pytest.mark.parametrize("index", [
+    pd.Index(["x", "y", "z"], name="name"),
+    pd.Index([10, 20, 30]),
+    pd.RangeIndex(5, 8),
+    pd.DatetimeIndex(["2024-01-01", "2024-01-02", "2024-01-03"], name="day"),
+    pd.DatetimeIndex(["2024-01-01", "2024-01-02", "2024-01-03"], tz="Europe/Prague"),
+], ids=["named-str", "int", "range", "datetime", "datetime-tz"])
+def test_dataframe_index_round_trip(dataframe_codec, index):
+    df = pd.DataFrame({"a": [1, 2, 3], "b": ["p", "q", "r"]}, index=index)
+    loaded = serializer(dataframe_codec).decode_loaded_value(serializer(dataframe_codec).parse_saved_value(df))
+    pd.testing.assert_frame_equal(loaded, df)
+
+
+@pytest.mark.parametrize("columns", [
+    pd.Index(["a", "b"], name="field"),
+    pd.Index([1, 2]),
+    pd.DatetimeIndex(["2024-01-01", "2024-01-02"], name="day"),
+], ids=["str", "int", "datetime"])
+def test_numpy_dataframe_column_labels_round_trip(columns):
+    df = pd.DataFrame([[1.5, 2.5], [3.5, 4.5]], columns=columns)
+    loaded = serializer("numpy").decode_loaded_value(serializer("numpy").parse_saved_value(df))
+    pd.testing.assert_frame_equal(loaded, df)
+
+
+def test_json_dataframe_multiindex_round_trip():
+    index = pd.MultiIndex.from_tuples([("a", 1), ("b", 2)], names=["letter", "number"])
+    df = pd.DataFrame({"v": [1.5, 2.5]}, index=index)
+    pd.testing.assert_frame_equal(serializer().decode_loaded_value(serializer().parse_saved_value(df)), df)
+
+
+def test_json_dataframe_default_index_is_not_stored():
+    df = pd.DataFrame({"a": [1, 2]})
+    assert '"index_names"' not in serializer().parse_saved_value(df)
+    pd.testing.assert_frame_equal(serializer().decode_loaded_value(serializer().parse_saved_value(df)), df)
+
+
+def test_json_dataframe_written_without_index_metadata_gets_default_index():
+    stored = '{"columns": ["a"], "index": ["x"], "data": [[1]], "object_type": "pd.DataFrame", "attrs": {}}'
+    pd.testing.assert_frame_equal(serializer().decode_loaded_value(stored), pd.DataFrame({"a": [1]}))
+
+
+def test_ndarray_and_datetime_round_trip():
+    array = np.arange(6, dtype=np.int32).reshape(2, 3)
+    np.testing.assert_array_equal(serializer().decode_loaded_value(serializer().parse_saved_value(array)), array)
+    moment = datetime.datetime(2024, 1, 2, 3, 4, 5)
+    assert serializer().decode_loaded_value(serializer().parse_saved_value(moment)) == moment
+
+
+@pytest.mark.parametrize("array", [
+    np.arange(24, dtype=np.float32).reshape(2, 3, 4),
+    np.asfortranarray(np.arange(6, dtype=np.int64).reshape(2, 3)),
+    np.array([(1, 2.5, b"ab"), (3, 4.5, b"cd")], dtype=[("id", "<i4"), ("value", ">f8"), ("tag", "S2")]),
+    np.zeros((0, 3), dtype=np.int16),
+    np.arange(4, dtype=np.uint8)[::2],
+], ids=["3d", "fortran", "structured", "zero-size", "non-contiguous"])
+def test_ndarray_binary_round_trip(array):
+    decoded = binary_to_ndarray(*unpack_binary_payload(ndarray_to_binary(array)))
+    assert decoded.dtype == array.dtype and decoded.shape == array.shape
+    np.testing.assert_array_equal(decoded, array)
+    if array.flags.f_contiguous and not array.flags.c_contiguous:
+        assert decoded.flags.f_contiguous
+
+
+def test_decoded_ndarray_is_read_only_view():
+    decoded = binary_to_ndarray(*unpack_binary_payload(ndarray_to_binary(np.arange(4))))
+    assert not decoded.flags.writeable
+    writable = decoded.copy()
+    writable[0] = 10
+    assert writable[0] == 10
+
+
+def test_ndarray_with_objects_cannot_be_stored_as_buffer():
+    with pytest.raises(ValueError):
+        ndarray_to_binary(np.array([{"a": 1}, None], dtype=object))
+
+
+@pytest.mark.parametrize("moment", [
+    datetime.datetime(2024, 1, 2, 3, 4, 5, 123456),
+    datetime.datetime(2024, 1, 2, 3, 4, 5, tzinfo=datetime.timezone(datetime.timedelta(hours=2))),
+    datetime.datetime(2024, 1, 2, 3, 4, 5, 7, tzinfo=datetime.timezone.utc),
+])
+def test_datetime_keeps_microseconds_and_timezone(moment):
+    loaded = serializer().decode_loaded_value(serializer().parse_saved_value(moment))
+    assert loaded == moment and loaded.tzinfo == moment.tzinfo
+
+
+def test_datetime_in_legacy_format_is_loaded():
+    legacy = '{"data": "2024-01-02 03:04:05", "object_type": "datetime.datetime"}'
+    assert serializer().decode_loaded_value(legacy) == datetime.datetime(2024, 1, 2, 3, 4, 5)
+    assert serializer().parse_saved_value(datetime.datetime(2024, 1, 2, 3, 4, 5)) == legacy
+
+
+def test_kpv_file_keeps_datetime_precision(tmp_path):
+    filename = str(tmp_path / "vars.kpv")
+    moments = {
+        "naive": datetime.datetime(2024, 1, 2, 3, 4, 5, 123456),
+        "aware": datetime.datetime(2024, 1, 2, 3, 4, 5, 654321, tzinfo=datetime.timezone.utc),
+    }
+    save_variables(moments, filename)
+    assert load_variables(filename) == moments
+    assert load_variable_safe(filename, "aware").tzinfo == datetime.timezone.utc
+
+
+@pytest.mark.parametrize("df", [
+    pd.DataFrame({"a": [1, 2]}, index=pd.MultiIndex.from_tuples([("x", 1), ("y", 2)])),
+    pd.DataFrame({"a": [1, 2]}, index=pd.Index([10, 20], name=pd.Timestamp("2024-01-01"))),
+    pd.DataFrame({"mixed": [1, "x", 2.5]}),
+], ids=["multiindex", "timestamp-index-name", "mixed-column"])
+def test_kpv_file_falls_back_to_other_dataframe_codecs(tmp_path, df):
+    filename = str(tmp_path / "vars.kpv")
+    save_variables({"df": df, "n": 1}, filename)
+    loaded = load_variable_safe(filename, "df")
+    np.testing.assert_array_equal(loaded.to_numpy(), df.to_numpy())
+    assert len(loaded.index) == len(df.index)
+
+
+def test_failed_kpv_save_keeps_previous_file(tmp_path):
+    filename = str(tmp_path / "vars.kpv")
+    save_variables({"n": 1}, filename)
+    unserializable = pd.DataFrame({"a": [1]})
+    unserializable.attrs = {"saved": {1, 2}}  # Sets are not supported by any codec
+
+    with pytest.raises(TypeError):
+        save_variables({"n": 2, "df": unserializable}, filename)
+    assert load_variables(filename) == {"n": 1}
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["vars.kpv"]
@@ -0,0 +1,123 @@
+import threading
+import time
+
+import pytest
+import redis
+
+from keepvariable.keepvariable_sqlite import KeepVariableSQLiteServer
+
+
+@pytest.fixture
+def other_sqlite_server(sqlite_server):
+    """Second server on the database of sqlite_server, with its own connections - like another process."""
+    server = KeepVariableSQLiteServer(sqlite_server.storage_path)
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def compressed_sqlite_server(tmp_path):
+    server = KeepVariableSQLiteServer(str(tmp_path / "kv_storage.sqlite"), compression="zlib", compression_threshold=200)
+    yield server
+    server.close()
+
+
+def test_query_matches_compressed_records(compressed_sqlite_server):
+    server = compressed_sqlite_server
+    server.set("jobs:1", {"status": "QUEUED", "log": "x" * 1000})  # Stored as a compressed BLOB
+    server.set("jobs:2", {"status": "QUEUED"})
+    server.set("jobs:3", {"status": "DONE", "log": "y" * 1000})
+    server.set("jobs:data", b"\x00" * 1000)
+    assert isinstance(server._connection().execute("SELECT value FROM kv_store WHERE key = 'jobs:1'").fetchone()[0], bytes)
+
+    assert list(server.query(entity_key="jobs", tag_params={"status": ("QUEUED",)})) == ["jobs:1", "jobs:2"]
+    assert list(server.query(entity_key="jobs", field_to_sort_by="status")) == ["jobs:3", "jobs:1", "jobs:2"]
+    assert [name for name, _ in server.iter_query(entity_key="jobs", page_size=1)] == ["jobs:1", "jobs:2", "jobs:3"]
+    assert dict(server.iter_query(entity_key="jobs", tag_params={"status": ("DONE",)}, return_fields=["status"])) == {
+        "jobs:3": {"status": "DONE"}
+    }
+
+
+def test_lock_is_exclusive_across_servers(sqlite_server, other_sqlite_server):
+    lock = sqlite_server.lock("jobs", sleep=0.01)
+    other_lock = other_sqlite_server.lock("jobs", sleep=0.01)
+    assert lock.acquire()
+    assert lock.owned() and other_lock.locked() and not other_lock.owned()
+
+    assert not other_lock.acquire(blocking=False)
+    started = time.monotonic()
+    assert not other_lock.acquire(blocking_timeout=0.1)
+    assert time.monotonic() - started >= 0.1
+    with pytest.raises(redis.exceptions.LockError):
+        with other_sqlite_server.lock("jobs", blocking_timeout=0.05):
+            pass
+
+    lock.release()
+    assert not other_lock.locked()
+    with other_lock:
+        assert other_lock.owned() and lock.locked()
+    with pytest.raises(redis.exceptions.LockError):
+        lock.release()  # Not acquired
+
+
+def test_expired_lock_is_taken_over(sqlite_server, other_sqlite_server):
+    lock = sqlite_server.lock("jobs", timeout=0.05)
+    assert lock.acquire()
+    time.sleep(0.1)
+    assert not lock.owned() and not lock.locked()
+
+    other_lock = other_sqlite_server.lock("jobs", timeout=10, blocking=False)
+    assert other_lock.acquire()
+    with pytest.raises(redis.exceptions.LockNotOwnedError):
+        lock.release()
+    assert other_lock.owned()
+    other_lock.release()
+
+
+def test_lock_serializes_read_modify_write_of_threads(sqlite_server):
+    sqlite_server.set("counter", 0)
+
+    def increment():
+        for _ in range(10):
+            with sqlite_server.lock("counter", sleep=0.001):
+                sqlite_server.set("counter", sqlite_server.get("counter") + 1)
+        sqlite_server.close()  # Connection of the thread
+
+    threads = [threading.Thread(target=increment) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert sqlite_server.get("counter") == 40
+
+
+def test_pipeline_is_rolled_back_on_error(sqlite_server, other_sqlite_server):
+    sqlite_server.set("doc", {"nodes": [1]})
+    with sqlite_server.pipeline() as pipe:
+        sqlite_server.set("new", 1, pipeline=pipe)
+        sqlite_server.arrappend("doc", "$.nodes", [2], pipeline=pipe)
+        sqlite_server.arrappend("doc", "$.missing", [3], pipeline=pipe)
+        with pytest.raises(AssertionError):
+            pipe.execute()
+        assert len(pipe) == 0  # Commands are not executed again
+
+    for server in (sqlite_server, other_sqlite_server):
+        assert server.get("new") is None
+        assert server.get("doc") == {"nodes": [1]}
+
+    # The connection is usable again, without a transaction left open
+    with sqlite_server.pipeline() as pipe:
+        sqlite_server.set("new", 1, pipeline=pipe)
+        sqlite_server.arrappend("doc", "$.nodes", [2], pipeline=pipe)
+        assert pipe.execute() == [True, 2]
+    assert other_sqlite_server.mget(["new", "doc"]) == [1, {"nodes": [1, 2]}]
+
+
+def test_pipeline_without_transaction_keeps_commands_before_error(sqlite_server):
+    with sqlite_server.pipeline(transaction=False) as pipe:
+        sqlite_server.set("first", 1, pipeline=pipe)
+        sqlite_server.arrappend("missing", "$.nodes", [1], pipeline=pipe)
+        sqlite_server.set("last", 1, pipeline=pipe)
+        with pytest.raises(AssertionError):
+            pipe.execute()
+    assert sqlite_server.mget(["first", "last"]) == [1, None]
@@ -0,0 +1,142 @@
+import random
+
+import pytest
+
+from keepvariable.keepvariable_core import KeepVariableDummyRedisServer
+from keepvariable.utils import (
+    IncorrectPathError,
+    access_element_by_path,
+    compile_glob,
+    compile_json_path,
+    increment_json_values,
+    split_glob_prefix,
+)
+
+GLOB_KEYS = [
+    "a.b", "axb", "a:b", "a[b", "a]b", "a*b", "a?b", "a\\b", "a-b", "a^b", "ab", "abb", "abc", "a\nb",
+    "job:1", "job:12", "jobs:1", "job", "[x", "x", "",
+]
+
+GLOB_PATTERNS = [
+    # '.' and ':' are literal
+    "a.b", "a:b", "job:*", "job:?", "jobs:1",
+    # Sets, negated sets and ranges
+    "a[.:]b", "a[^.:]b", "a[a-c]b", "a[c-a]b", "a[^a-c]b", "a[-]b", "a[b-]b", "a[]b", "a[^]b", "a[\\]]b", "a[]]b",
+    # Escaped special characters
+    "a\\*b", "a\\?b", "a\\[b", "a\\\\b", "a\\", "\\j*",
+    # Set which is not closed
+    "a[b", "a[", "a[^", "[x", "a[bc",
+    # Wildcards
+    "*", "?", "a*", "*b", "a*b", "a**b", "a?b", "",
+]
+
+
+@pytest.fixture
+def glob_redis(fakeredis):
+    redis = fakeredis.FakeRedis(decode_responses=True)
+    for key in GLOB_KEYS:
+        redis.set(key, 1)
+    return redis
+
+
+@pytest.mark.parametrize("pattern", GLOB_PATTERNS)
+def test_compile_glob_matches_like_redis(glob_redis, pattern):
+    expected = sorted(glob_redis.scan_iter(match=pattern))
+    assert sorted(key for key in GLOB_KEYS if compile_glob(pattern).fullmatch(key)) == expected
+
+
+def test_random_globs_match_like_redis(glob_redis):
+    generator = random.Random(7)
+    for _ in range(300):
+        pattern = "".join(generator.choice("ab*?[]^-\\:.") for _ in range(generator.randint(1, 6)))
+        expected = sorted(glob_redis.scan_iter(match=pattern))
+        assert sorted(key for key in GLOB_KEYS if compile_glob(pattern).fullmatch(key)) == expected, pattern
+
+
+@pytest.mark.parametrize("pattern", GLOB_PATTERNS)
+def test_dummy_scan_matches_like_redis(tmp_path, glob_redis, pattern):
+    server = KeepVariableDummyRedisServer(storage_path=str(tmp_path / "kv_storage.json"))
+    server.mset({key: 1 for key in GLOB_KEYS})
+    assert server.scan(pattern) == sorted(glob_redis.scan_iter(match=pattern))
+
+
+@pytest.mark.parametrize("pattern, expected", [
+    ("jobs:*", ("jobs:", False)),
+    ("jobs:4", ("jobs:4", True)),
+    ("a.b:c", ("a.b:c", True)),
+    ("a\\*b", ("a*b", True)),
+    ("a\\*b*", ("a*b", False)),
+    ("a[bc]", ("a", False)),
+    ("?", ("", False)),
+    ("a\\", ("a\\", True)),
+    ("", ("", True)),
+])
+def test_split_glob_prefix(pattern, expected):
+    assert split_glob_prefix(pattern) == expected
+
+
+def json_document():
+    return {"a": [1, {"b": 2}, "text", [3, 4]], "c": {"d": {"b": 5}, "e": None}, "f": "xy"}
+
+
+@pytest.mark.parametrize("path, expected", [
+    ("$", [json_document()]),
+    (".", [json_document()]),
+    ("$.a[1].b", [2]),
+    ("a[1].b", [2]),
+    (".c.d", [{"b": 5}]),
+    ("$.a[-1][-2]", [3]),
+    ("$['c']['d']", [{"b": 5}]),
+    ("$.a[*].b", [2]),
+    ("$.a[*][0]", [3]),
+    ("$.*.b", []),
+    ("$.c.*.b", [5]),
+    ("$.*[1]", [{"b": 2}]),
+    ("$.*.*", [1, {"b": 2}, "text", [3, 4], {"b": 5}, None]),
+    ("$.f.*", []),
+])
+def test_json_path_get(path, expected):
+    assert compile_json_path(path).get(json_document()) == expected
+
+
+@pytest.mark.parametrize("path, value, expected", [
+    ("$", 1, 1),
+    (".", 1, 1),
+    ("$.f", 1, {**json_document(), "f": 1}),
+    ("$.a[-1]", 1, {**json_document(), "a": [1, {"b": 2}, "text", 1]}),
+    ("$.a[*].b", 7, {**json_document(), "a": [1, {"b": 7}, "text", [3, 4]]}),
+    ("$.a[*][-1]", 7, {**json_document(), "a": [1, {"b": 2}, "text", [3, 7]]}),
+    ("$.c.*.b", 7, {**json_document(), "c": {"d": {"b": 7}, "e": None}}),
+    # No element exists - the key is created in every object
+    ("$.a[*].new", 7, {**json_document(), "a": [1, {"b": 2, "new": 7}, "text", [3, 4]]}),
+    ("$.*[5]", 7, json_document()),
+])
+def test_json_path_set(path, value, expected):
+    assert compile_json_path(path).set(json_document(), value) == expected
+
+
+def test_json_path_without_wildcard_raises_for_missing_elements():
+    with pytest.raises(KeyError):
+        compile_json_path("$.c.missing.b").get(json_document())
+    with pytest.raises(IncorrectPathError):
+        compile_json_path("$.a[10].b").get(json_document())
+    with pytest.raises(IncorrectPathError):
+        access_element_by_path(json_document(), "$.a[*]")
+    assert access_element_by_path(json_document(), ".") == (None, None)
+
+
+def test_increment_json_values_skips_scalars_with_wildcards():
+    document = {"a": [1, {"n": 1}, "text", [2]]}
+    assert increment_json_values(document, "$.a[*].n", 2) == 3
+    assert increment_json_values(document, "$.a[*][0]", 1) == 3
+    assert document == {"a": [1, {"n": 3}, "text", [3]]}
+
+
+@pytest.mark.parametrize("server_name", ["dummy_server", "sqlite_server"])
+def test_json_mset_wildcards_skip_scalars(request, server_name):
+    server = request.getfixturevalue(server_name)
+    server.set("j", {"a": [1, {"b": 2}]})
+    server.json_mset("j", {"$.a[*].b": 5})
+    server.set("l", {"items": [{"x": 1}, 2, [3]]})
+    server.json_mset("l", {"$.items.*.x": 9})
+    assert server.mget(["j", "l"]) == [{"a": [1, {"b": 5}]}, {"items": [{"x": 9}, 2, [3]]}]
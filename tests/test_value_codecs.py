@@ -0,0 +1,83 @@
+import decimal
+import fractions
+
+import pandas as pd
+import pytest
+
+from keepvariable.keepvariable_core import KeepVariableSerializer
+from keepvariable.value_codecs import CodecRegistry, default_codecs, register_codec
+
+
+class Money(decimal.Decimal):
+    pass
+
+
+@pytest.fixture
+def codecs(monkeypatch):
+    """Registry used by all serializers during the test, a copy of default_codecs."""
+    registry = default_codecs.copy()
+    monkeypatch.setattr(KeepVariableSerializer, "codecs", registry)
+    return registry
+
+
+def round_trip(value, serializer=None):
+    serializer = serializer or KeepVariableSerializer()
+    return serializer.decode_loaded_value(serializer.parse_saved_value(value))
+
+
+def test_registered_type_round_trip(codecs):
+    codecs.register(decimal.Decimal, "decimal.Decimal", str, decimal.Decimal)
+    stored = KeepVariableSerializer().parse_saved_value(decimal.Decimal("1.10"))
+    assert stored == '{"object_type": "decimal.Decimal", "data": "1.10"}'
+    loaded = round_trip(decimal.Decimal("1.10"))
+    assert loaded == decimal.Decimal("1.10") and str(loaded) == "1.10"
+
+
+def test_subclass_uses_codec_of_base_class(codecs):
+    codecs.register(decimal.Decimal, "decimal.Decimal", str, decimal.Decimal)
+    assert round_trip(Money("2.5")) == decimal.Decimal("2.5")
+
+    codecs.register(Money, "Money", str, Money)  # Own codec takes precedence
+    loaded = round_trip(Money("2.5"))
+    assert type(loaded) is Money and loaded == Money("2.5")
+
+
+def test_resolved_encoders_are_invalidated_by_register(codecs):
+    assert codecs.encoder(fractions.Fraction) is codecs.encoder(object)  # No codec - the cached MRO lookup
+
+    codecs.register(fractions.Fraction, "fractions.Fraction", str, fractions.Fraction)
+    assert KeepVariableSerializer().parse_saved_value(fractions.Fraction(1, 3)) == (
+        '{"object_type": "fractions.Fraction", "data": "1/3"}'
+    )
+    assert round_trip(fractions.Fraction(1, 3)) == fractions.Fraction(1, 3)
+
+
+def test_tag_conflicts_raise(codecs):
+    codecs.register(decimal.Decimal, "decimal.Decimal", str, decimal.Decimal)
+    codecs.register(decimal.Decimal, "decimal.Decimal", str, decimal.Decimal)  # Same type may register again
+    with pytest.raises(ValueError):
+        codecs.register(Money, "decimal.Decimal", str, Money)
+    with pytest.raises(ValueError):
+        codecs.register(Money, "pd.DataFrame", str, Money)  # Tag of a built-in codec
+
+    df = pd.DataFrame({"a": [1, 2]})
+    pd.testing.assert_frame_equal(round_trip(df), df)
+
+
+def test_copy_isolates_registry_of_one_serializer(codecs):
+    serializer = KeepVariableSerializer()
+    serializer.codecs = codecs.copy()
+    serializer.codecs.register(decimal.Decimal, "decimal.Decimal", str, decimal.Decimal)
+
+    assert round_trip(decimal.Decimal("3"), serializer) == decimal.Decimal("3")
+    assert codecs.encoder(decimal.Decimal) is codecs.encoder(object)
+    assert codecs.decoder("decimal.Decimal") is None
+    assert KeepVariableSerializer().parse_saved_value(decimal.Decimal("3")) == decimal.Decimal("3")
+
+
+def test_register_codec_registers_into_default_registry(monkeypatch):
+    registry = CodecRegistry()
+    monkeypatch.setattr("keepvariable.value_codecs.default_codecs", registry)
+    register_codec(decimal.Decimal, "decimal.Decimal", str, decimal.Decimal)
+    assert registry.decoder("decimal.Decimal") is not None
+    assert default_codecs.decoder("decimal.Decimal") is None